@@ -0,0 +1,250 @@
+import csv
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+
+from models import KeyFacts
+from services.key_fact_extractor import KeyFactExtractor
+from task_manager import TaskManager
+
+logger = logging.getLogger(__name__)
+
+
+class BatchProcessor:
+    """
+    Runs many exposés through the single-exposé pipeline, sharing its list catalog, HubSpot mirror and result cache.
+
+    A batch is one scheduler job which processes up to ``concurrency`` exposés at once, so a folder of 500
+    exposés takes one queue slot instead of 500. Uploaded files are spooled to a temporary directory rather
+    than kept in memory. The manifest (file names and task ids) is kept in the task manager, every file
+    also gets a regular task whose progress and results can be read like those of a single upload.
+
+    Offline batches hand all files to ``process_offline`` at once, which runs the GPT requests as OpenAI
+    Batch API jobs. Since those can take up to 24 hours, offline batches run on a pool of their own, at most
+    ``offline_concurrency`` at once, instead of holding scheduler workers. While a batch runs, its manifest
+    and tasks are refreshed every ``keepalive_seconds`` so the task store does not expire them.
+    """
+
+    COLUMNS: List[str] = ["filename", "task_id", "status", "selected_list", "selected_list_id"] + \
+                         KeyFactExtractor.FIELDS + ["curated_member"]
+
+    def __init__(self, process: Callable[[str, bytes], None], task_manager: TaskManager, concurrency: int = 4,
+                 process_offline: Optional[Callable[[Iterable[Tuple[str, bytes]]], None]] = None,
+                 keepalive_seconds: float = 600.0, offline_concurrency: int = 2):
+        self.process = process
+        self.process_offline = process_offline
+        self.task_manager = task_manager
+        self.concurrency = concurrency
+        self.keepalive_seconds = keepalive_seconds
+        self.offline_executor = ThreadPoolExecutor(max_workers=offline_concurrency, thread_name_prefix="batch-offline")
+
+    @staticmethod
+    def spool(uploads: Iterable[Tuple[str, IO[bytes]]]) -> Tuple[str, List[Tuple[str, str]]]:
+        """
+        Writes uploaded PDFs and the PDFs inside uploaded ZIP archives to a new temporary directory.
+        Returns the directory and a (file name, path) pair per PDF.
+        """
+        directory = tempfile.mkdtemp(prefix="expose-batch-")
+        files = []
+
+        def write(filename: str, source: IO[bytes]):
+            path = os.path.join(directory, f"{len(files):05d}.pdf")
+            with open(path, "wb") as target:
+                shutil.copyfileobj(source, target)
+            files.append((filename, path))
+
+        try:
+            for filename, stream in uploads:
+                if filename.lower().endswith(".zip"):
+                    with zipfile.ZipFile(stream) as archive:
+                        for member in archive.infolist():
+                            name = member.filename
+                            if member.is_dir() or not name.lower().endswith(".pdf") or name.startswith("__MACOSX/"):
+                                continue
+                            with archive.open(member) as source:
+                                write(name, source)
+                elif filename.lower().endswith(".pdf"):
+                    write(filename, stream)
+        except Exception:
+            shutil.rmtree(directory, ignore_errors=True)
+            raise
+
+        return directory, files
+
+    def create(self, files: List[Tuple[str, str]], directory: Optional[str] = None, offline: bool = False) -> str:
+        """Registers a batch of (file name, path) pairs. ``directory`` is removed once the batch has run."""
+        batch_id = str(uuid.uuid4())
+        manifest = {
+            'files': [{'filename': filename, 'path': path, 'task_id': str(uuid.uuid4())} for filename, path in files],
+            'directory': directory,
+            'offline': offline and self.process_offline is not None,
+            'created_at': time.time(),
+        }
+        for entry in manifest['files']:
+            self.task_manager.update_progress(entry['task_id'], "Queued", 0)
+        self.task_manager.set_batch(batch_id, manifest)
+        return batch_id
+
+    def is_offline(self, batch_id: str) -> bool:
+        return bool((self.task_manager.get_batch(batch_id) or {}).get('offline'))
+
+    def start(self, batch_id: str) -> Future:
+        """Runs a batch on the offline pool, for offline batches that would hold a scheduler worker for hours."""
+        return self.offline_executor.submit(self.run, batch_id)
+
+    def remove(self, batch_id: str):
+        manifest = self.task_manager.get_batch(batch_id)
+        if manifest is None:
+            return
+        for entry in manifest['files']:
+            self.task_manager.remove_task(entry['task_id'])
+        if manifest.get('directory'):
+            shutil.rmtree(manifest['directory'], ignore_errors=True)
+        self.task_manager.remove_task(batch_id)
+
+    def run(self, batch_id: str, on_done: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """Processes all files of a batch, ``on_done`` is called with the result row of every finished file."""
+        manifest = self.task_manager.get_batch(batch_id)
+        if manifest is None:
+            logger.error(f"Unknown batch {batch_id}")
+            return
+
+        self.task_manager.set_batch(batch_id, {**manifest, 'started_at': time.time()})
+        logger.info(f"Processing batch {batch_id} with {len(manifest['files'])} exposés")
+
+        def process_file(entry: Dict[str, str]) -> Dict[str, Any]:
+            try:
+                with open(entry['path'], "rb") as file:
+                    pdf_content = file.read()
+                self.process(entry['task_id'], pdf_content)
+            except OSError as e:
+                logger.error(f"Error reading {entry['filename']}: {str(e)}")
+                self.task_manager.update_progress(entry['task_id'], f"Error: {str(e)}", 100)
+            return self.row(entry['filename'], entry['task_id'])
+
+        def read_files() -> Iterator[Tuple[str, bytes]]:
+            # Read one at a time, only the extracted texts of an offline batch are kept until its GPT jobs are done
+            for entry in manifest['files']:
+                try:
+                    with open(entry['path'], "rb") as file:
+                        yield entry['task_id'], file.read()
+                except OSError as e:
+                    logger.error(f"Error reading {entry['filename']}: {str(e)}")
+                    self.task_manager.update_progress(entry['task_id'], f"Error: {str(e)}", 100)
+
+        try:
+            with self.keep_alive(batch_id, manifest):
+                if manifest.get('offline'):
+                    self.process_offline(read_files())
+                    for entry in manifest['files']:
+                        if on_done is not None:
+                            on_done(self.row(entry['filename'], entry['task_id']))
+                else:
+                    with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="batch") as executor:
+                        for row in executor.map(process_file, manifest['files']):
+                            if on_done is not None:
+                                on_done(row)
+        except Exception as e:
+            logger.error(f"Batch {batch_id} failed: {str(e)}")
+            # Exposés the failure left unfinished would otherwise stay at their last progress
+            for entry in manifest['files']:
+                if self.task_manager.get_progress(entry['task_id'])['percent'] < 100:
+                    self.task_manager.update_progress(entry['task_id'], f"Error: {str(e)}", 100)
+        finally:
+            if manifest.get('directory'):
+                shutil.rmtree(manifest['directory'], ignore_errors=True)
+            manifest = self.task_manager.get_batch(batch_id) or manifest
+            self.task_manager.set_batch(batch_id, {**manifest, 'finished_at': time.time()})
+
+        status = self.status(batch_id)
+        logger.info(f"Finished batch {batch_id}: {status['completed']} exposés ({status['failed']} failed) "
+                    f"in {status['elapsed_seconds']} s, {status['exposes_per_minute']} exposés/minute")
+
+    @contextmanager
+    def keep_alive(self, batch_id: str, manifest: Dict[str, Any]) -> Iterator[None]:
+        """Refreshes the batch and its tasks in the task manager until the ``with`` block is left."""
+        stopped = threading.Event()
+
+        def refresh():
+            while not stopped.wait(self.keepalive_seconds):
+                self.task_manager.touch(batch_id)
+                for entry in manifest['files']:
+                    self.task_manager.touch(entry['task_id'])
+
+        thread = threading.Thread(target=refresh, name=f"batch-keepalive-{batch_id[:8]}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stopped.set()
+
+    def status(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        manifest = self.task_manager.get_batch(batch_id)
+        if manifest is None:
+            return None
+
+        files = []
+        for entry in manifest['files']:
+            progress = self.task_manager.get_progress(entry['task_id'])
+            files.append({'filename': entry['filename'], 'task_id': entry['task_id'], **progress})
+
+        completed = sum(1 for file in files if file['percent'] == 100)
+        failed = sum(1 for file in files if file['percent'] == 100 and file['status'].startswith("Error"))
+        started_at = manifest.get('started_at')
+        elapsed = (manifest.get('finished_at') or time.time()) - started_at if started_at else 0.0
+
+        return {
+            'batch_id': batch_id,
+            'total': len(files),
+            'completed': completed,
+            'failed': failed,
+            'finished': 'finished_at' in manifest,
+            'elapsed_seconds': round(elapsed, 1),
+            'exposes_per_minute': round(completed * 60 / elapsed, 2) if elapsed else 0.0,
+            'files': files,
+        }
+
+    def row(self, filename: str, task_id: str) -> Dict[str, Any]:
+        results = self.task_manager.get_results(task_id)
+        return {
+            'filename': filename,
+            'task_id': task_id,
+            'status': self.task_manager.get_progress(task_id)['status'],
+            'selected_list': results.get('selected_list') or "",
+            'selected_list_id': results.get('selected_list_id') or "",
+            'key_facts': KeyFacts(**(results.get('key_facts') or {})).model_dump(),
+            'curated_member': results.get('curated_member', []),
+        }
+
+    def rows(self, batch_id: str) -> List[Dict[str, Any]]:
+        manifest = self.task_manager.get_batch(batch_id) or {'files': []}
+        return [self.row(entry['filename'], entry['task_id']) for entry in manifest['files']]
+
+    @classmethod
+    def flatten_row(cls, row: Dict[str, Any]) -> Dict[str, Any]:
+        flat = {name: value for name, value in row.items() if name not in ('key_facts', 'curated_member')}
+        flat.update(KeyFactExtractor.flatten(KeyFacts(**row['key_facts'])))
+        flat['curated_member'] = "; ".join(row['curated_member'])
+        return flat
+
+    @classmethod
+    def write_rows(cls, rows: Iterable[Dict[str, Any]], file: IO[str], output_format: str = "jsonl"):
+        if output_format == "csv":
+            writer = csv.DictWriter(file, fieldnames=cls.COLUMNS)
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(cls.flatten_row(row))
+        elif output_format == "jsonl":
+            for row in rows:
+                file.write(json.dumps(row, ensure_ascii=False) + "\n")
+        else:
+            raise ValueError(f"Unknown output format: {output_format}")
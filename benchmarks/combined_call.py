@@ -0,0 +1,108 @@
+"""
+Compares the combined key facts and list selection call (GPT_COMBINED_KEY_FACTS_AND_LIST) with the two
+separate calls of the default pipeline, which run concurrently. Reports latency and token use per exposé.
+
+    python benchmarks/combined_call.py --exposes 20 --latency 0.5 --token-latency 0.2
+    python benchmarks/combined_call.py --real    # OpenAI API with the key of the .env file, costs money
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_openai import FakeOpenAI  # noqa: E402
+from config import Config  # noqa: E402
+from services.gpt_service import GPTService  # noqa: E402
+from services.key_fact_extractor import KeyFactExtractor  # noqa: E402
+
+PARAGRAPH = (
+    "Das Wohn- und Geschäftshaus liegt in zentraler Lage und verfügt über {units} Wohneinheiten sowie zwei "
+    "Gewerbeeinheiten im Erdgeschoss. Die Wohnfläche beträgt rund {area} m², das Grundstück ist 800 m² groß. "
+    "Die Jahresnettokaltmiete beläuft sich auf 150.000 €, der Kaufpreis auf 2.500.000 €. "
+)
+
+
+def make_document(index: int, chars: int) -> str:
+    text = f"Exposé Nr. {index}\n"
+    while len(text) < chars:
+        text += PARAGRAPH.format(units=10 + index % 7, area=900 + index)
+    return text[:chars]
+
+
+def percentile(values: List[float], percent: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+def measure(name: str, run: Callable[[int], None], exposes: int, gpt_service: GPTService) -> Dict:
+    latencies = []
+    for index in range(exposes):
+        started_at = time.perf_counter()
+        run(index)
+        latencies.append(time.perf_counter() - started_at)
+
+    usage = gpt_service.usage.stats().values()
+    return {
+        "path": name,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "calls": sum(entry["calls"] for entry in usage) / exposes,
+        "prompt_tokens": sum(entry["prompt_tokens"] for entry in usage) / exposes,
+        "cached_tokens": sum(entry["cached_tokens"] for entry in usage) / exposes,
+        "completion_tokens": sum(entry["completion_tokens"] for entry in usage) / exposes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--exposes", type=int, default=20)
+    parser.add_argument("--document-chars", type=int, default=24000, help="About 4 characters per token")
+    parser.add_argument("--lists", type=int, default=40, help="Number of HubSpot lists to choose from")
+    parser.add_argument("--latency", type=float, default=0.5, help="Fake API: seconds per completion")
+    parser.add_argument("--token-latency", type=float, default=0.2, help="Fake API: seconds per 1000 tokens")
+    parser.add_argument("--real", action="store_true", help="Use the configured OpenAI API instead of the fake")
+    args = parser.parse_args()
+
+    if not args.real:
+        fake_openai = FakeOpenAI(latency=args.latency, token_latency=args.token_latency).start()
+        os.environ.update(OPENAI_BASE_URL=fake_openai.base_url, OPENAI_API_KEY="fake",
+                          HUBSPOT_API_KEY=os.environ.get("HUBSPOT_API_KEY", "fake"))
+    config = Config()
+    list_names = [f"Investoren Gruppe {index}" for index in range(args.lists)]
+    fields = KeyFactExtractor.FIELDS
+
+    separate = GPTService(config)
+    executor = ThreadPoolExecutor(max_workers=2)
+
+    def run_separate(index: int):
+        document = make_document(index, args.document_chars)
+        key_facts = executor.submit(separate.extract_key_facts, document, fields)
+        selection = executor.submit(separate.analyze_text_and_select_list, document, list_names)
+        key_facts.result(), selection.result()
+
+    combined = GPTService(config)
+
+    def run_combined(index: int):
+        # Other exposé numbers than the separate run, so neither path profits from the other's prompt cache
+        combined.extract_key_facts_and_select_list(make_document(args.exposes + index, args.document_chars),
+                                                   list_names, fields)
+
+    results = [measure("separate calls", run_separate, args.exposes, separate),
+               measure("combined call", run_combined, args.exposes, combined)]
+    executor.shutdown()
+
+    print(f"{args.exposes} exposés of {args.document_chars} characters, {args.lists} lists")
+    print(f"{'path':<16}{'p50 s':>8}{'p95 s':>8}{'calls':>7}{'prompt tok':>12}{'cached tok':>12}{'compl. tok':>12}")
+    for result in results:
+        print(f"{result['path']:<16}{result['p50']:>8.2f}{result['p95']:>8.2f}{result['calls']:>7.1f}"
+              f"{result['prompt_tokens']:>12.0f}{result['cached_tokens']:>12.0f}{result['completion_tokens']:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Synthetic exposé PDFs for the benchmarks: a few pages of German listing text with the key facts the
+prompts ask for, every exposé with its own numbers so no two share a result cache entry.
+
+    python benchmarks/exposes.py --exposes 20 --pages 4 --out /tmp/exposes
+"""
+import argparse
+import os
+import textwrap
+from typing import List
+
+LISTS = ["Investoren Wohnen", "Family Offices", "Projektentwickler", "Hotelinvestoren", "Pflegeimmobilien"]
+
+COVER = (
+    "Exposé Nr. {index}\n"
+    "Wohn- und Geschäftshaus in {city}\n"
+    "Musterstraße {index}, 10115 {city}\n"
+    "Kaufpreis: {price} €\n"
+    "Wohnfläche: {area} m²\n"
+    "Grundstücksfläche: 800 m²\n"
+    "Wohneinheiten: {units}\n"
+    "Jahresnettokaltmiete: {rent} €\n"
+    "WALT: 4,5 Jahre\n"
+    "Geeignet für: {audience}"
+)
+
+PARAGRAPH = (
+    "Das Objekt liegt in zentraler Lage von {city} mit sehr guter Anbindung an den öffentlichen Nahverkehr. "
+    "Die {units} Wohneinheiten sind vollständig vermietet, die Gewerbeeinheit im Erdgeschoss ist langfristig "
+    "an einen Lebensmittelhändler vermietet. Das Angebot richtet sich an {audience}."
+)
+
+
+def make_pdf(pages: List[str]) -> bytes:
+    """A minimal PDF with one Helvetica text page per entry of ``pages``, lines separated by newlines."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{3 + 2 * index} 0 R" for index in range(len(pages)))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode())
+    font_id = 3 + 2 * len(pages)
+    for index, text in enumerate(pages):
+        lines = " ".join(f"({line.replace('(', '[').replace(')', ']')}) Tj T*" for line in text.split("\n"))
+        stream = f"BT /F1 11 Tf 50 780 Td 14 TL {lines} ET".encode("cp1252", "replace")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents {4 + 2 * index} 0 R "
+                       f"/Resources << /Font << /F1 {font_id} 0 R >> >> >>".encode())
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, content in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n".encode() + content + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    pdf += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF".encode()
+    return pdf
+
+
+def make_expose(index: int, pages: int = 4) -> bytes:
+    values = {
+        "index": index,
+        "city": ["Berlin", "Hamburg", "München", "Leipzig", "Köln"][index % 5],
+        "price": f"{2000000 + 10000 * index:,}".replace(",", "."),
+        "area": 900 + index,
+        "units": 8 + index % 12,
+        "rent": f"{120000 + 1000 * index:,}".replace(",", "."),
+        "audience": LISTS[index % len(LISTS)],
+    }
+    # About 50 lines per page, wrapped so the text stays on the page
+    lines = textwrap.wrap(PARAGRAPH.format(**values), 90)
+    body = "\n".join(lines * (50 // len(lines)))
+    return make_pdf([COVER.format(**values)] + [body] * (pages - 1))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--exposes", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=4)
+    parser.add_argument("--out", default="exposes")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    for number in range(args.exposes):
+        with open(os.path.join(args.out, f"expose_{number:04d}.pdf"), "wb") as file:
+            file.write(make_expose(number, args.pages))
+    print(f"Wrote {args.exposes} exposés to {args.out}")
@@ -0,0 +1,213 @@
+"""
+Local stand-in for the HubSpot API parts the HubspotService and HubspotMirror use: list search, list
+metadata, memberships (also in join order), batch reads and searches of contacts and companies.
+
+Lists and their members are generated: ``lists`` lists of ``members`` records each, alternating between
+company and contact lists. Point the app at it with HUBSPOT_BASE_URL:
+
+    python benchmarks/fake_hubspot.py --port 8002 --latency 0.1 --requests-per-second 10
+    HUBSPOT_BASE_URL=http://127.0.0.1:8002 python main.py
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_openai import WindowLimit  # noqa: E402
+
+LIST_NAMES = [
+    "Investoren Wohnen", "Family Offices", "Projektentwickler", "Hotelinvestoren", "Pflegeimmobilien",
+    "Logistikinvestoren", "Büroinvestoren", "Einzelhandel", "Bestandshalter", "Institutionelle Anleger",
+]
+LIFECYCLE_STAGES = ["subscriber", "lead", "marketingqualifiedlead", "salesqualifiedlead", "opportunity", "customer"]
+OBJECT_NAMES = {"companies": "0-2", "contacts": "0-1"}
+
+
+class FakeHubspot:
+    """
+    Threaded HTTP server answering every request after ``latency`` seconds. More than ``requests_per_second``
+    or ``requests_per_10_seconds`` requests are answered with 429 and a Retry-After header, like HubSpot's
+    burst limits.
+    """
+
+    PAGE_SIZE = 100
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, lists: int = 10,
+                 members: int = 500, requests_per_second: int = 0, requests_per_10_seconds: int = 0):
+        self.latency = latency
+        self.limits = [WindowLimit(requests_per_second, 1.0), WindowLimit(requests_per_10_seconds, 10.0)]
+        self.lists = [{"listId": str(index + 1), "name": self.list_name(index),
+                       "objectTypeId": "0-2" if index % 2 == 0 else "0-1"} for index in range(lists)]
+        self.members = members
+        self.requests: Dict[str, int] = {}
+        self.rate_limited = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeHubspot":
+        threading.Thread(target=self.server.serve_forever, name="fake-hubspot", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+    @staticmethod
+    def list_name(index: int) -> str:
+        name = LIST_NAMES[index % len(LIST_NAMES)]
+        return name if index < len(LIST_NAMES) else f"{name} {index // len(LIST_NAMES) + 1}"
+
+    def member_ids(self, list_id: str) -> List[str]:
+        return [str(int(list_id) * 1000000 + index) for index in range(self.members)]
+
+    @staticmethod
+    def record(object_name: str, record_id: str) -> Dict[str, Any]:
+        number = int(record_id)
+        modified = datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(hours=number % 20000)
+        properties = {
+            "hs_object_id": record_id,
+            "createdate": "2023-01-01T00:00:00.000Z",
+            "lastmodifieddate": modified.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "hs_lastmodifieddate": modified.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "lifecyclestage": LIFECYCLE_STAGES[number % len(LIFECYCLE_STAGES)],
+        }
+        if object_name == "companies":
+            properties.update(name=f"Immobilien {number % 1000000} GmbH", num_associated_contacts=str(number % 7),
+                              num_associated_deals=str(number % 3))
+        else:
+            properties.update(firstname=f"Vorname{number % 1000000}", lastname=f"Nachname{number % 1000000}",
+                              email=f"kontakt{number}@example.com", num_associated_deals=str(number % 3))
+        return {"id": record_id, "properties": properties, "archived": False}
+
+    def search_lists(self) -> Dict[str, Any]:
+        return {
+            "lists": [{**a_list, "processingType": "MANUAL", "processingStatus": "COMPLETE", "listVersion": 1,
+                       "additionalProperties": {}} for a_list in self.lists],
+            "hasMore": False,
+            "offset": len(self.lists),
+            "total": len(self.lists),
+        }
+
+    def memberships(self, list_id: str, after: Optional[str], path: str) -> Dict[str, Any]:
+        ids = self.member_ids(list_id)
+        start = int(after or 0)
+        page = {"results": [{"recordId": record_id, "membershipTimestamp": "2024-01-01T00:00:00.000Z"}
+                            for record_id in ids[start:start + self.PAGE_SIZE]]}
+        if start + self.PAGE_SIZE < len(ids):
+            next_after = str(start + self.PAGE_SIZE)
+            page["paging"] = {"next": {"after": next_after, "link": f"{self.base_url}{path}?after={next_after}"}}
+        return page
+
+    def search_objects(self, object_name: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        object_type_id = OBJECT_NAMES[object_name]
+        ids = [record_id for a_list in self.lists if a_list["objectTypeId"] == object_type_id
+               for record_id in self.member_ids(a_list["listId"])]
+        records = sorted((self.record(object_name, record_id) for record_id in ids),
+                         key=lambda record: record["properties"]["hs_lastmodifieddate"])
+        for group in body.get("filterGroups") or []:
+            for condition in group.get("filters", []):
+                if condition.get("operator") == "GT":
+                    records = [record for record in records
+                               if record["properties"].get(condition["propertyName"], "") > condition["value"]]
+        start = int(body.get("after") or 0)
+        limit = int(body.get("limit") or self.PAGE_SIZE)
+        page = {"total": len(records), "results": records[start:start + limit]}
+        if start + limit < len(records):
+            page["paging"] = {"next": {"after": str(start + limit)}}
+        return page
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None):
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _body(self) -> Dict[str, Any]:
+                return json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+            def _admit(self, parts: List[str]) -> bool:
+                endpoint = "/" + "/".join("{id}" if part.isdigit() else part for part in parts)
+                with fake.lock:
+                    fake.requests[endpoint] = fake.requests.get(endpoint, 0) + 1
+                for limit in fake.limits:
+                    retry_after = limit.retry_after()
+                    if retry_after is not None:
+                        with fake.lock:
+                            fake.rate_limited += 1
+                        self._send(429, {"status": "error", "category": "RATE_LIMITS"},
+                                   {"Retry-After": f"{retry_after:.3f}"})
+                        return False
+                time.sleep(fake.latency)
+                return True
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                parts = url.path.strip("/").split("/")
+                query = {name: values[0] for name, values in parse_qs(url.query).items()}
+                if not self._admit(parts):
+                    return
+                if parts[:3] == ["crm", "v3", "lists"] and len(parts) == 4:
+                    a_list = next((a_list for a_list in fake.lists if a_list["listId"] == parts[3]), None)
+                    if a_list is not None:
+                        return self._send(200, {"list": a_list})
+                if parts[:3] == ["crm", "v3", "lists"] and len(parts) >= 5 and parts[4] == "memberships":
+                    return self._send(200, fake.memberships(parts[3], query.get("after"), url.path))
+                self._send(404, {"status": "error", "message": f"Unknown path {url.path}"})
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                parts = url.path.strip("/").split("/")
+                if not self._admit(parts):
+                    return
+                body = self._body()
+                if parts == ["crm", "v3", "lists", "search"]:
+                    return self._send(200, fake.search_lists())
+                if parts[:3] == ["crm", "v3", "objects"] and len(parts) == 6 and parts[4:] == ["batch", "read"]:
+                    return self._send(200, {"status": "COMPLETE", "results": [
+                        fake.record(parts[3], item["id"]) for item in body.get("inputs", [])]})
+                if parts[:3] == ["crm", "v3", "objects"] and len(parts) == 5 and parts[4] == "search":
+                    return self._send(200, fake.search_objects(parts[3], body))
+                self._send(404, {"status": "error", "message": f"Unknown path {url.path}"})
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8002)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per request")
+    parser.add_argument("--lists", type=int, default=10)
+    parser.add_argument("--members", type=int, default=500, help="Members per list")
+    parser.add_argument("--requests-per-second", type=int, default=0, help="Rate limit, 0 for none")
+    parser.add_argument("--requests-per-10-seconds", type=int, default=0, help="Rate limit, 0 for none")
+    args = parser.parse_args()
+
+    fake_hubspot = FakeHubspot(args.host, args.port, args.latency, args.lists, args.members,
+                               args.requests_per_second, args.requests_per_10_seconds)
+    print(f"Fake HubSpot API listening on {fake_hubspot.base_url}")
+    fake_hubspot.server.serve_forever()
@@ -0,0 +1,347 @@
+"""
+Local stand-in for the OpenAI API, answering the prompts of the GPTService with canned responses.
+
+Supports chat completions (also streamed), embeddings, file uploads and the Batch API, so the pipeline
+including the offline batch mode can run without an API key. Point the app at it with OPENAI_BASE_URL:
+
+    python benchmarks/fake_openai.py --port 8001 --latency 0.5 --batch-delay 5
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 python cli.py batch exposes/ --offline
+"""
+import argparse
+import base64
+import email.parser
+import email.policy
+import itertools
+import json
+import re
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+KEY_FACTS = {
+    "address": {"street": "Musterstraße", "house_number": "1", "postal_code": "10115", "city": "Berlin",
+                "population": 3755251},
+    "purchase_price": "2.500.000 €",
+    "price_per_square": "2.500 €",
+    "usable_area": 1000,
+    "plot_size": 800,
+    "residential_units": 12,
+    "rental_income": "150.000 €",
+    "wault": 4.5,
+}
+
+# Structured-output reply, figures as plain numbers in Euro, m² and years
+KEY_FACTS_NUMBERS = {
+    **KEY_FACTS,
+    "purchase_price": 2500000, "price_per_square": 2500, "rental_income": 150000,
+}
+
+EMAIL = (
+    '<div class="container my-4"><h1 class="h4">🏢 Neues Investment in Berlin</h1>'
+    '<p class="lead">Sehr geehrte Damen und Herren,</p>'
+    '<p>wir freuen uns, Ihnen ein Wohn- und Geschäftshaus mit 12 Einheiten anzubieten. 📈</p>'
+    '<a class="btn btn-primary" href="#">Besichtigung vereinbaren</a></div>'
+)
+
+
+def answer(messages: List[Dict[str, str]], response_format: Optional[Dict[str, Any]] = None) -> str:
+    """Returns a plausible response for the GPTService prompt in ``messages``."""
+    system_content = "\n".join(message["content"] for message in messages if message["role"] == "system")
+    user_content = messages[-1]["content"]
+    match = re.search(r"Available lists: (.*)$", user_content, re.DOTALL)
+    list_name = match.group(1).split(",")[0].strip() if match else "Investors"
+    if "data extraction specialist" in system_content:
+        if response_format and response_format.get("type") == "json_schema":
+            schema = response_format["json_schema"]["schema"]
+            if "list_name" in schema["properties"]:
+                return json.dumps({"key_facts": _conform(KEY_FACTS_NUMBERS, schema["properties"]["key_facts"]),
+                                   "list_name": list_name}, ensure_ascii=False)
+            return json.dumps(_conform(KEY_FACTS_NUMBERS, schema), ensure_ascii=False)
+        return json.dumps(KEY_FACTS, ensure_ascii=False)
+    if "appropriate list" in system_content:
+        return list_name
+    if "data formatting system" in system_content:
+        match = re.search(r"ENTITIES TO ANALYZE: (.*)\n", user_content)
+        names = [name.strip() for name in match.group(1).split(";") if name.strip()] if match else []
+        return ",".join(names[:25]) or "Deutsche Bank AG"
+    return EMAIL
+
+
+class WindowLimit:
+    """At most ``limit`` requests per sliding ``window_seconds``, a limit of 0 lets everything through."""
+
+    def __init__(self, limit: int = 0, window_seconds: float = 1.0):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.times: Deque[float] = deque()
+        self.lock = threading.Lock()
+
+    def retry_after(self) -> Optional[float]:
+        """Records a request and returns None, or the seconds to wait if it exceeds the limit."""
+        if self.limit <= 0:
+            return None
+        with self.lock:
+            now = time.monotonic()
+            while self.times and now - self.times[0] >= self.window_seconds:
+                self.times.popleft()
+            if len(self.times) >= self.limit:
+                return self.window_seconds - (now - self.times[0])
+            self.times.append(now)
+            return None
+
+
+def embedding(text: str, dimensions: int = 256) -> List[float]:
+    """Hashed bag of words: texts sharing words get similar vectors, like real embeddings do on a small scale."""
+    vector = [0.0] * dimensions
+    for word in re.findall(r"\w+", text.lower()):
+        vector[zlib.crc32(word.encode("utf-8")) % dimensions] += 1.0
+    return vector
+
+
+def _conform(value: Any, schema: Dict[str, Any]) -> Any:
+    """Keeps only the properties of ``schema`` (like strict structured outputs), missing ones become null."""
+    if "properties" not in schema:
+        return value
+    value = value if isinstance(value, dict) else {}
+    return {name: _conform(value.get(name), sub_schema) for name, sub_schema in schema["properties"].items()}
+
+
+class FakeOpenAI:
+    """
+    Threaded HTTP server. A completion takes ``latency`` seconds plus ``token_latency`` seconds per 1000
+    uncached prompt and completion tokens, a batch completes after ``batch_delay`` seconds. More than
+    ``requests_per_minute`` chat and embedding requests are answered with 429 and a Retry-After header.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, batch_delay: float = 0.0,
+                 model: str = "gpt-4o", token_latency: float = 0.0, requests_per_minute: int = 0):
+        self.latency = latency
+        self.rate_limit = WindowLimit(requests_per_minute, 60.0)
+        self.rate_limited = 0
+        self.token_latency = token_latency
+        self.batch_delay = batch_delay
+        self.model = model
+        self.files: Dict[str, Tuple[str, bytes]] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self.ids = itertools.count(1)
+        self.prefixes: set = set()
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeOpenAI":
+        threading.Thread(target=self.server.serve_forever, name="fake-openai", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+    def cached_tokens(self, messages: List[Dict[str, str]]) -> int:
+        """
+        Imitates OpenAI's prompt caching: prompts of 1024 tokens and more are cached in steps of 128 tokens,
+        a request gets the longest prefix that an earlier request already sent.
+        """
+        prompt = json.dumps(messages, ensure_ascii=False)
+        step = 128 * 4
+        prefixes = [hash(prompt[:end]) for end in range(step, len(prompt) + 1, step)]
+        with self.lock:
+            cached = next((index + 1 for index in range(len(prefixes) - 1, -1, -1)
+                           if prefixes[index] in self.prefixes), 0)
+            self.prefixes.update(prefixes)
+        cached_tokens = cached * 128
+        return cached_tokens if cached_tokens >= 1024 else 0
+
+    def delay(self, usage: Dict[str, Any]) -> float:
+        tokens = usage["total_tokens"] - usage["prompt_tokens_details"]["cached_tokens"]
+        return self.latency + self.token_latency * tokens / 1000
+
+    def embeddings(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        tokens = sum(len(text) // 4 + 1 for text in texts)
+        return {
+            "object": "list",
+            "model": body.get("model", "text-embedding-3-small"),
+            "data": [{"object": "embedding", "index": index, "embedding": self._encode(embedding(text), body)}
+                     for index, text in enumerate(texts)],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    @staticmethod
+    def _encode(vector: List[float], body: Dict[str, Any]) -> Any:
+        # The SDK asks for base64 encoded float32 vectors when NumPy is installed
+        if body.get("encoding_format") == "base64":
+            return base64.b64encode(struct.pack(f"<{len(vector)}f", *vector)).decode("ascii")
+        return vector
+
+    def completion(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        content = answer(body["messages"], body.get("response_format"))
+        prompt_tokens = sum(len(message["content"]) for message in body["messages"]) // 4 + 1
+        completion_tokens = len(content) // 4 + 1
+        return {
+            "id": f"chatcmpl-{next(self.ids)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", self.model),
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens,
+                      "prompt_tokens_details": {"cached_tokens": self.cached_tokens(body["messages"])}},
+        }
+
+    def add_file(self, filename: str, content: bytes, purpose: str) -> Dict[str, Any]:
+        file_id = f"file-{next(self.ids)}"
+        with self.lock:
+            self.files[file_id] = (filename, content)
+        return {"id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+                "filename": filename, "purpose": purpose, "status": "processed"}
+
+    def create_batch(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        batch = {
+            "id": f"batch_{next(self.ids)}",
+            "object": "batch",
+            "endpoint": body["endpoint"],
+            "input_file_id": body["input_file_id"],
+            "completion_window": body["completion_window"],
+            "status": "in_progress",
+            "created_at": int(time.time()),
+            "output_file_id": None,
+            "error_file_id": None,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+        }
+        with self.lock:
+            self.batches[batch["id"]] = batch
+        threading.Timer(self.batch_delay, self._complete_batch, (batch["id"],)).start()
+        return batch
+
+    def _complete_batch(self, batch_id: str):
+        batch = self.batches[batch_id]
+        _, content = self.files[batch["input_file_id"]]
+        lines = []
+        for line in content.decode("utf-8").splitlines():
+            request = json.loads(line)
+            lines.append(json.dumps({
+                "id": f"batch_req_{next(self.ids)}",
+                "custom_id": request["custom_id"],
+                "response": {"status_code": 200, "request_id": "", "body": self.completion(request["body"])},
+                "error": None,
+            }, ensure_ascii=False))
+        output = self.add_file("batch_output.jsonl", "\n".join(lines).encode("utf-8"), "batch_output")
+        with self.lock:
+            batch.update(status="completed", output_file_id=output["id"], completed_at=int(time.time()),
+                         request_counts={"total": len(lines), "completed": len(lines), "failed": 0})
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: Any, content_type: str = "application/json"):
+                data = body if isinstance(body, bytes) else json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _body(self) -> bytes:
+                return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            def _rate_limited(self) -> bool:
+                retry_after = fake.rate_limit.retry_after()
+                if retry_after is None:
+                    return False
+                with fake.lock:
+                    fake.rate_limited += 1
+                data = json.dumps({"error": {"message": "Rate limit reached", "type": "requests",
+                                             "code": "rate_limit_exceeded"}}).encode("utf-8")
+                self.send_response(429)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("Retry-After", f"{retry_after:.3f}")
+                self.end_headers()
+                self.wfile.write(data)
+                return True
+
+            def do_POST(self):
+                if self.path in ("/v1/chat/completions", "/v1/embeddings") and self._rate_limited():
+                    return
+                if self.path == "/v1/chat/completions":
+                    body = json.loads(self._body())
+                    completion = fake.completion(body)
+                    time.sleep(fake.delay(completion["usage"]))
+                    if body.get("stream"):
+                        return self._stream(completion, (body.get("stream_options") or {}).get("include_usage"))
+                    return self._send(200, completion)
+                if self.path == "/v1/embeddings":
+                    time.sleep(fake.latency)
+                    return self._send(200, fake.embeddings(json.loads(self._body())))
+                if self.path == "/v1/files":
+                    fields = self._multipart(self._body())
+                    filename, content = fields["file"]
+                    return self._send(200, fake.add_file(filename or "upload.jsonl", content,
+                                                         fields["purpose"][1].decode()))
+                if self.path == "/v1/batches":
+                    return self._send(200, fake.create_batch(json.loads(self._body())))
+                self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+            def do_GET(self):
+                match = re.fullmatch(r"/v1/batches/([\w-]+)", self.path)
+                if match and match.group(1) in fake.batches:
+                    with fake.lock:
+                        return self._send(200, dict(fake.batches[match.group(1)]))
+                match = re.fullmatch(r"/v1/files/([\w-]+)/content", self.path)
+                if match and match.group(1) in fake.files:
+                    return self._send(200, fake.files[match.group(1)][1], "application/octet-stream")
+                self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+            def _stream(self, completion: Dict[str, Any], include_usage: bool = False):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                content = completion["choices"][0]["message"]["content"]
+                for start in range(0, len(content), 16):
+                    chunk = {"id": completion["id"], "object": "chat.completion.chunk", "created": completion["created"],
+                             "model": completion["model"],
+                             "choices": [{"index": 0, "delta": {"content": content[start:start + 16]},
+                                          "finish_reason": None}]}
+                    self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+                if include_usage:
+                    chunk = {"id": completion["id"], "object": "chat.completion.chunk", "created": completion["created"],
+                             "model": completion["model"], "choices": [], "usage": completion["usage"]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.write(b"data: [DONE]\n\n")
+
+            def _multipart(self, body: bytes) -> Dict[str, Tuple[Optional[str], bytes]]:
+                header = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8")
+                message = email.parser.BytesParser(policy=email.policy.default).parsebytes(header + body)
+                return {part.get_param("name", header="content-disposition"):
+                        (part.get_filename(), part.get_payload(decode=True)) for part in message.iter_parts()}
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per chat completion")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Seconds per 1000 uncached tokens")
+    parser.add_argument("--batch-delay", type=float, default=0.0, help="Seconds until a batch is completed")
+    parser.add_argument("--requests-per-minute", type=int, default=0, help="Rate limit, 0 for none")
+    args = parser.parse_args()
+
+    fake_openai = FakeOpenAI(args.host, args.port, args.latency, args.batch_delay, token_latency=args.token_latency,
+                             requests_per_minute=args.requests_per_minute)
+    print(f"Fake OpenAI API listening on {fake_openai.base_url}")
+    fake_openai.server.serve_forever()
@@ -0,0 +1,164 @@
+"""
+End-to-end benchmark of the upload pipeline: starts the fake OpenAI and HubSpot APIs with the given latency,
+rate limits and list sizes, serves the app against them, uploads synthetic exposé PDFs to /upload from
+concurrent clients and polls /progress until every exposé is done.
+
+Reports p50/p95/p99 per pipeline stage (from the timings of each TaskResult), the time spent queued and end to
+end, and the throughput in exposés per minute. Run it before and after a change to see what it buys:
+
+    python benchmarks/pipeline.py --exposes 50 --clients 8 --openai-latency 0.5 --hubspot-latency 0.1
+    python benchmarks/pipeline.py --hubspot-requests-per-second 10 --openai-requests-per-minute 500 --json out.json
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+import requests
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.combined_call import percentile  # noqa: E402
+from benchmarks.exposes import make_expose  # noqa: E402
+from benchmarks.fake_hubspot import FakeHubspot  # noqa: E402
+from benchmarks.fake_openai import FakeOpenAI  # noqa: E402
+
+STAGES = ["text", "document", "lists", "key_facts_and_selection", "key_facts", "selection", "members",
+          "curated_member", "email", "total", "queued", "end_to_end"]
+
+
+def serve_app(environment: Dict[str, str]) -> Any:
+    """Serves the app configured by ``environment`` on a free port, returns the werkzeug server."""
+    os.environ.update(environment)
+    # Templates are loaded relative to the working directory
+    os.chdir(REPO_ROOT)
+    from flask import Flask
+    from werkzeug.serving import make_server
+
+    from config import Config
+    from router import create_routes
+
+    app = Flask("benchmark")
+    create_routes(app, Config())
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="benchmark-app", daemon=True).start()
+    return server
+
+
+def process(base_url: str, index: int, pages: int, poll_seconds: float) -> Dict[str, Any]:
+    pdf = make_expose(index, pages)
+    started_at = time.perf_counter()
+    while True:
+        response = requests.post(f"{base_url}/upload", files={"file": (f"expose_{index}.pdf", pdf)})
+        if response.status_code != 429:
+            break
+        # The queue is full, the configured Retry-After is meant for people, poll faster
+        time.sleep(min(1.0, float(response.headers.get("Retry-After", 1))))
+    response.raise_for_status()
+    task_id = response.json()["task_id"]
+
+    while True:
+        progress = requests.get(f"{base_url}/progress/{task_id}").json()
+        if progress["percent"] == 100:
+            break
+        time.sleep(poll_seconds)
+
+    timings = dict(progress.get("timings") or {})
+    timings["end_to_end"] = time.perf_counter() - started_at
+    if "total" in timings:
+        timings["queued"] = max(0.0, timings["end_to_end"] - timings["total"])
+    return {"index": index, "status": progress["status"], "timings": timings}
+
+
+def summarize(results: List[Dict[str, Any]], seconds: float) -> Dict[str, Any]:
+    stages = {}
+    for stage in STAGES:
+        values = [result["timings"][stage] for result in results if stage in result["timings"]]
+        if values:
+            stages[stage] = {"count": len(values), "mean": statistics.fmean(values), "p50": percentile(values, 50),
+                             "p95": percentile(values, 95), "p99": percentile(values, 99)}
+    return {
+        "exposes": len(results),
+        "errors": sum(1 for result in results if result["status"].startswith("Error")),
+        "seconds": seconds,
+        "exposes_per_minute": len(results) * 60 / seconds if seconds else 0.0,
+        "stages": stages,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--exposes", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=4, help="Pages per synthetic exposé")
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent uploading clients")
+    parser.add_argument("--poll-seconds", type=float, default=0.1)
+    parser.add_argument("--openai-latency", type=float, default=0.5, help="Seconds per completion")
+    parser.add_argument("--openai-token-latency", type=float, default=0.05, help="Seconds per 1000 tokens")
+    parser.add_argument("--openai-requests-per-minute", type=int, default=0, help="Rate limit, 0 for none")
+    parser.add_argument("--hubspot-latency", type=float, default=0.1, help="Seconds per request")
+    parser.add_argument("--hubspot-requests-per-second", type=int, default=0, help="Rate limit, 0 for none")
+    parser.add_argument("--hubspot-requests-per-10-seconds", type=int, default=0, help="Rate limit, 0 for none")
+    parser.add_argument("--lists", type=int, default=10)
+    parser.add_argument("--members", type=int, default=500, help="Members per list")
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="Show the log of the app")
+    args = parser.parse_args()
+
+    fake_openai = FakeOpenAI(latency=args.openai_latency, token_latency=args.openai_token_latency,
+                             requests_per_minute=args.openai_requests_per_minute).start()
+    fake_hubspot = FakeHubspot(latency=args.hubspot_latency, lists=args.lists, members=args.members,
+                               requests_per_second=args.hubspot_requests_per_second,
+                               requests_per_10_seconds=args.hubspot_requests_per_10_seconds).start()
+    directory = tempfile.mkdtemp(prefix="pipeline-benchmark-")
+    # Fresh caches, mirror and list index per run, the settings not given here come from .env and Config
+    server = serve_app({
+        "OPENAI_BASE_URL": fake_openai.base_url, "OPENAI_API_KEY": "fake",
+        "HUBSPOT_BASE_URL": fake_hubspot.base_url, "HUBSPOT_API_KEY": "fake",
+        "JOB_QUEUE_SIZE": str(max(args.exposes, 50)),
+        "TASK_STORE_PATH": os.path.join(directory, "tasks.sqlite3"),
+        "RESULT_CACHE_PATH": os.path.join(directory, "result_cache.sqlite3"),
+        "HUBSPOT_MIRROR_PATH": os.path.join(directory, "hubspot_mirror.sqlite3"),
+        "LIST_CATALOG_PATH": os.path.join(directory, "list_catalog.json"),
+        "LIST_INDEX_PATH": os.path.join(directory, "list_index.npz"),
+    })
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as executor:
+        results = list(executor.map(lambda index: process(base_url, index, args.pages, args.poll_seconds),
+                                    range(args.exposes)))
+    summary = summarize(results, time.perf_counter() - started_at)
+    summary["openai"] = {"rate_limited": fake_openai.rate_limited,
+                         "usage": requests.get(f"{base_url}/cache/stats").json().get("prompt_cache", {})}
+    summary["hubspot"] = {"requests": dict(fake_hubspot.requests), "rate_limited": fake_hubspot.rate_limited}
+
+    server.shutdown()
+    fake_openai.stop()
+    fake_hubspot.stop()
+
+    print(f"{summary['exposes']} exposés of {args.pages} pages, {args.clients} clients, {summary['errors']} errors")
+    print(f"{summary['exposes_per_minute']:.1f} exposés/minute ({summary['seconds']:.1f} s)")
+    print(f"{'stage':<26}{'mean s':>9}{'p50 s':>9}{'p95 s':>9}{'p99 s':>9}")
+    for stage, values in summary["stages"].items():
+        print(f"{stage:<26}{values['mean']:>9.3f}{values['p50']:>9.3f}{values['p95']:>9.3f}{values['p99']:>9.3f}")
+    print(f"OpenAI: {fake_openai.rate_limited} requests rate limited")
+    print(f"HubSpot: {sum(fake_hubspot.requests.values())} requests, {fake_hubspot.rate_limited} rate limited")
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(summary, file, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import logging
+import os
+import sys
+
+from flask import Flask
+
+from batch_processor import BatchProcessor
+from config import Config
+from router import Router
+
+
+def run_batch(args: argparse.Namespace) -> int:
+    files = sorted((name, os.path.join(args.directory, name)) for name in os.listdir(args.directory)
+                   if name.lower().endswith(".pdf") and os.path.isfile(os.path.join(args.directory, name)))
+    if not files:
+        print(f"No PDF files found in {args.directory}", file=sys.stderr)
+        return 1
+
+    output_format = args.format or ("csv" if args.output.lower().endswith(".csv") else "jsonl")
+    config = Config()
+    if args.concurrency:
+        config.BATCH_CONCURRENCY = args.concurrency
+
+    router = Router(Flask(__name__), config)
+    processor = router.batch_processor
+    batch_id = processor.create(files, offline=args.offline)
+    processor.run(batch_id, on_done=lambda row: logging.info(f"{row['filename']}: {row['status']}"))
+
+    with open(args.output, "w", encoding="utf-8", newline="") as file:
+        BatchProcessor.write_rows(processor.rows(batch_id), file, output_format)
+
+    status = processor.status(batch_id)
+    print(f"Processed {status['completed']} exposés ({status['failed']} failed) in {status['elapsed_seconds']} s, "
+          f"{status['exposes_per_minute']} exposés/minute. Results written to {args.output}")
+    return 0 if status['failed'] == 0 else 2
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Real estate exposé processor")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    batch = subparsers.add_parser("batch", help="Process every PDF of a directory")
+    batch.add_argument("directory")
+    batch.add_argument("-o", "--output", default="results.jsonl", help="JSONL or CSV file for the results")
+    batch.add_argument("--format", choices=("jsonl", "csv"), help="Defaults to the extension of --output")
+    batch.add_argument("--concurrency", type=int, help="Exposés processed at once (BATCH_CONCURRENCY)")
+    batch.add_argument("--offline", action="store_true",
+                       help="Run the GPT requests as OpenAI Batch API jobs (cheaper, results within 24 hours)")
+    batch.set_defaults(handler=run_batch)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,4 @@
+from typing import Dict, Optional
 from pydantic.v1 import BaseSettings
 
 
@@ -5,6 +6,66 @@ class Config(BaseSettings):
     HUBSPOT_API_KEY: str
     OPENAI_API_KEY: str
     FLASK_SECRET_KEY: str = "a_default_secret_key"
+    PIPELINE_MAX_WORKERS: int = 4
+    WORKER_POOL_SIZE: int = 4
+    JOB_QUEUE_SIZE: int = 50
+    JOB_RETRY_AFTER_SECONDS: int = 30
+    BATCH_CONCURRENCY: int = 4
+    BATCH_PRIORITY: int = 10
+    # Offline batches running at once, further ones wait for a free slot
+    BATCH_OFFLINE_CONCURRENCY: int = 2
+    SSE_POLL_SECONDS: float = 0.5
+    SSE_MAX_SECONDS: int = 300
+    TASK_STORE_BACKEND: str = "memory"
+    TASK_STORE_PATH: str = "tasks.sqlite3"
+    TASK_TTL_SECONDS: int = 3600
+    TASK_MAX_ENTRIES: int = 1000
+    RESULT_CACHE_MAX_ENTRIES: int = 256
+    RESULT_CACHE_PATH: Optional[str] = "result_cache.sqlite3"
+    RESULT_CACHE_DISK_MAX_ENTRIES: int = 5000
+    HUBSPOT_BASE_URL: str = "https://api.hubapi.com"
+    HUBSPOT_MAX_WORKERS: int = 4
+    HUBSPOT_REQUESTS_PER_SECOND: int = 10
+    HUBSPOT_REQUESTS_PER_10_SECONDS: int = 100
+    MEMBER_RANK_TOP_N: int = 100
+    MEMBER_RANK_HALF_LIFE_DAYS: float = 180.0
+    # HubSpot property -> weight in the local member score, e.g. '{"num_associated_deals": 1.0}'
+    MEMBER_RANK_PROPERTIES: Dict[str, float] = {}
+    HUBSPOT_MIRROR_PATH: Optional[str] = "hubspot_mirror.sqlite3"
+    HUBSPOT_MIRROR_SYNC_SECONDS: int = 300
+    HUBSPOT_MIRROR_FULL_RESYNC_SECONDS: int = 21600
+    LIST_CATALOG_TTL_SECONDS: int = 900
+    LIST_CATALOG_PATH: Optional[str] = "list_catalog.json"
+    # Embedding index for list selection, GPT picks the list as before if it is disabled
+    LIST_INDEX_ENABLED: bool = True
+    LIST_INDEX_PATH: Optional[str] = "list_index.npz"
+    LIST_INDEX_MIN_SCORE: float = 0.3
+    LIST_INDEX_MARGIN: float = 0.05
+    LIST_INDEX_CANDIDATES: int = 10
+    # Processes extracting PDF text, at least one while PDF_PAGE_TIMEOUT_SECONDS is set. A timeout of 0 extracts
+    # small documents, and all documents with PDF_WORKERS <= 1, in the web worker itself
+    PDF_WORKERS: int = 0
+    PDF_CHUNK_PAGES: int = 8
+    PDF_MAX_PAGES: Optional[int] = 200
+    PDF_PAGE_TIMEOUT_SECONDS: float = 10.0
+    OPENAI_BASE_URL: Optional[str] = None
+    OPENAI_MAX_CONCURRENCY: int = 16
+    OPENAI_TOKENS_PER_MINUTE: int = 30000
+    OPENAI_BATCH_POLL_SECONDS: float = 30.0
+    OPENAI_BATCH_COMPLETION_WINDOW: str = "24h"
+    OPENAI_EMBEDDING_MODEL: str = "text-embedding-3-small"
+    GPT_MODEL: str = "gpt-4o"
+    # Prompt name -> model, e.g. GPT_MODEL_ROUTES='{"select_list": "gpt-4o-mini"}'. Prompts without a route
+    # and responses of a routed model that fail validation go to GPT_MODEL
+    GPT_MODEL_ROUTES: Dict[str, str] = {"select_list": "gpt-4o-mini", "curate_members": "gpt-4o-mini"}
+    GPT_TEXT_TOKEN_BUDGET: int = 6000
+    KEY_FACTS_LOCAL_CONFIDENCE: float = 0.8
+    GPT_STRUCTURED_KEY_FACTS: bool = True
+    GPT_COMBINED_KEY_FACTS_AND_LIST: bool = False
+    GPT_CURATION_CHUNK_TOKENS: int = 4000
+    GPT_CURATION_WORKERS: int = 4
+    GPT_STREAM_EMAIL: bool = True
+    EMAIL_STREAM_FLUSH_SECONDS: float = 0.25
 
     class Config:
         env_file = ".env"
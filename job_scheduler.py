@@ -0,0 +1,94 @@
+import heapq
+import itertools
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    pass
+
+
+@dataclass(order=True)
+class Job:
+    priority: int
+    sequence: int
+    job_id: str = field(compare=False)
+    func: Callable[..., Any] = field(compare=False)
+    args: Tuple[Any, ...] = field(compare=False, default_factory=tuple)
+
+
+class JobScheduler:
+    """
+    Bounded worker pool fed by a priority queue.
+
+    Jobs with a lower ``priority`` value run first, jobs of equal priority in submission order.
+    ``submit`` raises QueueFullError once ``max_queue_size`` jobs are waiting, so callers can push back
+    instead of piling up threads.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue_size: int = 100):
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.queue: List[Job] = []
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.workers: List[threading.Thread] = []
+        self.running = True
+
+    def submit(self, job_id: str, func: Callable[..., Any], *args: Any, priority: int = 0) -> int:
+        """Queues a job and returns its 1-based position in the queue."""
+        with self.condition:
+            if not self.running:
+                raise RuntimeError("Scheduler is shut down")
+            if len(self.queue) >= self.max_queue_size:
+                raise QueueFullError(f"Job queue is full ({self.max_queue_size} jobs waiting)")
+            job = Job(priority=priority, sequence=next(self.counter), job_id=job_id, func=func, args=args)
+            heapq.heappush(self.queue, job)
+            self._ensure_workers()
+            self.condition.notify()
+            return self._position(job)
+
+    def get_position(self, job_id: str) -> Optional[int]:
+        """Returns the 1-based queue position of a waiting job, or None if it is running or unknown."""
+        with self.condition:
+            job = next((job for job in self.queue if job.job_id == job_id), None)
+            return self._position(job) if job else None
+
+    def queue_size(self) -> int:
+        with self.condition:
+            return len(self.queue)
+
+    def shutdown(self, wait: bool = True):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if wait:
+            for worker in self.workers:
+                worker.join()
+
+    def _position(self, job: Job) -> int:
+        return sum(1 for other in self.queue if other < job) + 1
+
+    def _ensure_workers(self):
+        self.workers = [worker for worker in self.workers if worker.is_alive()]
+        while len(self.workers) < self.max_workers:
+            worker = threading.Thread(target=self._work, name=f"job-worker-{len(self.workers)}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def _work(self):
+        while True:
+            with self.condition:
+                while self.running and not self.queue:
+                    self.condition.wait()
+                if not self.queue:
+                    return
+                job = heapq.heappop(self.queue)
+            try:
+                job.func(*job.args)
+            except Exception as e:
+                logger.error(f"Job {job.job_id} failed: {str(e)}")
@@ -0,0 +1,160 @@
+"""
+Process-wide counters and histograms in the Prometheus text format, served at /metrics.
+
+The metrics are plain module-level objects, services import the ones they record. Under gunicorn every worker
+process keeps its own values, scrape the workers individually or run a single worker with threads.
+"""
+import bisect
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+from urllib.parse import urlparse
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Seconds, from a PDF page to a curation of a large list
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class Metric(ABC):
+    TYPE = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"Metric {self.name} takes the labels {', '.join(self.label_names)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _labels(self, key: Tuple[str, ...], *extra: Tuple[str, str]) -> str:
+        pairs = list(zip(self.label_names, key)) + list(extra)
+        if not pairs:
+            return ""
+        escaped = (value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+        return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        pass
+
+    def expose(self) -> str:
+        return "\n".join([f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.TYPE}",
+                          *self.samples()])
+
+
+class Counter(Metric):
+    TYPE = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self.lock:
+            values = sorted(self.values.items())
+        return [f"{self.name}{self._labels(key)} {_format(value)}" for key, value in values]
+
+
+class Histogram(Metric):
+    TYPE = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: observations per bucket (not cumulative, the last one is +Inf), sum and count
+        self.values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self.lock:
+            counts, total = self.values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observes the wall time of the ``with`` block, also when it raises."""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at, **labels)
+
+    def samples(self) -> List[str]:
+        with self.lock:
+            values = sorted((key, (list(counts), total[0])) for key, (counts, total) in self.values.items())
+
+        lines = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip([*self.buckets, math.inf], counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._labels(key, ('le', _format(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_format(total)}")
+            lines.append(f"{self.name}_count{self._labels(key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self.metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, label_names))
+
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, label_names, buckets))
+
+    def expose(self) -> str:
+        return "\n".join(metric.expose() for metric in self.metrics.values()) + "\n"
+
+
+def _format(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def endpoint(url: str) -> str:
+    """The path of ``url`` with ids replaced by {id}, so every list or record shares one label value."""
+    parts = urlparse(url).path.strip("/").split("/")
+    return "/" + "/".join("{id}" if part.isdigit() else part for part in parts)
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "expose_stage_seconds", "Wall time of a pipeline stage per exposé, stage total is the whole pipeline",
+    ["stage"])
+EXPOSES = REGISTRY.counter("exposes_processed_total", "Processed exposés by outcome", ["status"])
+OPENAI_REQUEST_SECONDS = REGISTRY.histogram(
+    "openai_request_seconds", "Wall time of an OpenAI request including SDK retries", ["prompt", "model"])
+OPENAI_TOKENS = REGISTRY.counter(
+    "openai_tokens_total", "Tokens reported in the usage of OpenAI responses, cached is part of prompt",
+    ["prompt", "model", "type"])
+OPENAI_RETRIES = REGISTRY.counter(
+    "openai_retries_total", "OpenAI requests repeated: escalated to the main model or retried after an invalid "
+    "response by the app, after a 429 or 5xx status by the SDK", ["reason"])
+HUBSPOT_REQUEST_SECONDS = REGISTRY.histogram(
+    "hubspot_request_seconds", "Wall time of a HubSpot request (page or batch) including rate limit waits and "
+    "retries", ["method", "endpoint"])
+HUBSPOT_RETRIES = REGISTRY.counter("hubspot_retries_total", "HubSpot requests retried after a 429", ["endpoint"])
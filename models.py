@@ -10,6 +10,8 @@ class HubSpotObjectBase:
     lastmodifieddate: str
     lifecycle_stage: str
     associations: str = ""
+    # Further HubSpot properties requested for the member ranking, by property name
+    properties: Dict[str, str] = field(default_factory=dict)
 
 
 @dataclass
@@ -27,6 +29,7 @@ class Company(HubSpotObjectBase):
 class ListInfo(BaseModel):
     name: str
     listId: str
+    objectTypeId: str = ""
 
 
 class Address(BaseModel):
@@ -39,13 +42,14 @@ class Address(BaseModel):
 
 class KeyFacts(BaseModel):
     address: Address = Field(default_factory=Address)
-    purchase_price: Optional[int | float | str] = Field(default="missing")
-    price_per_square: Optional[int | float | str] = Field(default="missing")
-    usable_area: Optional[int | float | str] = Field(default="missing")
-    plot_size: Optional[int | float | str] = Field(default="missing")
-    residential_units: Optional[int | float | str] = Field(default="missing")
-    rental_income: Optional[int | float | str] = Field(default="missing")
-    wault: Optional[int | float | str] = Field(default="missing")
+    # Plain numbers in Euro, m² and years, None if not found; formatted for display by the result template
+    purchase_price: Optional[int | float] = None
+    price_per_square: Optional[int | float] = None
+    usable_area: Optional[int | float] = None
+    plot_size: Optional[int | float] = None
+    residential_units: Optional[int] = None
+    rental_income: Optional[int | float] = None
+    wault: Optional[int | float] = None
 
 
 class TaskProgress(BaseModel):
@@ -61,3 +65,5 @@ class TaskResult(BaseModel):
     selected_companies: List[Company] = Field(default_factory=list)
     curated_member: List[str] = Field(default_factory=list)
     email: Optional[str] = Field(default="")
+    # Wall time in seconds per pipeline stage and in total, empty for cached results
+    timings: Dict[str, float] = Field(default_factory=dict)
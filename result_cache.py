@@ -0,0 +1,98 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from sqlite_connection import ThreadLocalConnection
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """
+    Content-addressed cache of pipeline results.
+
+    Entries are keyed by the SHA-256 of the PDF plus a version string (prompt version and model), so a
+    prompt or model change invalidates everything. A bounded in-memory LRU sits in front of an optional
+    SQLite file that keeps up to ``disk_max_entries`` entries, also evicted least recently used first.
+    """
+
+    def __init__(self, max_entries: int = 256, path: Optional[str] = None, disk_max_entries: int = 5000):
+        self.max_entries = max_entries
+        self.path = path
+        self.disk_max_entries = disk_max_entries
+        self.memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self._connection = ThreadLocalConnection(path) if path else None
+        self.hits = 0
+        self.misses = 0
+        if self.path:
+            connection = self._connection()
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, data TEXT NOT NULL, last_access REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS idx_results_last_access ON results (last_access)")
+
+    @staticmethod
+    def make_key(pdf_content: bytes, version: str) -> str:
+        return f"{hashlib.sha256(pdf_content).hexdigest()}:{version}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        if self.path:
+            connection = self._connection()
+            row = connection.execute("SELECT data FROM results WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                connection.execute("UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key))
+                entry = json.loads(row[0])
+                with self.lock:
+                    self.hits += 1
+                    self._remember(key, entry)
+                return entry
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, entry: Dict[str, Any]):
+        with self.lock:
+            self._remember(key, entry)
+        if self.path:
+            connection = self._connection()
+            connection.execute(
+                "INSERT OR REPLACE INTO results (key, data, last_access) VALUES (?, ?, ?)",
+                (key, json.dumps(entry), time.time())
+            )
+            connection.execute(
+                "DELETE FROM results WHERE key IN ("
+                "SELECT key FROM results ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.disk_max_entries,)
+            )
+
+    def _remember(self, key: str, entry: Dict[str, Any]):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            stats = {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'memory_entries': len(self.memory),
+            }
+        if self.path:
+            stats['disk_entries'] = self._connection().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return stats
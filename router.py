@@ -1,16 +1,33 @@
 import ast
+import io
+import json
 import logging
-from typing import List, Tuple
-from flask import Flask, request, jsonify
+import shutil
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+from flask import Flask, Response, request, jsonify, stream_with_context
 import uuid
-import threading
 
 from jinja2 import Environment, FileSystemLoader
 
+from batch_processor import BatchProcessor
 from config import Config
+from job_scheduler import JobScheduler, QueueFullError
+from metrics import CONTENT_TYPE, EXPOSES, REGISTRY, STAGE_SECONDS
+from result_cache import ResultCache
 from services.gpt_service import GPTService
+from services.hubspot_mirror import HubspotMirror
 from services.hubspot_service import HubspotService
+from services.key_fact_extractor import KeyFactExtractor
+from services.list_catalog import ListCatalog
+from services.list_index import ListIndex
+from services.member_ranker import MemberRanker
+from services.openai_batch_service import OpenAIBatchService
+from services.text_reducer import TextReducer
 from models import ListInfo, Contact, Company, KeyFacts, TaskResult
+from task_graph import TaskGraph
 from task_manager import TaskManager
 from util import Util
 
@@ -18,20 +35,71 @@ logger = logging.getLogger(__name__)
 
 
 class Router:
+    STAGE_MESSAGES = {
+        "text": "Extracting text from PDF ...",
+        "document": "Selecting relevant sections of the exposé ...",
+        "lists": "Loading HubSpot lists ...",
+        "key_facts": "Extracting key facts ...",
+        "key_facts_and_selection": "Extracting key facts and selecting list with GPT ...",
+        "selection": "Analyze text and start selection of list with GPT ...",
+        "members": "Getting details of list members from HubSpot ...",
+        "curated_member": "Curating top 25 performer ...",
+        "email": "Generating email with GPT ...",
+    }
+
     def __init__(self, app: Flask, config: Config):
         self.app = app
         self.config = config
-        self.task_manager = TaskManager()
-        self.hubspot_service = HubspotService(access_token=config.HUBSPOT_API_KEY)
+        self.task_manager = TaskManager.from_config(config)
+        self.scheduler = JobScheduler(max_workers=config.WORKER_POOL_SIZE, max_queue_size=config.JOB_QUEUE_SIZE)
+        self.hubspot_service = HubspotService(access_token=config.HUBSPOT_API_KEY,
+                                              max_workers=config.HUBSPOT_MAX_WORKERS,
+                                              requests_per_second=config.HUBSPOT_REQUESTS_PER_SECOND,
+                                              requests_per_10_seconds=config.HUBSPOT_REQUESTS_PER_10_SECONDS,
+                                              extra_properties=["lifecyclestage", *config.MEMBER_RANK_PROPERTIES],
+                                              base_url=config.HUBSPOT_BASE_URL)
+        self.hubspot_mirror = HubspotMirror(self.hubspot_service, path=config.HUBSPOT_MIRROR_PATH,
+                                            sync_seconds=config.HUBSPOT_MIRROR_SYNC_SECONDS,
+                                            full_resync_seconds=config.HUBSPOT_MIRROR_FULL_RESYNC_SECONDS) \
+            if config.HUBSPOT_MIRROR_PATH else None
+        self.list_catalog = ListCatalog(self.hubspot_service.get_lists, ttl_seconds=config.LIST_CATALOG_TTL_SECONDS,
+                                        path=config.LIST_CATALOG_PATH)
         self.gpt_service = GPTService(config)
+        self.list_index = ListIndex(self.gpt_service.embed, model=config.OPENAI_EMBEDDING_MODEL,
+                                    path=config.LIST_INDEX_PATH, min_score=config.LIST_INDEX_MIN_SCORE,
+                                    margin=config.LIST_INDEX_MARGIN, candidates=config.LIST_INDEX_CANDIDATES) \
+            if config.LIST_INDEX_ENABLED else None
+        if self.list_index is not None:
+            self.list_catalog.add_listener(self.list_index.update_in_background)
+        self.openai_batch_service = OpenAIBatchService(self.gpt_service, poll_seconds=config.OPENAI_BATCH_POLL_SECONDS,
+                                                       completion_window=config.OPENAI_BATCH_COMPLETION_WINDOW,
+                                                       fallback_workers=config.OPENAI_MAX_CONCURRENCY)
+        self.text_reducer = TextReducer(token_budget=config.GPT_TEXT_TOKEN_BUDGET)
+        self.key_fact_extractor = KeyFactExtractor()
+        self.member_ranker = MemberRanker(property_weights=config.MEMBER_RANK_PROPERTIES,
+                                          half_life_days=config.MEMBER_RANK_HALF_LIFE_DAYS)
         self.util = Util(config)
+        self.result_cache = ResultCache(max_entries=config.RESULT_CACHE_MAX_ENTRIES, path=config.RESULT_CACHE_PATH,
+                                        disk_max_entries=config.RESULT_CACHE_DISK_MAX_ENTRIES)
+        self.batch_processor = BatchProcessor(self.process_pdf_and_select_list, self.task_manager,
+                                              concurrency=config.BATCH_CONCURRENCY,
+                                              process_offline=self.process_pdfs_offline,
+                                              keepalive_seconds=config.TASK_TTL_SECONDS / 4,
+                                              offline_concurrency=config.BATCH_OFFLINE_CONCURRENCY)
         self.jinja_env = Environment(loader=FileSystemLoader('templates'))
+        self.jinja_env.filters['key_fact'] = KeyFactExtractor.display
         self.setup_routes()
 
     def setup_routes(self):
         self.app.route('/', methods=['GET'])(self.index)
         self.app.route('/upload', methods=['POST'])(self.upload_file)
         self.app.route('/progress/<task_id>')(self.get_progress)
+        self.app.route('/progress/<task_id>/stream')(self.stream_progress)
+        self.app.route('/cache/stats', methods=['GET'])(self.get_cache_stats)
+        self.app.route('/metrics', methods=['GET'])(self.get_metrics)
+        self.app.route('/batch', methods=['POST'])(self.upload_batch)
+        self.app.route('/batch/<batch_id>', methods=['GET'])(self.get_batch)
+        self.app.route('/batch/<batch_id>/results', methods=['GET'])(self.get_batch_results)
 
     def index(self):
         return self.render_template('upload.html')
@@ -44,102 +112,505 @@ class Router:
         if file and self.util.allowed_file(file.filename):
             task_id = str(uuid.uuid4())
             pdf_content = file.read()
-            threading.Thread(target=self.process_pdf_and_select_list, args=(task_id, pdf_content)).start()
-            return jsonify({'task_id': task_id}), 202
+            cache_key = self.cache_key(pdf_content)
 
-        return jsonify({'error': 'Invalid file type'}), 400
+            if self.serve_cached(task_id, cache_key):
+                return jsonify({'task_id': task_id, 'cached': True}), 200
 
-    def get_progress(self, task_id):
-        progress = self.task_manager.get_progress(task_id)
+            self.task_manager.update_progress(task_id, "Queued", 0)
+            try:
+                position = self.scheduler.submit(task_id, self.process_pdf_and_select_list, task_id, pdf_content,
+                                                 cache_key, priority=self.request_priority(0))
+            except QueueFullError as e:
+                logger.warning(f"Rejected upload: {str(e)}")
+                self.task_manager.remove_task(task_id)
+                return self.queue_full_response()
 
-        if progress['percent'] == 100:
-            results = self.task_manager.get_results(task_id)
-            return jsonify({**progress, 'results': self.render_template('result.html', results=results)})
+            return jsonify({'task_id': task_id, 'queue_position': position}), 202
 
-        return jsonify(progress)
+        return jsonify({'error': 'Invalid file type'}), 400
+
+    def upload_batch(self):
+        uploads = [file for file in request.files.getlist('files') + request.files.getlist('file') if file.filename]
+        if not uploads:
+            return jsonify({'error': 'No file selected'}), 400
 
-    def process_pdf_and_select_list(self, task_id: str, pdf_content: bytes):
         try:
-            self.task_manager.update_progress(task_id, "Extracting text from PDF...", 10)
-            text = self.util.extract_text_from_pdf(pdf_content)
+            directory, files = BatchProcessor.spool((file.filename, file.stream) for file in uploads)
+        except zipfile.BadZipFile:
+            return jsonify({'error': 'Invalid ZIP archive'}), 400
+        if not files:
+            shutil.rmtree(directory, ignore_errors=True)
+            return jsonify({'error': 'No PDF files found'}), 400
+
+        batch_id = self.batch_processor.create(files, directory, offline=request.form.get('mode') == 'offline')
+        if self.batch_processor.is_offline(batch_id):
+            # Mostly waiting for OpenAI, which must not block a scheduler worker for up to 24 hours
+            self.batch_processor.start(batch_id)
+            return jsonify({'batch_id': batch_id, 'files': len(files)}), 202
 
-            if not text:
-                raise ValueError("Failed to extract text from PDF")
+        try:
+            position = self.scheduler.submit(batch_id, self.batch_processor.run, batch_id,
+                                             priority=self.request_priority(self.config.BATCH_PRIORITY))
+        except QueueFullError as e:
+            logger.warning(f"Rejected batch: {str(e)}")
+            self.batch_processor.remove(batch_id)
+            return self.queue_full_response()
+
+        return jsonify({'batch_id': batch_id, 'files': len(files), 'queue_position': position}), 202
+
+    @staticmethod
+    def request_priority(highest: int) -> int:
+        """
+        Scheduler priority from the ``priority`` form field, lower runs first. Clients can only defer their
+        jobs, a value below ``highest`` (0 for uploads, BATCH_PRIORITY for batches) is raised to it.
+        """
+        return max(highest, request.form.get('priority', highest, type=int))
+
+    def queue_full_response(self):
+        response = jsonify({'error': 'Too many exposés in progress, please try again later'})
+        response.headers['Retry-After'] = str(self.config.JOB_RETRY_AFTER_SECONDS)
+        return response, 429
+
+    def get_batch(self, batch_id):
+        status = self.batch_processor.status(batch_id)
+        if status is None:
+            return jsonify({'error': 'Batch not found'}), 404
+
+        queue_position = self.scheduler.get_position(batch_id)
+        if queue_position is not None:
+            status['queue_position'] = queue_position
+        return jsonify(status)
+
+    def get_batch_results(self, batch_id):
+        if self.batch_processor.status(batch_id) is None:
+            return jsonify({'error': 'Batch not found'}), 404
+
+        output_format = request.args.get('format', 'jsonl')
+        if output_format not in ('jsonl', 'csv'):
+            return jsonify({'error': 'Unknown format, use jsonl or csv'}), 400
+
+        output = io.StringIO()
+        BatchProcessor.write_rows(self.batch_processor.rows(batch_id), output, output_format)
+        mimetype = 'text/csv' if output_format == 'csv' else 'application/x-ndjson'
+        return Response(output.getvalue(), mimetype=mimetype,
+                        headers={'Content-Disposition': f'attachment; filename=batch-{batch_id}.{output_format}'})
 
-            key_facts = self.extract_key_facts(task_id, text)
-            selected_list_name, selected_list_id = self.select_list(task_id, text)
-            contacts, companies = self.get_members(task_id, selected_list_id)
+    def get_progress(self, task_id):
+        progress = self.task_manager.get_progress(task_id)
 
-            curated_member = ""
+        queue_position = self.scheduler.get_position(task_id)
+        if queue_position is not None:
+            return jsonify({**progress, 'queue_position': queue_position})
+
+        if progress['percent'] == 100:
+            timings = self.task_manager.get_results(task_id).get('timings', {})
+            return jsonify({**progress, 'results': self.render_results(task_id), 'timings': timings})
 
-            if len(contacts) > 0:
-                curated_member = self.curate_member(task_id, "; ".join(f"{contact.firstname}{contact.lastname}" for contact in contacts))
-            elif len(companies) > 0:
-                curated_member = self.curate_member(task_id, "; ".join(f"{company.name}" for company in companies))
+        partial_email = self.task_manager.get_partial_email(task_id)
+        if partial_email:
+            return jsonify({**progress, 'partial_email': partial_email})
 
-            curated_member = Util.string_to_list(curated_member)
+        return jsonify(progress)
+
+    def stream_progress(self, task_id):
+        return Response(stream_with_context(self.progress_events(task_id)), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    def progress_events(self, task_id: str) -> Iterator[str]:
+        """
+        Server-Sent Events for one task: a 'progress' event whenever status, percent or queue position change,
+        'email' events with the new part of the email while it is generated and a single 'result' event with
+        the rendered results, after which the stream ends. Streams are closed after SSE_MAX_SECONDS, the
+        browser's EventSource then reconnects by itself and receives the email from the start again. For an
+        unknown or evicted task a single 'error' event ends the stream, so stale pages do not hold a thread.
+        """
+        started_at = last_event_at = time.monotonic()
+        last_progress = None
+        email_sent = 0
+
+        while time.monotonic() - started_at < self.config.SSE_MAX_SECONDS:
+            if not self.task_manager.has_task(task_id):
+                yield self.format_event('error', {'status': 'Task not found', 'percent': 100})
+                return
+
+            progress = self.task_manager.get_progress(task_id)
+            queue_position = self.scheduler.get_position(task_id)
+            if queue_position is not None:
+                progress['queue_position'] = queue_position
+
+            if progress != last_progress:
+                last_progress = progress
+                last_event_at = time.monotonic()
+                yield self.format_event('progress', progress)
+
+            partial_email = self.task_manager.get_partial_email(task_id)
+            if len(partial_email) > email_sent:
+                last_event_at = time.monotonic()
+                yield self.format_event('email', {'chunk': partial_email[email_sent:]})
+                email_sent = len(partial_email)
+            elif time.monotonic() - last_event_at >= 15:
+                last_event_at = time.monotonic()
+                yield ": keep-alive\n\n"
+
+            if progress['percent'] == 100:
+                yield self.format_event('result', {**progress, 'results': self.render_results(task_id)})
+                return
+
+            time.sleep(self.config.SSE_POLL_SECONDS)
+
+    @staticmethod
+    def format_event(event: str, data: dict) -> str:
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    def render_results(self, task_id: str) -> str:
+        html = self.task_manager.get_rendered_results(task_id)
+        if html is None:
+            html = self.render_template('result.html', results=self.task_manager.get_results(task_id))
+            self.task_manager.set_rendered_results(task_id, html)
+        return html
+
+    def get_cache_stats(self):
+        return jsonify({**self.result_cache.stats(), 'prompt_cache': self.gpt_service.usage.stats()})
+
+    def get_metrics(self):
+        return Response(REGISTRY.expose(), content_type=CONTENT_TYPE)
+
+    def cache_key(self, pdf_content: bytes) -> str:
+        return ResultCache.make_key(pdf_content, self.gpt_service.cache_version)
+
+    def serve_cached(self, task_id: str, cache_key: str) -> bool:
+        cached = self.result_cache.get(cache_key)
+        if cached is None:
+            return False
+
+        self.task_manager.set_results(task_id, {**cached['result'], 'timings': {}})
+        self.task_manager.update_progress(task_id, "Complete (cached)", 100)
+        EXPOSES.inc(status="cached")
+        return True
+
+    def process_pdf_and_select_list(self, task_id: str, pdf_content: bytes, cache_key: Optional[str] = None):
+        """
+        Runs the pipeline of one exposé. A ``cache_key`` means the caller already looked it up in the result
+        cache and missed, without one (exposés of a batch) the cache is looked up here first.
+        """
+        try:
+            if cache_key is None:
+                cache_key = self.cache_key(pdf_content)
+                if self.serve_cached(task_id, cache_key):
+                    return
+
+            started_at = time.perf_counter()
+            self.task_manager.update_progress(task_id, "Starting analysis ...", 0)
+            # Stages that fell back to a local result because GPT failed, the result is then not cached
+            fallbacks: Set[str] = set()
+
+            graph = TaskGraph(max_workers=self.config.PIPELINE_MAX_WORKERS)
+            graph.add("text", lambda: self.extract_text(pdf_content))
+            graph.add("document", self.text_reducer.reduce, depends_on=("text",))
+            graph.add("lists", self.get_lists)
+            if self.config.GPT_COMBINED_KEY_FACTS_AND_LIST:
+                graph.add("key_facts_and_selection",
+                          lambda text, document, hubspot_lists: self.extract_key_facts_and_select_list(
+                              text, document, hubspot_lists, fallbacks),
+                          depends_on=("text", "document", "lists"))
+                graph.add("key_facts", lambda both: both[0], depends_on=("key_facts_and_selection",))
+                graph.add("selection", lambda both: both[1], depends_on=("key_facts_and_selection",))
+            else:
+                graph.add("key_facts", lambda text, document: self.extract_key_facts(text, document, fallbacks),
+                          depends_on=("text", "document"))
+                graph.add("selection", self.select_list, depends_on=("document", "lists"))
+            graph.add("members", lambda selection: self.get_members(selection[1]), depends_on=("selection",))
+            graph.add("curated_member", lambda members: self.curate_member(members, fallbacks),
+                      depends_on=("members",))
+            graph.add("email", lambda text, selection: self.generate_email(text, selection[0], task_id),
+                      depends_on=("document", "selection"))
+
+            results = graph.run(
+                on_start=lambda name: self.task_manager.update_progress(
+                    task_id, self.STAGE_MESSAGES[name], self.task_manager.get_progress(task_id)['percent']),
+                on_done=lambda name, completed, total: self.task_manager.update_progress(
+                    task_id, f"{self.STAGE_MESSAGES[name]} done", min(99, completed * 100 // total)),
+            )
 
-            html_email = self.generate_email(task_id, text, selected_list_name)
+            selected_list_name, selected_list_id = results["selection"]
+            contacts, companies = results["members"]
 
-            self.task_manager.update_progress(task_id, "Complete", 100)
             task_result = TaskResult(
-                key_facts=key_facts,
+                key_facts=results["key_facts"],
                 selected_list=selected_list_name,
                 selected_list_id=selected_list_id,
                 selected_contacts=contacts,
                 selected_companies=companies,
-                curated_member=curated_member,
-                email=html_email
+                curated_member=results["curated_member"],
+                email=results["email"],
+                timings={**graph.timings, 'total': time.perf_counter() - started_at}
             )
+            for stage, seconds in task_result.timings.items():
+                STAGE_SECONDS.observe(seconds, stage=stage)
+            logger.info(f"Processed exposé {task_id} in {task_result.timings['total']:.2f} s, "
+                        f"{len(task_result.curated_member)} curated members")
 
-            print(task_result.curated_member)
-
-            self.task_manager.set_results(task_id, task_result.model_dump())
+            self.store_result(task_id, cache_key, results["text"], task_result, fallbacks)
 
         except Exception as e:
-            logger.error(f"Error processing PDF: {str(e)}")
-            self.task_manager.update_progress(task_id, f"Error: {str(e)}", 100)
-            self.task_manager.set_results(task_id, TaskResult().model_dump())
-
-    def extract_key_facts(self, task_id: str, text: str) -> KeyFacts:
-        self.task_manager.update_progress(task_id, "Extracting key facts ...", 20)
-        return self.gpt_service.extract_key_facts(text)
-
-    def select_list(self, task_id: str, text: str) -> Tuple[str, str]:
+            self.set_error(task_id, e)
+
+    def process_pdfs_offline(self, pdfs: Iterable[Tuple[str, bytes]]):
+        """
+        Processes many exposés with two OpenAI Batch API jobs instead of interactive calls: key facts and list
+        selection of all exposés first, then member curation and email once the members of the selected lists
+        are known. Results end up per task exactly as with process_pdf_and_select_list.
+        """
+        prepared = {}
+        for task_id, pdf_content in pdfs:
+            try:
+                cache_key = self.cache_key(pdf_content)
+                if self.serve_cached(task_id, cache_key):
+                    continue
+                self.task_manager.update_progress(task_id, self.STAGE_MESSAGES["text"], 0)
+                text = self.extract_text(pdf_content)
+                key_facts, confidence = self.key_fact_extractor.extract(text)
+                prepared[task_id] = {
+                    'cache_key': cache_key,
+                    'fallbacks': set(),
+                    'text': text,
+                    'document': self.text_reducer.reduce(text),
+                    'key_facts': key_facts,
+                    'missing_fields': self.key_fact_extractor.missing_fields(confidence,
+                                                                             self.config.KEY_FACTS_LOCAL_CONFIDENCE),
+                }
+                self.task_manager.update_progress(task_id, "Waiting for OpenAI batch (key facts, list) ...", 20)
+            except Exception as e:
+                self.set_error(task_id, e)
+        if not prepared:
+            return
 
-        self.task_manager.update_progress(task_id, "Fetching all lists from HubSpot ...", 40)
-        hubspot_lists: List[ListInfo] = self.hubspot_service.get_lists()
+        try:
+            hubspot_lists = self.get_lists()
+            first_round = self.openai_batch_service.round()
+            for task_id, item in prepared.items():
+                if item['missing_fields']:
+                    first_round.extract_key_facts(f"{task_id}:key_facts", item['document'], item['missing_fields'])
+                selected_list, candidates = self.match_list(item['document'])
+                if selected_list is not None:
+                    item['selection'] = selected_list.name, selected_list.listId
+                else:
+                    first_round.analyze_text_and_select_list(f"{task_id}:selection", item['document'],
+                                                             [a_list.name for a_list in candidates or hubspot_lists])
+            results = first_round.run()
+        except Exception as e:
+            # A round holds the requests of all exposés, so none of them can go on
+            for task_id in prepared:
+                self.set_error(task_id, e)
+            return
+
+        def get_members(task_id: str):
+            item = prepared[task_id]
+            try:
+                if item['missing_fields']:
+                    item['key_facts'] = self.merge_key_facts(item['key_facts'], results[f"{task_id}:key_facts"],
+                                                             item['missing_fields'], item['fallbacks'])
+                if 'selection' not in item:
+                    item['selection'] = self.resolve_list(results[f"{task_id}:selection"])
+                self.task_manager.update_progress(task_id, self.STAGE_MESSAGES["members"], 50)
+                item['members'] = self.get_members(item['selection'][1])
+            except Exception as e:
+                self.set_error(task_id, e)
+                prepared.pop(task_id)
+
+        with ThreadPoolExecutor(max_workers=self.config.HUBSPOT_MAX_WORKERS) as executor:
+            list(executor.map(get_members, list(prepared)))
 
-        self.task_manager.update_progress(task_id, "Analyze text and start selection of list with GPT...", 60)
+        try:
+            second_round = self.openai_batch_service.round()
+            for task_id, item in prepared.items():
+                item['candidates'] = self.rank_members(item['members'])
+                if item['candidates']:
+                    second_round.curate_members(f"{task_id}:curated_member", "; ".join(item['candidates']))
+                second_round.generate_email(f"{task_id}:email", item['document'], item['selection'][0])
+                self.task_manager.update_progress(task_id, "Waiting for OpenAI batch (curation, email) ...", 60)
+            results = second_round.run()
+        except Exception as e:
+            for task_id in prepared:
+                self.set_error(task_id, e)
+            return
+
+        for task_id, item in prepared.items():
+            try:
+                contacts, companies = item['members']
+                curated_member = self.curated_or_ranked(results[f"{task_id}:curated_member"], item['candidates'],
+                                                        item['fallbacks']) if item['candidates'] else []
+                task_result = TaskResult(
+                    key_facts=item['key_facts'],
+                    selected_list=item['selection'][0],
+                    selected_list_id=item['selection'][1],
+                    selected_contacts=contacts,
+                    selected_companies=companies,
+                    curated_member=curated_member,
+                    email=results[f"{task_id}:email"]
+                )
+                self.store_result(task_id, item['cache_key'], item['text'], task_result, item['fallbacks'])
+            except Exception as e:
+                self.set_error(task_id, e)
+
+    def store_result(self, task_id: str, cache_key: str, text: str, task_result: TaskResult,
+                     fallbacks: Iterable[str] = ()):
+        fallbacks = set(fallbacks)
+        if not task_result.email:
+            fallbacks.add("email")
+        if fallbacks:
+            # A later upload of the same exposé asks GPT again instead of getting the degraded result
+            logger.warning(f"Not caching the result of {task_id}, GPT failed for: {', '.join(sorted(fallbacks))}")
+        else:
+            self.result_cache.set(cache_key, {'text': text, 'result': task_result.model_dump()})
+        self.task_manager.set_results(task_id, task_result.model_dump())
+        self.task_manager.update_progress(task_id, "Complete", 100)
+        EXPOSES.inc(status="complete")
+
+    def set_error(self, task_id: str, error: Exception):
+        logger.error(f"Error processing PDF: {str(error)}")
+        self.task_manager.set_results(task_id, TaskResult().model_dump())
+        self.task_manager.update_progress(task_id, f"Error: {str(error)}", 100)
+        EXPOSES.inc(status="error")
+
+    def extract_text(self, pdf_content: bytes) -> str:
+        text = self.util.extract_text_from_pdf(pdf_content)
+
+        if not text:
+            raise ValueError("Failed to extract text from PDF")
+
+        return text
+
+    def extract_key_facts(self, text: str, document: str, fallbacks: Optional[Set[str]] = None) -> KeyFacts:
+        key_facts, confidence = self.key_fact_extractor.extract(text)
+        missing_fields = self.key_fact_extractor.missing_fields(confidence, self.config.KEY_FACTS_LOCAL_CONFIDENCE)
+        if not missing_fields:
+            return key_facts
+
+        logger.info(f"Asking GPT for key facts not found locally: {', '.join(missing_fields)}")
+        gpt_key_facts = self.gpt_service.extract_key_facts(document, missing_fields)
+        return self.merge_key_facts(key_facts, gpt_key_facts, missing_fields, fallbacks)
+
+    def merge_key_facts(self, key_facts: KeyFacts, gpt_key_facts: Optional[KeyFacts], missing_fields: List[str],
+                        fallbacks: Optional[Set[str]] = None) -> KeyFacts:
+        if gpt_key_facts is None:
+            logger.warning("Key facts with GPT failed, using the local key facts only")
+            if fallbacks is not None:
+                fallbacks.add("key_facts")
+            return key_facts
+        return self.key_fact_extractor.merge(key_facts, gpt_key_facts, missing_fields)
+
+    def extract_key_facts_and_select_list(self, text: str, document: str, hubspot_lists: List[ListInfo],
+                                          fallbacks: Optional[Set[str]] = None) -> Tuple[KeyFacts, Tuple[str, str]]:
+        selected_list, candidates = self.match_list(document)
+        if selected_list is not None:
+            return self.extract_key_facts(text, document, fallbacks), (selected_list.name, selected_list.listId)
+
+        key_facts, confidence = self.key_fact_extractor.extract(text)
+        missing_fields = self.key_fact_extractor.missing_fields(confidence, self.config.KEY_FACTS_LOCAL_CONFIDENCE)
+        if missing_fields:
+            list_names = [a_list.name for a_list in candidates or hubspot_lists]
+            try:
+                gpt_key_facts, selected_list_name = self.gpt_service.extract_key_facts_and_select_list(
+                    document, list_names, missing_fields)
+                selection = self.resolve_list(selected_list_name)
+                if selection[1] is None:
+                    raise ValueError(f"List not in catalog: {selected_list_name}")
+                return self.key_fact_extractor.merge(key_facts, gpt_key_facts, missing_fields), selection
+            except ValueError as e:
+                logger.warning(f"Combined key facts and list selection failed, using separate calls: {str(e)}")
+
+        return (self.extract_key_facts(text, document, fallbacks),
+                self.ask_gpt_for_list(document, candidates or hubspot_lists))
+
+    def get_lists(self) -> List[ListInfo]:
+        return self.list_catalog.get_lists()
+
+    def select_list(self, text: str, hubspot_lists: List[ListInfo]) -> Tuple[str, str]:
+        selected_list, candidates = self.match_list(text)
+        if selected_list is not None:
+            return selected_list.name, selected_list.listId
+        return self.ask_gpt_for_list(text, candidates or hubspot_lists)
+
+    def match_list(self, text: str) -> Tuple[Optional[ListInfo], List[ListInfo]]:
+        """The list of the embedding index for ``text``, or None and the lists GPT should choose from."""
+        if self.list_index is None:
+            return None, []
+        return self.list_index.match(text)
+
+    def ask_gpt_for_list(self, text: str, hubspot_lists: List[ListInfo]) -> Tuple[str, str]:
         list_names = [a_list.name for a_list in hubspot_lists]
-        selected_list_name = self.gpt_service.analyze_text_and_select_list(text, list_names)
-
-        selected_list_id = next((a_list.listId for a_list in hubspot_lists
-                                 if a_list.name.lower().strip() == selected_list_name.lower().strip()), None)
-
-        return selected_list_name, selected_list_id
-
-    def get_members(self, task_id: str, selected_list_id: str) -> Tuple[List[Contact], List[Company]]:
-        self.task_manager.update_progress(task_id, "Getting details of list members from HubSpot ...", 70)
-
-        member_ids = self.hubspot_service.get_members_by_list_id(selected_list_id)
-
-        contacts = self.hubspot_service.get_contacts_details(member_ids)
-        companies = self.hubspot_service.get_companies_details(member_ids)
-
-        return contacts, companies
-
-    def curate_member(self, task_id: str, text: str) -> str:
-        self.task_manager.update_progress(task_id, "Curating top 25 performer ...", 80)
-        members = self.gpt_service.curate_members(text)
-
-        return members
-
-    def generate_email(self, task_id: str, text: str, selected_list_name: str) -> str:
-        self.task_manager.update_progress(task_id, "Generating email with GPT ...", 90)
-        html_email = self.gpt_service.generate_email(text, selected_list_name)
+        return self.resolve_list(self.gpt_service.analyze_text_and_select_list(text, list_names))
+
+    def resolve_list(self, selected_list_name: str) -> Tuple[str, str]:
+        # GPT sometimes paraphrases or misspells the list name, the closest name of the catalog is taken then
+        selected_list = self.list_catalog.find_by_name(selected_list_name) or \
+            self.list_catalog.find_closest(selected_list_name)
+        if selected_list is None:
+            return selected_list_name, None
+
+        return selected_list.name, selected_list.listId
+
+    def get_members(self, selected_list_id: str) -> Tuple[List[Contact], List[Company]]:
+        selected_list = self.list_catalog.find_by_id(selected_list_id)
+        object_type_id = selected_list.objectTypeId if selected_list else ""
+
+        if self.hubspot_mirror is not None:
+            return self.hubspot_mirror.get_members_details(selected_list_id, object_type_id)
+        return self.hubspot_service.get_members_details(selected_list_id, object_type_id)
+
+    def curate_member(self, members: Tuple[List[Contact], List[Company]],
+                      fallbacks: Optional[Set[str]] = None) -> List[str]:
+        candidates = self.rank_members(members)
+        if not candidates:
+            return []
+        return self.curated_or_ranked(self.gpt_service.curate_members("; ".join(candidates)), candidates, fallbacks)
+
+    def rank_members(self, members: Tuple[List[Contact], List[Company]]) -> List[str]:
+        """Names of the MEMBER_RANK_TOP_N best members by local score, all names in list order if it is 0."""
+        contacts, companies = members
+        records = contacts or companies
+        if self.config.MEMBER_RANK_TOP_N > 0:
+            records = self.member_ranker.rank(records)[:self.config.MEMBER_RANK_TOP_N]
+        return [name for name in map(self.member_name, records) if name.strip()]
+
+    @staticmethod
+    def curated_or_ranked(curated_member: str, candidates: List[str],
+                          fallbacks: Optional[Set[str]] = None) -> List[str]:
+        # Without a usable GPT curation the best members by local score are taken
+        if curated_member and curated_member != "['ERROR']":
+            return Util.string_to_list(curated_member)
+        logger.warning("Curation with GPT failed, using the local member ranking")
+        if fallbacks is not None:
+            fallbacks.add("curated_member")
+        return candidates[:GPTService.MAX_CURATED_MEMBERS]
+
+    @staticmethod
+    def member_name(member: Contact | Company) -> str:
+        if isinstance(member, Contact):
+            return f"{member.firstname}{member.lastname}"
+        return member.name
+
+    def generate_email(self, text: str, selected_list_name: str, task_id: Optional[str] = None) -> str:
+        if not self.config.GPT_STREAM_EMAIL or task_id is None:
+            return self.gpt_service.generate_email(text, selected_list_name)
+
+        # Forward the growing email to the task store, throttled so a token does not cost a store write
+        html_email, flushed_at = "", time.monotonic()
+        try:
+            for chunk in self.gpt_service.generate_email_stream(text, selected_list_name):
+                html_email += chunk
+                if time.monotonic() - flushed_at >= self.config.EMAIL_STREAM_FLUSH_SECONDS:
+                    self.task_manager.set_partial_email(task_id, html_email)
+                    flushed_at = time.monotonic()
+        except Exception as e:
+            # A stream broken off midway leaves a cut-off email, the result gets a complete one instead
+            logger.warning(f"Email stream failed after {len(html_email)} characters, requesting it again: {str(e)}")
+            return self.gpt_service.generate_email(text, selected_list_name)
+        self.task_manager.set_partial_email(task_id, html_email)
 
-        return html_email
+        return html_email.strip()
 
     def render_template(self, template_name: str, **context) -> str:
         template = self.jinja_env.get_template(template_name)
@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, List, Optional, Tuple
+import httpx
+from openai import NOT_GIVEN, AsyncOpenAI, DefaultAsyncHttpxClient
+from openai.types.chat import ChatCompletion
+from openai import (
+    APIError,
+    APIConnectionError,
+    RateLimitError,
+    APIStatusError,
+    InternalServerError,
+)
+
+from config import Config
+from models import KeyFacts
+from services.gpt_service import GPTServiceBase, T, count_retried_response
+from services.prompts import ChatRequest
+from services.structured_key_facts import StructuredKeyFacts
+
+logger = logging.getLogger(__name__)
+
+
+async def _count_retried_response(response: httpx.Response):
+    count_retried_response(response)
+
+
+class TokenBudget:
+    """
+    Sliding one-minute token budget. ``acquire`` waits until the estimated tokens of a request fit
+    into the remaining budget; ``settle`` replaces the estimate with the real usage once it is known.
+    """
+
+    WINDOW_SECONDS = 60.0
+
+    def __init__(self, tokens_per_minute: int):
+        self.tokens_per_minute = tokens_per_minute
+        self.entries: Deque[List[float]] = deque()
+        self.lock = asyncio.Lock()
+
+    def _used(self, now: float) -> float:
+        while self.entries and now - self.entries[0][0] >= self.WINDOW_SECONDS:
+            self.entries.popleft()
+        return sum(tokens for _, tokens in self.entries)
+
+    async def acquire(self, tokens: int) -> List[float]:
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                used = self._used(now)
+                # A single request larger than the whole budget is let through on an empty window
+                if not self.entries or used + tokens <= self.tokens_per_minute:
+                    entry = [now, float(tokens)]
+                    self.entries.append(entry)
+                    return entry
+                await asyncio.sleep(self.WINDOW_SECONDS - (now - self.entries[0][0]))
+
+    @staticmethod
+    def settle(entry: List[float], tokens: int):
+        entry[1] = float(tokens)
+
+
+@dataclass
+class _AsyncResources:
+    client: AsyncOpenAI
+    semaphore: asyncio.Semaphore
+    budget: TokenBudget
+
+
+class AsyncGPTService(GPTServiceBase):
+    """
+    asyncio-native sibling of GPTService, sending the same requests and validating them the same way.
+
+    All instances created in one process share an AsyncOpenAI client, a global concurrency semaphore
+    (``OPENAI_MAX_CONCURRENCY``) and a token-per-minute budget (``OPENAI_TOKENS_PER_MINUTE``, 0 disables it).
+    Since asyncio primitives are bound to an event loop, the shared resources are kept per running loop.
+    """
+
+    _resources: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _AsyncResources]" = weakref.WeakKeyDictionary()
+    _resources_lock = threading.Lock()
+
+    @property
+    def resources(self) -> _AsyncResources:
+        loop = asyncio.get_running_loop()
+        with self._resources_lock:
+            if loop not in self._resources:
+                self._resources[loop] = _AsyncResources(
+                    client=AsyncOpenAI(
+                        api_key=self.config.OPENAI_API_KEY,
+                        base_url=self.config.OPENAI_BASE_URL,
+                        timeout=httpx.Timeout(30.0, connect=15.0),
+                        max_retries=3,
+                        http_client=DefaultAsyncHttpxClient(event_hooks={"response": [_count_retried_response]}),
+                    ),
+                    semaphore=asyncio.Semaphore(self.config.OPENAI_MAX_CONCURRENCY),
+                    budget=TokenBudget(self.config.OPENAI_TOKENS_PER_MINUTE),
+                )
+            return self._resources[loop]
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        return self.resources.client
+
+    async def _request_validated(self, chat_request: ChatRequest, validate: Callable[[str], T],
+                                 fallback: Optional[Callable[[str], T]] = None) -> T:
+        """Sends the requests of _validation_steps."""
+        steps = self._validation_steps(chat_request, validate, fallback)
+        model = next(steps)
+        while True:
+            response = await self._make_openai_request(chat_request, model)
+            try:
+                model = steps.send(response)
+            except StopIteration as done:
+                return done.value
+
+    async def analyze_text_and_select_list(self, text: str, list_names: List[str]) -> str:
+        return await self._request_validated(self._select_list_request(text, list_names),
+                                             self._list_name_validator(list_names),
+                                             fallback=lambda response: response)
+
+    async def extract_key_facts(self, text: str, fields: Optional[List[str]] = None) -> Optional[KeyFacts]:
+        if self.structured_key_facts:
+            structured = StructuredKeyFacts(fields)
+            return await self._request_validated(
+                self._key_facts_request(text, fields, structured.response_format()),
+                structured.parse, fallback=self._parse_key_facts_response)
+        return self._parse_key_facts_response(
+            await self._make_openai_request(self._key_facts_request(text, fields)))
+
+    async def extract_key_facts_and_select_list(self, text: str, list_names: List[str],
+                                                fields: Optional[List[str]] = None) -> Tuple[KeyFacts, str]:
+        structured = StructuredKeyFacts(fields)
+        return await self._request_validated(
+            self._key_facts_and_list_request(text, list_names, structured),
+            lambda response: self._parse_key_facts_and_list(structured, response, list_names))
+
+    async def generate_email(self, text: str, name_of_list: str) -> str:
+        return await self._make_openai_request(self._email_request(text, name_of_list))
+
+    async def curate_members(self, text: str, attempts: int = 0) -> str:
+        chunks = self.member_chunks(self.split_members(text)) if attempts == 0 else []
+        if len(chunks) > 1:
+            return await self._curate_member_chunks(chunks)
+
+        request = self._curate_members_request(text)
+        for attempt in range(attempts, self.CURATION_ATTEMPTS):
+            try:
+                if attempt == 0:
+                    return await self._request_validated(request, self._validate_curated_members)
+                return self._validate_curated_members(await self._make_openai_request(request, self.model))
+            except ValueError as e:
+                self._curation_attempt_failed(attempt, e)
+            except Exception as e:
+                logger.error(f"Curation failed: {str(e)}")
+                return "['ERROR']"
+        return "['ERROR']"
+
+    async def _curate_member_chunks(self, chunks: List[List[str]]) -> str:
+        logger.info(f"Curating {sum(map(len, chunks))} members in {len(chunks)} chunks")
+        # Chunks share the global semaphore, GPT_CURATION_WORKERS does not apply here
+        results = await asyncio.gather(*(self.curate_members("; ".join(chunk)) for chunk in chunks))
+        winners = self._chunk_winners(list(results))
+        return await self.curate_members(winners) if winners else "['ERROR']"
+
+    async def _make_openai_request(self, chat_request: ChatRequest, model: Optional[str] = None) -> str:
+        model = model or self.model_for(chat_request.prompt.name)
+        resources = self.resources
+        entry = None
+
+        async with resources.semaphore:
+            if self.config.OPENAI_TOKENS_PER_MINUTE > 0:
+                entry = await resources.budget.acquire(
+                    self.estimate_tokens(*(message["content"] for message in chat_request.messages)))
+            started_at = time.perf_counter()
+            try:
+                response: ChatCompletion = await resources.client.chat.completions.create(
+                    model=model,
+                    messages=chat_request.messages,
+                    response_format=chat_request.response_format or NOT_GIVEN,
+                )
+                self.usage.record(chat_request.prompt.name, response.usage, model, time.perf_counter() - started_at)
+                if entry is not None and response.usage:
+                    resources.budget.settle(entry, response.usage.total_tokens)
+                return response.choices[0].message.content.strip()
+            except (RateLimitError, APIConnectionError, InternalServerError, APIStatusError, APIError) as e:
+                logger.error(f"Error in OpenAI API request: {str(e)}")
+                return ""
@@ -1,8 +1,13 @@
 import json
 import logging
-from typing import Dict, List, Union, Any
+import re
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Generator, Iterator, List, Optional, Tuple, TypeVar, Union
 import httpx
-from openai import OpenAI
+from openai import NOT_GIVEN, DefaultHttpxClient, OpenAI
 from openai.types.chat import ChatCompletion
 from openai import (
     APIError,
@@ -13,236 +18,291 @@ from openai import (
 )
 
 from config import Config
-from models import KeyFacts, Address
+from metrics import OPENAI_REQUEST_SECONDS, OPENAI_RETRIES, OPENAI_TOKENS
+from models import KeyFacts
+from services import prompts
+from services.prompts import ChatRequest
+from services.structured_key_facts import StructuredKeyFacts
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+
+def count_retried_response(response: httpx.Response):
+    """httpx response hook counting the 429 and 5xx responses, which the OpenAI SDK retries."""
+    if response.status_code == 429:
+        OPENAI_RETRIES.inc(reason="rate_limited")
+    elif response.status_code >= 500:
+        OPENAI_RETRIES.inc(reason="server_error")
+
+
+class UsageStats:
+    """
+    Token usage and latency per prompt and model, including the prompt tokens OpenAI served from its prompt
+    cache and the requests that were escalated from a routed model to the main model.
+    """
+
+    COUNTERS = ("calls", "prompt_tokens", "cached_tokens", "completion_tokens", "seconds", "escalations")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries: Dict[Tuple[str, str], Dict[str, float]] = defaultdict(
+            lambda: dict.fromkeys(self.COUNTERS, 0))
+
+    @staticmethod
+    def _get(data: Any, name: str) -> Any:
+        # Responses of older SDK versions keep unknown fields such as prompt_tokens_details as plain dicts
+        return data.get(name) if isinstance(data, dict) else getattr(data, name, None)
+
+    def record(self, prompt_name: str, usage: Any, model: str = "", seconds: float = 0.0):
+        if usage is None:
+            return
+        prompt_tokens = self._get(usage, "prompt_tokens") or 0
+        cached_tokens = self._get(self._get(usage, "prompt_tokens_details"), "cached_tokens") or 0
+        completion_tokens = self._get(usage, "completion_tokens") or 0
+        with self.lock:
+            entry = self.entries[(prompt_name, model)]
+            entry["calls"] += 1
+            entry["prompt_tokens"] += prompt_tokens
+            entry["cached_tokens"] += cached_tokens
+            entry["completion_tokens"] += completion_tokens
+            entry["seconds"] += seconds
+        if seconds > 0:
+            OPENAI_REQUEST_SECONDS.observe(seconds, prompt=prompt_name, model=model or "batch")
+        for token_type, tokens in (("prompt", prompt_tokens), ("cached", cached_tokens),
+                                   ("completion", completion_tokens)):
+            OPENAI_TOKENS.inc(tokens, prompt=prompt_name, model=model or "batch", type=token_type)
+        logger.info(f"OpenAI {prompt_name} request ({model or 'batch'}, {seconds:.2f} s): {prompt_tokens} prompt "
+                    f"tokens ({cached_tokens} cached), {completion_tokens} completion tokens")
+
+    def record_escalation(self, prompt_name: str, model: str):
+        """Counts a response of ``model`` that failed validation and was requested again from the main model."""
+        with self.lock:
+            self.entries[(prompt_name, model)]["escalations"] += 1
+        OPENAI_RETRIES.inc(reason="escalation")
+
+    @staticmethod
+    def _summary(entry: Dict[str, float]) -> Dict[str, Any]:
+        return {
+            **{name: round(value, 3) if name == "seconds" else int(value) for name, value in entry.items()},
+            "mean_seconds": round(entry["seconds"] / entry["calls"], 3) if entry["calls"] else 0.0,
+            "cache_hit_rate": round(entry["cached_tokens"] / entry["prompt_tokens"], 3)
+            if entry["prompt_tokens"] else 0.0,
+        }
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Totals per prompt name, with the same figures per model under "models"."""
+        with self.lock:
+            entries = {key: dict(entry) for key, entry in self.entries.items()}
+
+        prompts_: Dict[str, Dict[str, Dict[str, float]]] = defaultdict(dict)
+        for (prompt_name, model), entry in entries.items():
+            prompts_[prompt_name][model or "batch"] = entry
+
+        stats = {}
+        for prompt_name, models in prompts_.items():
+            total = {name: sum(entry[name] for entry in models.values()) for name in self.COUNTERS}
+            stats[prompt_name] = {**self._summary(total),
+                                  "models": {model: self._summary(entry) for model, entry in models.items()}}
+        return stats
+
+
+class GPTServiceBase:
+    """
+    Prompts, request builders and response parsers of the GPT calls, shared by GPTService and AsyncGPTService
+    so both send identical requests and validate responses the same way. The subclasses only send the requests.
+    """
+
+    KEY_FACTS_PROMPT = prompts.KEY_FACTS.text
+    # Limits of enums in strict structured outputs
+    MAX_ENUM_VALUES = 500
+    MAX_ENUM_CHARS = 7500
+    MAX_CURATED_MEMBERS = 25
+    CURATION_ATTEMPTS = 3
+    # A chunk must hold clearly more names than it returns, so every reduce round shrinks the list
+    MIN_CHUNK_MEMBERS = 2 * MAX_CURATED_MEMBERS
 
-class GPTService:
     def __init__(self, config: Config):
-        self.client = OpenAI(
-            api_key=config.OPENAI_API_KEY,
-            timeout=httpx.Timeout(30.0, connect=15.0),
-            max_retries=3,
-        )
-        self.model = "gpt-4o"
+        self.config = config
+        self.model = config.GPT_MODEL
+        self.model_routes = config.GPT_MODEL_ROUTES
+        self.embedding_model = config.OPENAI_EMBEDDING_MODEL
         self.max_tokens = 128000
+        self.structured_key_facts = config.GPT_STRUCTURED_KEY_FACTS
+        self.result_settings = self._result_settings(config)
+        self.curation_chunk_tokens = config.GPT_CURATION_CHUNK_TOKENS
+        self.curation_workers = config.GPT_CURATION_WORKERS
+        self.usage = UsageStats()
 
-    def analyze_text_and_select_list(self, text: str, list_names: List[str]) -> str:
-        prompt = (
-            "You are an AI assistant tasked with analyzing real estate exposés and matching them to the most "
-            "appropriate list based on the content. Analyze the given text and select the best matching list "
-            "from the provided options. Respond with only the name of the selected list."
-        )
-        user_content = f"Exposé text: {text}\n\nAvailable lists: {', '.join(list_names)}"
-        return self._make_openai_request(prompt, user_content)
-
-    def extract_key_facts(self, text: str) -> KeyFacts:
-        prompt = """
-        You are an expert real estate data extraction specialist, fluent in both German and English. Your task is to meticulously analyze real estate exposés in either language and extract ALL relevant information. Follow these comprehensive search patterns:
-
-        1. DETAILED SEARCH PATTERNS (GERMAN/ENGLISH):
-
-        Purchase Price / Kaufpreis:
-        - German: 
-            * "Kaufpreis", "Preis", "Angebotspreis", "Verkaufspreis", "Investment", "Verkauf für", "zum Preis von"
-            * "Kaufsumme", "Gesamtpreis", "Objektpreis", "Investitionssumme", "Mindestpreis"
-            * "VB", "VHB", "auf Anfrage", "Verhandlungsbasis"
-            * "Gesamtinvestition", "Gesamtvolumen", "Kaufoption"
-            * "Kaufpreisfaktor", "Anschaffungskosten"
-        - English: 
-            * "purchase price", "price", "asking price", "sales price", "investment", "for sale at"
-            * "total price", "property price", "investment sum", "minimum price"
-            * "price on request", "POA", "guide price", "offers over"
-            * "total investment", "acquisition cost", "purchase option"
-            * "purchase price factor", "cost of acquisition"
-
-        Areas / Flächen:
-        Usable Area / Nutzfläche:
-        - German:
-            * "Nutzfläche", "Wohnfläche", "Gesamtfläche", "vermietbare Fläche", "Mietfläche"
-            * "Gewerbefläche", "Bürofläche", "Ladenfläche", "Verkaufsfläche"
-            * "BGF", "Bruttogrundfläche", "NGF", "Nettogrundfläche"
-            * "vermietbare Fläche", "Nutzungseinheit", "Gewerbeeinheit"
-            * "Wohn- und Nutzfläche", "Wohn-/Nutzfläche"
-            * "Hauptnutzfläche", "Nebennutzfläche", "Funktionsfläche"
-        - English:
-            * "usable area", "living space", "total area", "lettable area", "rental space"
-            * "commercial space", "office space", "retail space", "sales floor"
-            * "GFA", "gross floor area", "NFA", "net floor area"
-            * "leasable area", "usable unit", "commercial unit"
-            * "living and usable space", "total usable space"
-            * "main usable area", "auxiliary area", "functional area"
-
-        Plot Size / Grundstücksfläche:
-        - German:
-            * "Grundstücksfläche", "Grundstück", "Grundstücksgröße", "Flurstück"
-            * "Gesamtgrundstück", "Grundfläche", "Außenfläche", "Freifläche"
-            * "Bauplatz", "Bauland", "Baugrundstück", "Geländefläche"
-            * "Parkplatzfläche", "Gartenfläche", "Hoffläche"
-            * "Grundstücksanteil", "Flurstückgröße"
-        - English:
-            * "plot size", "land area", "property size", "lot size"
-            * "total plot", "ground area", "outdoor area", "open space"
-            * "building plot", "construction site", "development land"
-            * "parking area", "garden area", "courtyard area"
-            * "land share", "plot dimensions"
-
-        Address / Adresse:
-        - German:
-            * "Lage", "Standort", "gelegen in", "befindet sich in"
-            * "-straße", "-weg", "-allee", "-platz", "-ring", "-damm", "-ufer"
-            * "Hausnummer", "Nr.", "Nummer", "Postleitzahl", "PLZ"
-            * "Stadtbezirk", "Stadtteil", "Ortsteil", "Quartier"
-            * "im Herzen von", "zentral gelegen", "direkt an"
-            * "Anschrift", "Adresse", "Objektstandort"
-        - English:
-            * "location", "situated in", "located at", "address"
-            * "street", "road", "avenue", "plaza", "ring", "lane", "boulevard"
-            * "house number", "no.", "number", "postal code", "zip code"
-            * "district", "quarter", "neighborhood", "area"
-            * "in the heart of", "centrally located", "directly at"
-            * "property location", "site address"
-
-        Rental Income / Mieteinnahmen:
-        - German:
-            * "Mieteinnahmen", "Jahresmiete", "Monatsmiete", "Nettokaltmiete"
-            * "Ist-Miete", "Mietertrag", "Sollmiete", "Mietrendite"
-            * "Jahresnettomiete", "Nettomieteinnahmen", "Mieteinnahmen p.a."
-            * "Mietzins", "Pachteinnahmen", "Ertrag p.a."
-            * "Jahresrohertrag", "Jahresmietertrag", "Mietrendite"
-            * "Kaltmiete", "Warmmiete", "Betriebskosten"
-        - English:
-            * "rental income", "annual rent", "monthly rent", "net rent"
-            * "current rent", "rental yield", "target rent", "rental return"
-            * "annual net rent", "net rental income", "rental income p.a."
-            * "lease income", "rental earnings", "yield p.a."
-            * "gross annual income", "annual rental income", "rental yield"
-            * "net cold rent", "gross rent", "operating costs"
-
-        Residential Units / Wohneinheiten:
-        - German:
-            * "Wohneinheiten", "Einheiten", "Wohnungen", "Gewerbeeinheiten"
-            * "Appartements", "Wohn- und Geschäftseinheiten"
-            * "Zimmer", "Räume", "Raumeinheiten", "Nutzungseinheiten"
-            * "Gewerbeflächen", "Laden", "Geschäfte", "Büros"
-            * "Stellplätze", "Tiefgaragenplätze", "Parkplätze"
-            * "Wohnungsmix", "Einheitenaufteilung"
-        - English:
-            * "residential units", "units", "apartments", "commercial units"
-            * "flats", "residential and commercial units"
-            * "rooms", "spaces", "room units", "usage units"
-            * "commercial spaces", "shops", "stores", "offices"
-            * "parking spaces", "underground parking", "parking lots"
-            * "unit mix", "unit distribution"
-
-        WAULT:
-        - German:
-            * "durchschnittliche Mietvertragslaufzeit", "gewichtete Restlaufzeit"
-            * "WAULT", "Mietvertragslaufzeit", "Restlaufzeit der Mietverträge"
-            * "durchschnittliche Restlaufzeit", "gewichtete durchschnittliche Laufzeit"
-            * "verbleibende Mietdauer", "Laufzeit der Mietverträge"
-            * "mittlere gewichtete Mietvertragsdauer"
-        - English:
-            * "weighted average unexpired lease term", "average lease duration"
-            * "WAULT", "lease term", "remaining lease term"
-            * "weighted average lease term", "average unexpired term"
-            * "remaining rental period", "duration of lease agreements"
-            * "mean weighted lease duration"
-
-        2. NUMBER AND UNIT FORMATS:
-        - German number format: 1.234,56
-        - English number format: 1,234.56
-        - Area units: m², qm, Quadratmeter, square meters, sq m, sq. m.
-        - Currency formats: 
-            * "1.234.567 €", "1.234.567,00 €", "EUR 1.234.567"
-            * "1,234,567 €", "1,234,567.00 €", "€1,234,567"
-            * "T€" (Tausend Euro), "Mio. €" (Millionen Euro)
-            * "k€" (thousand euros), "m€" (million euros)
-            * "TEUR", "Mio. EUR", "Millionen Euro"
-
-        3. EXTRACTION METHODOLOGY:
-        - Analyze the entire document multiple times, focusing on different data types each time
-        - Check both headers and body text
-        - Look for information in tables, lists, and continuous text
-        - Consider both formal terms and colloquial expressions
-        - Process ALL numbers that appear with relevant units
-        - Check for information in both languages within the same document
-        - Look for population data near city names or in location descriptions
-        - Consider variations in formatting and spelling
-        - Check for information in footnotes and annotations
-
-        4. DATA STANDARDIZATION RULES:
-        - Convert all areas to square meters (m²)
-        - Standardize currency to Euro format with dots (1.234.567 €)
-        - Ensure postal codes are 5 digits for German addresses
-        - Convert any monthly rents to annual figures
-        - Standardize WAULT to years if given in months
-
-        Return in JSON format:
-        {
-            "address": {
-                "street": string,        # Straße/Street
-                "house_number": string,  # Hausnummer/House number
-                "postal_code": string,   # PLZ/Postal code
-                "city": string,         # Stadt/City
-                "population": number    # Einwohner/Population
-            },
-            "purchase_price": string,   # Kaufpreis/Purchase price
-            "price_per_square": string,   # Kaufpreis pro Quadratmeter/Purchase price per square
-            "usable_area": number,     # Nutzfläche/Usable area (in m²)
-            "plot_size": number,       # Grundstücksfläche/Plot size (in m²)
-            "residential_units": number, # Wohneinheiten/Residential units
-            "rental_income": string,    # Mieteinnahmen/Rental income
-            "wault": number            # Gewichtete Restlaufzeit/WAULT (in years)
+    @staticmethod
+    def _result_settings(config: Config) -> Dict[str, Any]:
+        # Settings besides prompts and models that change the results, part of the cache version
+        return {
+            "structured": config.GPT_STRUCTURED_KEY_FACTS,
+            "combined": config.GPT_COMBINED_KEY_FACTS_AND_LIST,
+            "token_budget": config.GPT_TEXT_TOKEN_BUDGET,
+            "local_confidence": config.KEY_FACTS_LOCAL_CONFIDENCE,
         }
 
-        IMPORTANT:
-        - Analyze the text iteratively to ensure no information is missed
-        - Convert all values to the specified formats before returning
-        - If information appears multiple times, use the most detailed/recent version
-        - Include all found information, even if some fields are uncertain
-        - Pay special attention to context when extracting numbers
-        - Consider both abbreviated and full forms of measurements
+    @property
+    def cache_version(self) -> str:
+        routes = ",".join(f"{name}={model}" for name, model in sorted(self.model_routes.items()))
+        settings = ",".join(f"{name}={value}" for name, value in sorted(self.result_settings.items()))
+        return f"{prompts.version()}:{self.model}:{routes}:{settings}"
+
+    def model_for(self, prompt_name: str) -> str:
+        """Model of a prompt: its entry in GPT_MODEL_ROUTES, otherwise the main model."""
+        return self.model_routes.get(prompt_name, self.model)
+
+    def _validation_steps(self, chat_request: ChatRequest, validate: Callable[[str], T],
+                          fallback: Optional[Callable[[str], T]] = None) -> Generator[str, str, T]:
+        """
+        The steps of a validated request, apart from sending it: yields the model to request, receives its
+        response and returns the validated result. If validation raises a ValueError and the routed model is
+        not the main model, the request is repeated once on the main model. A response of the main model that
+        does not validate either is handed to ``fallback``, without one the ValueError is raised.
         """
+        model = self.model_for(chat_request.prompt.name)
+        response = yield model
+        if model != self.model:
+            try:
+                return validate(response)
+            except ValueError as e:
+                logger.warning(f"Invalid {chat_request.prompt.name} response of {model}, escalating to "
+                               f"{self.model}: {str(e)}")
+                self.usage.record_escalation(chat_request.prompt.name, model)
+                response = yield self.model
 
-        user_content = (
-            f"Exposé text: {text}\n\n"
-            f"Please analyze this text thoroughly in both German and English using the specified methodology. "
-            f"Extract ALL possible information, even if you're not completely certain about some values. "
-            f"Pay special attention to different number formats and units in both languages. "
-            f"Return the data in the specified JSON format without any additional explanation or markdown."
+        try:
+            return validate(response)
+        except ValueError as e:
+            if fallback is None:
+                raise
+            logger.warning(f"Invalid {chat_request.prompt.name} response: {str(e)}")
+            return fallback(response)
+
+    @classmethod
+    def _list_name_validator(cls, list_names: List[str]) -> Callable[[str], str]:
+        def validate(response: str) -> str:
+            list_name = cls._match_list_name(response, list_names)
+            if list_name is None:
+                raise ValueError(f"Unknown list: {response}")
+            return list_name
+        return validate
+
+    @staticmethod
+    def _match_list_name(response: Any, list_names: List[str]) -> Optional[str]:
+        """The name of ``list_names`` that ``response`` refers to, ignoring case, whitespace and quotes."""
+        names = {" ".join(name.lower().split()): name for name in list_names}
+        return names.get(" ".join(str(response or "").strip().strip('"\'').lower().split()))
+
+    @staticmethod
+    def _select_list_request(text: str, list_names: List[str]) -> ChatRequest:
+        return prompts.document_request(prompts.SELECT_LIST, text, f"Available lists: {', '.join(list_names)}")
+
+    @classmethod
+    def key_fact_keywords(cls) -> List[str]:
+        """Search terms of the German/English lexicon in KEY_FACTS_PROMPT, longest first."""
+        lexicon = cls.KEY_FACTS_PROMPT.split("2. NUMBER AND UNIT FORMATS")[0]
+        terms = {term for term in re.findall(r'"([^"]+)"', lexicon) if not any(char.isdigit() for char in term)}
+        return sorted(terms, key=len, reverse=True)
+
+    @staticmethod
+    def estimate_tokens(*contents: str) -> int:
+        # Roughly four characters per token for German/English prose
+        return sum(len(content) for content in contents) // 4 + 1
+
+    @classmethod
+    def _key_facts_request(cls, text: str, fields: Optional[List[str]] = None,
+                           response_format: Optional[Dict[str, Any]] = None) -> ChatRequest:
+        return prompts.document_request(prompts.KEY_FACTS, text, cls._key_facts_task(fields, bool(response_format)),
+                                        response_format)
+
+    @staticmethod
+    def _key_facts_task(fields: Optional[List[str]] = None, structured: bool = False) -> str:
+        task_content = (
+            "Please analyze this text thoroughly in both German and English using the specified methodology. "
+            "Extract ALL possible information, even if you're not completely certain about some values. "
+            "Pay special attention to different number formats and units in both languages. "
+            "Return the data in the specified JSON format without any additional explanation or markdown."
         )
+        if fields:
+            task_content += (
+                "\n\nThe other fields are already known. Only extract these fields and return only them, "
+                f"keeping the nesting of the JSON format: {', '.join(fields)}"
+            )
+        if structured:
+            task_content += (
+                "\n\nReturn figures as plain numbers in the units of the JSON schema (Euro, m², years) "
+                "and null for information that is not in the text."
+            )
+        return task_content
+
+    @classmethod
+    def _key_facts_and_list_request(cls, text: str, list_names: List[str],
+                                    structured: StructuredKeyFacts) -> ChatRequest:
+        list_name: Dict[str, Any] = {"type": "string", "description": "exact name of the selected list"}
+        # Strict mode can enforce the names as long as the enum stays within OpenAI's limits
+        if len(list_names) <= cls.MAX_ENUM_VALUES and sum(map(len, list_names)) <= cls.MAX_ENUM_CHARS:
+            list_name["enum"] = list_names
+        schema = {
+            "type": "object",
+            "properties": {"key_facts": structured.schema(), "list_name": list_name},
+            "required": ["key_facts", "list_name"],
+            "additionalProperties": False,
+        }
+        response_format = {"type": "json_schema",
+                           "json_schema": {"name": "key_facts_and_list", "strict": True, "schema": schema}}
+        task_content = f"{cls._key_facts_task(structured.fields, True)}\n\nAvailable lists: {', '.join(list_names)}"
+        return prompts.document_request(prompts.KEY_FACTS_AND_LIST, text, task_content, response_format)
+
+    @classmethod
+    def _parse_key_facts_and_list(cls, structured: StructuredKeyFacts, response: str,
+                                  list_names: List[str]) -> Tuple[KeyFacts, str]:
+        if not response:
+            raise ValueError("Empty response received")
+        try:
+            data = json.loads(response)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {str(e)}")
+        if not isinstance(data, dict):
+            raise ValueError("Response is not a JSON object")
+
+        list_name = cls._match_list_name(data.get("list_name"), list_names)
+        if list_name is None:
+            raise ValueError(f"Unknown list: {data.get('list_name')}")
+        return structured.parse_object(data.get("key_facts") or {}), list_name
+
+    @classmethod
+    def _parse_structured_key_facts(cls, structured: StructuredKeyFacts, response: str) -> KeyFacts:
+        if not response:
+            return KeyFacts()
+        try:
+            return structured.parse(response)
+        except ValueError as e:
+            logger.warning(f"Key facts do not match the JSON schema, parsing leniently: {str(e)}")
+            return cls._parse_key_facts(response)
 
-        response = self._make_openai_request(prompt, user_content)
-        json_data = self.parse_string_to_json(response)
+    @classmethod
+    def _parse_key_facts_response(cls, response: str) -> Optional[KeyFacts]:
+        # Unlike KeyFacts without values, None tells the caller that GPT was not asked successfully
+        return cls._parse_key_facts(response) if response else None
+
+    @classmethod
+    def _parse_key_facts(cls, response: str) -> KeyFacts:
+        json_data = cls.parse_string_to_json(response)
         if json_data:
-            address_data = json_data.pop('address', {})
-            return KeyFacts(address=Address(**address_data), **json_data)
+            # Figures given as text ("1.234.567 €") are normalized to numbers like in structured replies
+            try:
+                return StructuredKeyFacts().parse_object(json_data)
+            except ValueError as e:
+                logger.error(f"Invalid key facts: {str(e)}")
         return KeyFacts()
 
-    def generate_email(self, text: str, name_of_list: str) -> str:
-        prompt = (
-            "You are an AI assistant specialized in creating high-converting real estate marketing emails in German. "
-            "Guidelines:\n"
-            "1. Tone: Professional yet approachable (70% formal, 30% modern)\n"
-            "2. Style Elements:\n"
-            "   - Use 2-3 relevant emojis per section (property features, benefits, call-to-action)\n"
-            "   - Include or transform modern buzzwords from the user input\n"
-            "3. Email Structure:\n"
-            "   - Attention-grabbing subject line (max 50 chars)\n"
-            "   - Preview text (max 100 chars)\n"
-            "   - Personalized greeting\n"
-            "   - 2-3 key property highlights\n"
-            "   - Value proposition\n"
-            "   - Clear call-to-action\n"
-            "   - Professional closing\n"
-            "4. Length: 150-250 words total\n"
-            "5. Must include: Property price, location benefits, unique selling points"
-        )
-
-        user_content = (
-            f"Exposé text: {text}\n\n"
+    @staticmethod
+    def _email_request(text: str, name_of_list: str) -> ChatRequest:
+        task_content = (
             f"Target Audience List: {name_of_list}\n\n"
             "Requirements:\n"
             "1. Generate a complete email following the structure above\n"
@@ -252,116 +312,96 @@ class GPTService:
             "5. Return complete <body> tag content (no custom CSS/JS/imports)\n"
             "6. No markdown syntax or ```html tags"
         )
-        return self._make_openai_request(prompt, user_content)
+        return prompts.document_request(prompts.EMAIL, text, task_content)
 
-    def curate_members(self, text: str, attempts: int = 0) -> str:
-        if attempts >= 3:
-            return "['ERROR']"
-
-        prompt = (
-            "You are a precise data formatting system with specific output requirements."
-            "\n\nINPUT ANALYSIS RULES:"
-            "\n1. Analyze German real estate entities for:"
-            "\n   - Market presence (AUM, transaction volume, market share)"
-            "\n   - Financial metrics (revenue, growth rate, profitability)"
-            "\n   - Industry influence (reputation, partnerships, innovation)"
-            "\n2. Select top performers (maximum 25)"
-            "\n3. Important:"
-            "\n   - Keep company suffixes (GmbH, AG, etc.) with their companies"
-            "\n   - Keep L.P., S.à r.l. etc. as part of company names"
-            "\n   - Use official company names"
-            "\n\nCRITICAL OUTPUT REQUIREMENTS:"
-            "\n- MUST return ONLY a comma-separated list"
-            "\n- NO quotes, brackets, or special characters"
-            "\n- NO explanations or additional text"
-            "\n- NO formatting or markdown"
-            "\n- NO spaces before/after commas"
-            "\n- Company names exactly as provided"
-            "\n\nCORRECT EXAMPLE:"
-            "\nDeutsche Bank AG,Vonovia SE,AEW Capital Management L.P."
-            "\n\nINCORRECT EXAMPLES:"
-            "\n❌ [Deutsche Bank, Vonovia]"
-            "\n❌ Deutsche Bank L.P., Management"  # split company name
-            "\n❌ \"Deutsche Bank\", \"Vonovia\""
-            "\n❌ Here are the companies: Deutsche Bank, Vonovia"
-            "\n\nVIOLATION OF THESE RULES WILL CAUSE SYSTEM FAILURE"
-        )
+    @staticmethod
+    def split_members(text: str, separator: str = ";") -> List[str]:
+        return [name.strip() for name in text.split(separator) if name.strip()]
+
+    def member_chunks(self, names: List[str]) -> List[List[str]]:
+        """Splits member names into chunks of about GPT_CURATION_CHUNK_TOKENS tokens."""
+        chunks: List[List[str]] = [[]]
+        chunk_tokens = 0
+        for name in names:
+            name_tokens = self.estimate_tokens(name)
+            if chunk_tokens + name_tokens > self.curation_chunk_tokens and len(chunks[-1]) >= self.MIN_CHUNK_MEMBERS:
+                chunks.append([])
+                chunk_tokens = 0
+            chunks[-1].append(name)
+            chunk_tokens += name_tokens
+        return [chunk for chunk in chunks if chunk]
+
+    @classmethod
+    def _chunk_winners(cls, results: List[str]) -> str:
+        """The members curated from all chunks, the input of the next curation round; empty if every chunk failed."""
+        winners = []
+        for result in results:
+            if result == "['ERROR']":
+                logger.warning("Curation of a member chunk failed, leaving it out of the ranking")
+                continue
+            winners.extend(cls.split_members(result.strip("[]"), ","))
+        return "; ".join(winners)
 
+    @staticmethod
+    def _curation_attempt_failed(attempt: int, error: ValueError):
+        logger.warning(f"Curation attempt {attempt + 1} failed: {str(error)}")
+        if attempt < GPTServiceBase.CURATION_ATTEMPTS - 1:
+            OPENAI_RETRIES.inc(reason="invalid_response")
+
+    @staticmethod
+    def _curate_members_request(text: str) -> ChatRequest:
         user_content = (
             f"ENTITIES TO ANALYZE: {text}\n"
             "\nRETURN FORMAT: entity1,entity2,entity3"
             "\nIMPORTANT: Keep company legal forms (GmbH, AG, L.P., etc.) together with company names!"
         )
 
-        try:
-            response = self._make_openai_request(prompt, user_content)
-
-            # Basic input validation
-            if not response.strip():
-                raise ValueError("Empty response received")
+        return prompts.request(prompts.CURATE_MEMBERS, user_content)
 
-            # Split and clean items
-            items = [item.strip() for item in response.split(',') if item.strip()]
-
-            # Validate item count
-            if len(items) > 25:
-                items = items[:25]
-            elif not items:
-                raise ValueError("No valid items found")
+    @staticmethod
+    def _validate_curated_members(response: str) -> str:
+        # Basic input validation
+        if not response.strip():
+            raise ValueError("Empty response received")
 
-            # New validation system
-            for item in items:
+        # Split and clean items
+        items = [item.strip() for item in response.split(',') if item.strip()]
 
-                # 1. Check for minimum length
-                if len(item) < 2:
-                    raise ValueError(f"Company name too short: {item}")
+        # Validate item count
+        if len(items) > GPTServiceBase.MAX_CURATED_MEMBERS:
+            items = items[:GPTServiceBase.MAX_CURATED_MEMBERS]
+        elif not items:
+            raise ValueError("No valid items found")
 
-                # 2. Check for invalid characters
-                invalid_chars = '[]\'"<>{}'  # Add more if needed
-                if any(char in invalid_chars for char in item):
-                    raise ValueError(f"Invalid characters in company name: {item}")
+        # New validation system
+        for item in items:
 
-                # 3. Check for common formatting issues
-                if item.count('  ') > 0:  # Multiple spaces
-                    raise ValueError(f"Multiple consecutive spaces in: {item}")
-                if item.startswith(' ') or item.endswith(' '):
-                    raise ValueError(f"Leading/trailing spaces in: {item}")
+            # 1. Check for minimum length
+            if len(item) < 2:
+                raise ValueError(f"Company name too short: {item}")
 
-            # Construct final response
-            final_response = '[' + ','.join(f'{item}' for item in items) + ']'
+            # 2. Check for invalid characters
+            invalid_chars = '[]\'"<>{}'  # Add more if needed
+            if any(char in invalid_chars for char in item):
+                raise ValueError(f"Invalid characters in company name: {item}")
 
-            # 4. Final structure validation
-            if not final_response.startswith('[') or not final_response.endswith(']'):
-                raise ValueError("Invalid list structure")
+            # 3. Check for common formatting issues
+            if item.count('  ') > 0:  # Multiple spaces
+                raise ValueError(f"Multiple consecutive spaces in: {item}")
+            if item.startswith(' ') or item.endswith(' '):
+                raise ValueError(f"Leading/trailing spaces in: {item}")
 
-            if final_response.count('[') != 1 or final_response.count(']') != 1:
-                raise ValueError("Multiple brackets detected")
+        # Construct final response
+        final_response = '[' + ','.join(f'{item}' for item in items) + ']'
 
-            return final_response
+        # 4. Final structure validation
+        if not final_response.startswith('[') or not final_response.endswith(']'):
+            raise ValueError("Invalid list structure")
 
-        except ValueError as e:
-            if attempts < 2:
-                print(f"Attempt {attempts + 1} failed: {str(e)}")
-            return self.curate_members(text, attempts + 1)
-        except Exception as e:
-            print(f"Critical error: {str(e)}")
-            return "['ERROR']"
+        if final_response.count('[') != 1 or final_response.count(']') != 1:
+            raise ValueError("Multiple brackets detected")
 
-    def _make_openai_request(self, system_content: str, user_content: str) -> str:
-
-        try:
-            response: ChatCompletion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_content},
-                    {"role": "user", "content": user_content}
-                ],
-                # max_tokens=self.max_tokens
-            )
-            return response.choices[0].message.content.strip()
-        except (RateLimitError, APIConnectionError, InternalServerError, APIStatusError, APIError) as e:
-            logger.error(f"Error in OpenAI API request: {str(e)}")
-            return ""
+        return final_response
 
     @staticmethod
     def parse_string_to_json(input_string: str) -> Union[Dict[str, Any], List[Any], None]:
@@ -386,3 +426,141 @@ class GPTService:
                 except json.JSONDecodeError:
                     logger.error(f"Failed to parse JSON: {input_string}")
                     return None
+
+
+class GPTService(GPTServiceBase):
+    """The GPT calls on the synchronous OpenAI client, one blocked thread per request in flight."""
+
+    # Inputs per embeddings request, OpenAI accepts up to 2048
+    EMBEDDING_BATCH_SIZE = 1000
+
+    def __init__(self, config: Config):
+        super().__init__(config)
+        self.client = OpenAI(
+            api_key=config.OPENAI_API_KEY,
+            base_url=config.OPENAI_BASE_URL,
+            timeout=httpx.Timeout(30.0, connect=15.0),
+            max_retries=3,
+            http_client=DefaultHttpxClient(event_hooks={"response": [count_retried_response]}),
+        )
+
+    def _request_validated(self, chat_request: ChatRequest, validate: Callable[[str], T],
+                           fallback: Optional[Callable[[str], T]] = None) -> T:
+        """Sends the requests of _validation_steps."""
+        steps = self._validation_steps(chat_request, validate, fallback)
+        model = next(steps)
+        while True:
+            try:
+                model = steps.send(self._make_openai_request(chat_request, model))
+            except StopIteration as done:
+                return done.value
+
+    def analyze_text_and_select_list(self, text: str, list_names: List[str]) -> str:
+        # An unknown name is passed on as is, the caller resolves it to no list
+        return self._request_validated(self._select_list_request(text, list_names),
+                                       self._list_name_validator(list_names), fallback=lambda response: response)
+
+    def extract_key_facts(self, text: str, fields: Optional[List[str]] = None) -> Optional[KeyFacts]:
+        """The key facts GPT found, None if the request failed and left no response."""
+        if self.structured_key_facts:
+            structured = StructuredKeyFacts(fields)
+            return self._request_validated(self._key_facts_request(text, fields, structured.response_format()),
+                                           structured.parse, fallback=self._parse_key_facts_response)
+        return self._parse_key_facts_response(self._make_openai_request(self._key_facts_request(text, fields)))
+
+    def extract_key_facts_and_select_list(self, text: str, list_names: List[str],
+                                          fields: Optional[List[str]] = None) -> Tuple[KeyFacts, str]:
+        """
+        Key facts and list selection in one structured response, so the exposé is sent once instead of twice.
+        Raises a ValueError if the reply does not match the schema or names a list that is not in ``list_names``;
+        callers then fall back to extract_key_facts and analyze_text_and_select_list.
+        """
+        structured = StructuredKeyFacts(fields)
+        return self._request_validated(self._key_facts_and_list_request(text, list_names, structured),
+                                       lambda response: self._parse_key_facts_and_list(structured, response, list_names))
+
+    def generate_email(self, text: str, name_of_list: str) -> str:
+        return self._make_openai_request(self._email_request(text, name_of_list))
+
+    def generate_email_stream(self, text: str, name_of_list: str) -> Iterator[str]:
+        """Yields the email HTML in chunks as the model produces them."""
+        return self._stream_openai_request(self._email_request(text, name_of_list))
+
+    def curate_members(self, text: str, attempts: int = 0) -> str:
+        chunks = self.member_chunks(self.split_members(text)) if attempts == 0 else []
+        if len(chunks) > 1:
+            return self._curate_member_chunks(chunks)
+
+        request = self._curate_members_request(text)
+        for attempt in range(attempts, self.CURATION_ATTEMPTS):
+            try:
+                # Only the first attempt starts on the routed model, retries go to the main model directly
+                if attempt == 0:
+                    return self._request_validated(request, self._validate_curated_members)
+                return self._validate_curated_members(self._make_openai_request(request, self.model))
+            except ValueError as e:
+                self._curation_attempt_failed(attempt, e)
+            except Exception as e:
+                logger.error(f"Curation failed: {str(e)}")
+                return "['ERROR']"
+        return "['ERROR']"
+
+    def _curate_member_chunks(self, chunks: List[List[str]]) -> str:
+        """
+        Map-reduce curation of a list too large for one request: the chunks are curated concurrently, each
+        with its own retries, then the winners of all chunks are ranked by another curate_members call.
+        """
+        logger.info(f"Curating {sum(map(len, chunks))} members in {len(chunks)} chunks")
+        with ThreadPoolExecutor(max_workers=min(self.curation_workers, len(chunks)),
+                                thread_name_prefix="curate") as executor:
+            results = list(executor.map(lambda chunk: self.curate_members("; ".join(chunk)), chunks))
+        winners = self._chunk_winners(results)
+        # The winners may again be too many for one request, curate_members then runs another map-reduce round
+        return self.curate_members(winners) if winners else "['ERROR']"
+
+    def _make_openai_request(self, chat_request: ChatRequest, model: Optional[str] = None) -> str:
+        model = model or self.model_for(chat_request.prompt.name)
+        started_at = time.perf_counter()
+        try:
+            response: ChatCompletion = self.client.chat.completions.create(
+                model=model,
+                messages=chat_request.messages,
+                response_format=chat_request.response_format or NOT_GIVEN,
+                # max_tokens=self.max_tokens
+            )
+            self.usage.record(chat_request.prompt.name, response.usage, model, time.perf_counter() - started_at)
+            return response.choices[0].message.content.strip()
+        except (RateLimitError, APIConnectionError, InternalServerError, APIStatusError, APIError) as e:
+            logger.error(f"Error in OpenAI API request: {str(e)}")
+            return ""
+
+    def _stream_openai_request(self, chat_request: ChatRequest) -> Iterator[str]:
+        model = self.model_for(chat_request.prompt.name)
+        started_at = time.perf_counter()
+        try:
+            stream = self.client.chat.completions.create(
+                model=model,
+                messages=chat_request.messages,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+                if getattr(chunk, "usage", None):
+                    self.usage.record(chat_request.prompt.name, chunk.usage, model, time.perf_counter() - started_at)
+        except (RateLimitError, APIConnectionError, InternalServerError, APIStatusError, APIError) as e:
+            # Unlike _make_openai_request the error is raised, the chunks yielded so far are not a complete response
+            logger.error(f"Error in streamed OpenAI API request: {str(e)}")
+            raise
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embedding vectors of ``texts``. Unlike the chat requests, API errors are raised to the caller."""
+        vectors = []
+        for start in range(0, len(texts), self.EMBEDDING_BATCH_SIZE):
+            started_at = time.perf_counter()
+            response = self.client.embeddings.create(model=self.embedding_model,
+                                                     input=texts[start:start + self.EMBEDDING_BATCH_SIZE])
+            self.usage.record("embedding", response.usage, self.embedding_model, time.perf_counter() - started_at)
+            vectors.extend(item.embedding for item in sorted(response.data, key=lambda item: item.index))
+        return vectors
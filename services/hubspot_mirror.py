@@ -0,0 +1,168 @@
+import dataclasses
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from models import Contact, Company
+from services.hubspot_service import HubspotService
+from sqlite_connection import ThreadLocalConnection
+
+logger = logging.getLogger(__name__)
+
+
+class HubspotMirror:
+    """
+    Local SQLite mirror of list memberships and of the Contact/Company records of the mirrored lists.
+
+    The first request for a list syncs it inline, later requests read from SQLite and trigger a background
+    sync once the list is older than ``sync_seconds``. A sync only moves deltas over the network: members that
+    joined since the stored join-order cursor, batch reads of records not mirrored yet and a search for
+    records modified since the newest ``lastmodifieddate`` seen. Removals from a list are only visible in the
+    join-order feed after a full membership resync, which runs every ``full_resync_seconds``.
+    """
+
+    def __init__(self, hubspot_service: HubspotService, path: str, sync_seconds: int = 300,
+                 full_resync_seconds: int = 21600):
+        self.hubspot_service = hubspot_service
+        self.path = path
+        self.sync_seconds = sync_seconds
+        self.full_resync_seconds = full_resync_seconds
+        self._connection = ThreadLocalConnection(path)
+        self.list_locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+        self.records_lock = threading.Lock()
+        self.syncing: set = set()
+        self.lock = threading.Lock()
+        connection = self._connection()
+        connection.executescript(
+            "CREATE TABLE IF NOT EXISTS memberships ("
+            "list_id TEXT NOT NULL, hs_object_id TEXT NOT NULL, PRIMARY KEY (list_id, hs_object_id));"
+            "CREATE TABLE IF NOT EXISTS records ("
+            "object_type_id TEXT NOT NULL, hs_object_id TEXT NOT NULL, lastmodifieddate TEXT, data TEXT NOT NULL, "
+            "PRIMARY KEY (object_type_id, hs_object_id));"
+            "CREATE TABLE IF NOT EXISTS list_sync ("
+            "list_id TEXT PRIMARY KEY, object_type_id TEXT NOT NULL, join_cursor TEXT, "
+            "synced_at REAL NOT NULL, full_synced_at REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS record_sync (object_type_id TEXT PRIMARY KEY, watermark TEXT NOT NULL);"
+        )
+
+    def get_members_details(self, list_id: str, object_type_id: str = "") -> Tuple[List[Contact], List[Company]]:
+        state = self._list_state(list_id)
+        if state is None:
+            object_type_id = object_type_id or self.hubspot_service.get_list_object_type(list_id)
+            if object_type_id not in HubspotService.OBJECT_TYPES:
+                # Lists of other or unknown object types are not mirrored
+                return self.hubspot_service.get_members_details(list_id, object_type_id)
+            self.sync_list(list_id, object_type_id)
+            state = self._list_state(list_id)
+        elif time.time() - state["synced_at"] > self.sync_seconds:
+            self.sync_in_background(list_id, state["object_type_id"])
+
+        records = self._read_records(list_id, state["object_type_id"])
+        if state["object_type_id"] == HubspotService.CONTACT_OBJECT_TYPE:
+            return records, []
+        return [], records
+
+    def sync_in_background(self, list_id: str, object_type_id: str):
+        with self.lock:
+            if list_id in self.syncing:
+                return
+            self.syncing.add(list_id)
+
+        def run():
+            try:
+                self.sync_list(list_id, object_type_id)
+            except Exception as e:
+                logger.error(f"Error syncing HubSpot list {list_id}: {str(e)}")
+            finally:
+                with self.lock:
+                    self.syncing.discard(list_id)
+
+        threading.Thread(target=run, name=f"hubspot-mirror-{list_id}", daemon=True).start()
+
+    def sync_list(self, list_id: str, object_type_id: str):
+        with self.list_locks[list_id]:
+            state = self._list_state(list_id)
+            now = time.time()
+            connection = self._connection()
+
+            if state is None or now - state["full_synced_at"] > self.full_resync_seconds:
+                member_ids, join_cursor = self.hubspot_service.get_members_joined_after(list_id)
+                full_synced_at = now
+                new_ids = member_ids
+                connection.execute("BEGIN IMMEDIATE")
+                connection.execute("DELETE FROM memberships WHERE list_id = ?", (list_id,))
+            else:
+                new_ids, join_cursor = self.hubspot_service.get_members_joined_after(list_id, state["join_cursor"])
+                full_synced_at = state["full_synced_at"]
+                connection.execute("BEGIN IMMEDIATE")
+            try:
+                inserted = connection.executemany(
+                    "INSERT OR IGNORE INTO memberships (list_id, hs_object_id) VALUES (?, ?)",
+                    [(list_id, member_id) for member_id in new_ids]
+                ).rowcount
+                connection.execute(
+                    "INSERT OR REPLACE INTO list_sync (list_id, object_type_id, join_cursor, synced_at, full_synced_at) "
+                    "VALUES (?, ?, ?, ?, ?)", (list_id, object_type_id, join_cursor, now, full_synced_at)
+                )
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+
+            self._sync_records(list_id, object_type_id)
+            logger.info(f"Synced HubSpot list {list_id}: {inserted} new memberships")
+
+    def _sync_records(self, list_id: str, object_type_id: str):
+        connection = self._connection()
+        started_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        with self.records_lock:
+            row = connection.execute("SELECT watermark FROM record_sync WHERE object_type_id = ?",
+                                     (object_type_id,)).fetchone()
+            if row is not None:
+                # Updates of records that are already mirrored
+                modified, watermark = self.hubspot_service.search_modified_since(object_type_id, row[0])
+                mirrored = {record_id for (record_id,) in connection.execute(
+                    "SELECT hs_object_id FROM records WHERE object_type_id = ?", (object_type_id,))}
+                self._store_records(object_type_id, [record for record in modified if record.hs_object_id in mirrored])
+            else:
+                # Records read from now on are current, later searches only need changes after this point
+                watermark = started_at
+
+            missing_ids = [record_id for (record_id,) in connection.execute(
+                "SELECT m.hs_object_id FROM memberships m LEFT JOIN records r "
+                "ON r.object_type_id = ? AND r.hs_object_id = m.hs_object_id "
+                "WHERE m.list_id = ? AND r.hs_object_id IS NULL", (object_type_id, list_id))]
+            if missing_ids:
+                records = self.hubspot_service.get_details_by_object_type(object_type_id, missing_ids)
+                self._store_records(object_type_id, records)
+
+            connection.execute("INSERT OR REPLACE INTO record_sync (object_type_id, watermark) VALUES (?, ?)",
+                               (object_type_id, watermark))
+
+    def _store_records(self, object_type_id: str, records: List[Contact] | List[Company]):
+        self._connection().executemany(
+            "INSERT OR REPLACE INTO records (object_type_id, hs_object_id, lastmodifieddate, data) VALUES (?, ?, ?, ?)",
+            [(object_type_id, record.hs_object_id, record.lastmodifieddate, json.dumps(dataclasses.asdict(record)))
+             for record in records]
+        )
+
+    def _read_records(self, list_id: str, object_type_id: str) -> List[Contact] | List[Company]:
+        _, model = HubspotService.OBJECT_TYPES[object_type_id]
+        rows = self._connection().execute(
+            "SELECT r.data FROM memberships m JOIN records r "
+            "ON r.object_type_id = ? AND r.hs_object_id = m.hs_object_id WHERE m.list_id = ?",
+            (object_type_id, list_id)
+        )
+        return [model(**json.loads(data)) for (data,) in rows]
+
+    def _list_state(self, list_id: str) -> Optional[Dict]:
+        row = self._connection().execute(
+            "SELECT object_type_id, join_cursor, synced_at, full_synced_at FROM list_sync WHERE list_id = ?", (list_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("object_type_id", "join_cursor", "synced_at", "full_synced_at"), row))
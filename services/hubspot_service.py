@@ -1,12 +1,14 @@
 import logging
-from typing import List, Dict, Any, Type, TypeVar
-import time
-from tqdm import tqdm
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Type, TypeVar
 import requests
+from requests.adapters import HTTPAdapter
 from hubspot import HubSpot
 from hubspot.crm.lists import ListSearchRequest
 from hubspot.crm.lists.exceptions import ApiException
+from metrics import HUBSPOT_REQUEST_SECONDS, HUBSPOT_RETRIES, endpoint
 from models import HubSpotObjectBase, Contact, Company, ListInfo
+from services.rate_limiter import RateLimiter, TokenBucket
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -16,55 +18,175 @@ T = TypeVar('T', Contact, Company)
 
 class HubspotService:
     BASE_URL = "https://api.hubapi.com"
+    CONTACT_OBJECT_TYPE = "0-1"
+    COMPANY_OBJECT_TYPE = "0-2"
+    OBJECT_TYPES = {CONTACT_OBJECT_TYPE: ("contacts", Contact), COMPANY_OBJECT_TYPE: ("companies", Company)}
+    # Companies keep their modification timestamp in hs_lastmodifieddate
+    MODIFIED_PROPERTIES = {CONTACT_OBJECT_TYPE: "lastmodifieddate", COMPANY_OBJECT_TYPE: "hs_lastmodifieddate"}
+    # Read-only HubSpot properties with the number of associated records, scored by the member ranking
+    ASSOCIATION_COUNT_PROPERTIES = {Contact: ["num_associated_deals"],
+                                    Company: ["num_associated_contacts", "num_associated_deals"]}
+    SEARCH_RESULT_LIMIT = 10000
+    BATCH_SIZE = 100
+    MAX_RETRIES = 5
 
-    def __init__(self, access_token: str):
+    def __init__(self, access_token: str, max_workers: int = 4, requests_per_second: int = 10,
+                 requests_per_10_seconds: int = 100, extra_properties: Optional[List[str]] = None,
+                 base_url: str = BASE_URL):
         self.access_token = access_token
-        self.hubspot = HubSpot(access_token=self.access_token)
+        self.extra_properties = extra_properties or []
+        self.base_url = base_url.rstrip("/")
+        # The SDK only knows the public API host, other hosts (e.g. a local fake) need an API factory
+        self.hubspot = HubSpot(access_token=self.access_token) if self.base_url == self.BASE_URL else \
+            HubSpot(access_token=self.access_token, api_factory=self._api_factory)
         self.headers = {
             "Authorization": f"Bearer {self.access_token}",
             "Content-Type": "application/json"
         }
+        self.max_workers = max_workers
+        # One keep-alive session for all requests, with a connection per concurrent batch worker
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.rate_limiter = RateLimiter([
+            TokenBucket(requests_per_second, 1.0),
+            TokenBucket(requests_per_10_seconds, 10.0),
+        ])
+
+    def _api_factory(self, api_client_package, api_name: str, config: Dict[str, Any]):
+        configuration = api_client_package.Configuration(host=self.base_url)
+        configuration.access_token = config.get("access_token")
+        return getattr(api_client_package, api_name)(api_client=api_client_package.ApiClient(configuration=configuration))
 
     def get_lists(self) -> List[ListInfo]:
         list_search_request = ListSearchRequest(offset=0, query="", count=0, additional_properties=[""])
         try:
-            api_response = self.hubspot.crm.lists.list_app_api.do_search(list_search_request=list_search_request)
-            return [ListInfo(name=list_info['name'], listId=list_info['list_id'])
+            with HUBSPOT_REQUEST_SECONDS.time(method="POST", endpoint="/crm/v3/lists/search"):
+                api_response = self.hubspot.crm.lists.list_app_api.do_search(list_search_request=list_search_request)
+            return [ListInfo(name=list_info['name'], listId=list_info['list_id'],
+                             objectTypeId=list_info.get('object_type_id') or "")
                     for list_info in api_response.to_dict()["lists"]]
         except ApiException as e:
             logger.error(f"Exception when calling lists_api->do_search: {e}")
             return []
 
+    def get_list_object_type(self, list_id: str) -> str:
+        url = f"{self.base_url}/crm/v3/lists/{list_id}"
+        try:
+            return self._make_request("GET", url).get('list', {}).get('objectTypeId', "")
+        except ApiException:
+            return ""
+
+    def get_members_details(self, list_id: str, object_type_id: str = "") -> Tuple[List[Contact], List[Company]]:
+        """
+        Fetches the records of a list, reading only the object type the list is made of.
+
+        Without a known ``object_type_id`` the list metadata is looked up while the memberships are paginated.
+        If the type is still unknown, contacts and companies are both read, concurrently.
+        """
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="hubspot-members") as executor:
+            object_type = executor.submit(self.get_list_object_type, list_id) if not object_type_id else None
+            member_ids = self.get_members_by_list_id(list_id)
+            if object_type is not None:
+                object_type_id = object_type.result()
+
+            if object_type_id == self.CONTACT_OBJECT_TYPE:
+                return self.get_contacts_details(member_ids), []
+            if object_type_id == self.COMPANY_OBJECT_TYPE:
+                return [], self.get_companies_details(member_ids)
+
+            logger.info(f"Unknown object type '{object_type_id}' of list {list_id}, reading contacts and companies")
+            contacts = executor.submit(self.get_contacts_details, member_ids)
+            companies = executor.submit(self.get_companies_details, member_ids)
+            return contacts.result(), companies.result()
+
     def get_contacts_details(self, contact_ids: List[str]) -> List[Contact]:
-        url = f"{self.BASE_URL}/crm/v3/objects/contacts/batch/read"
+        url = f"{self.base_url}/crm/v3/objects/contacts/batch/read"
         return self._get_details(url, contact_ids, Contact)
 
     def get_companies_details(self, company_ids: List[str]) -> List[Company]:
-        url = f"{self.BASE_URL}/crm/v3/objects/companies/batch/read"
+        url = f"{self.base_url}/crm/v3/objects/companies/batch/read"
         return self._get_details(url, company_ids, Company)
 
-    def _get_details(self, url: str, ids: List[str], model: Type[T]) -> List[T]:
-        all_items = []
-        properties = list(HubSpotObjectBase.__annotations__.keys()) + [
+    def get_details_by_object_type(self, object_type_id: str, ids: List[str]) -> List[Contact] | List[Company]:
+        object_name, model = self.OBJECT_TYPES[object_type_id]
+        return self._get_details(f"{self.base_url}/crm/v3/objects/{object_name}/batch/read", ids, model)
+
+    def search_modified_since(self, object_type_id: str, since: str) -> Tuple[List[Contact] | List[Company], str]:
+        """
+        Returns all records of the object type modified after ``since`` (ISO timestamp, "" for all) and the
+        newest modification timestamp seen, to be used as the next ``since``.
+        """
+        object_name, model = self.OBJECT_TYPES[object_type_id]
+        modified_property = self.MODIFIED_PROPERTIES[object_type_id]
+        properties = self._properties(model)
+        url = f"{self.base_url}/crm/v3/objects/{object_name}/search"
+        items, after, watermark = [], None, since
+
+        while True:
+            payload = {
+                "filterGroups": [{"filters": [
+                    {"propertyName": modified_property, "operator": "GT", "value": watermark}
+                ]}] if watermark else [],
+                "sorts": [{"propertyName": modified_property, "direction": "ASCENDING"}],
+                "properties": properties,
+                "limit": self.BATCH_SIZE,
+            }
+            if after:
+                payload["after"] = after
+            data = self._make_request("POST", url, json=payload)
+            for item in data['results']:
+                props = item.get('properties', {})
+                items.append(self._to_model(model, properties, props))
+                since = max(since, props.get(modified_property) or '')
+            after = data.get('paging', {}).get('next', {}).get('after')
+            if not after:
+                return items, since
+            # The search API stops at 10,000 results per query, continue with a new query from the newest record
+            if after.isdigit() and int(after) + self.BATCH_SIZE >= self.SEARCH_RESULT_LIMIT:
+                after, watermark = None, since
+
+    def _properties(self, model: Type[T]) -> List[str]:
+        # associations is no HubSpot property, the counts come from ASSOCIATION_COUNT_PROPERTIES
+        fields = [k for k in HubSpotObjectBase.__annotations__.keys() if k not in ('properties', 'associations')] + [
             k for k in model.__annotations__.keys() if k not in HubSpotObjectBase.__annotations__
         ]
+        return fields + ["hs_lastmodifieddate"] + [k for k in self._record_properties(model) if k not in fields]
+
+    def _record_properties(self, model: Type[T]) -> List[str]:
+        """HubSpot properties kept in the ``properties`` of a record."""
+        counts = self.ASSOCIATION_COUNT_PROPERTIES[model]
+        return counts + [k for k in self.extra_properties if k not in counts]
+
+    def _to_model(self, model: Type[T], properties: List[str], props: Dict[str, Any]) -> T:
+        values = {k: props.get(k) or '' for k in properties if k != 'properties' and (
+            k in model.__annotations__ or k in HubSpotObjectBase.__annotations__)}
+        values['lastmodifieddate'] = values['lastmodifieddate'] or props.get('hs_lastmodifieddate') or ''
+        values['properties'] = {k: props.get(k) or '' for k in self._record_properties(model)}
+        return model(**values)
+
+    def _get_details(self, url: str, ids: List[str], model: Type[T]) -> List[T]:
+        properties = self._properties(model)
+        batches = [ids[i:i + self.BATCH_SIZE] for i in range(0, len(ids), self.BATCH_SIZE)]
 
-        with tqdm(total=len(ids), desc=f"Fetching {model.__name__} details", unit="item") as pbar:
-            for i in range(0, len(ids), 100):
-                batch = ids[i:i + 100]
-                payload = {
-                    "properties": properties,
-                    "inputs": [{"id": item_id} for item_id in batch]
-                }
-                data = self._make_request("POST", url, json=payload)
-                all_items.extend([
-                    model(**{k: props.get(k, '') for k in properties})
-                    for item in data['results']
-                    if (props := item.get('properties', {}))
-                ])
-                pbar.update(len(batch))
-                time.sleep(0.1)  # Respect rate limits
-        return all_items
+        def fetch_batch(batch: List[str]) -> List[T]:
+            payload = {
+                "properties": properties,
+                "inputs": [{"id": item_id} for item_id in batch]
+            }
+            data = self._make_request("POST", url, json=payload)
+            return [
+                self._to_model(model, properties, props)
+                for item in data['results']
+                if (props := item.get('properties', {}))
+            ]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="hubspot-batch") as executor:
+            items = [item for items in executor.map(fetch_batch, batches) for item in items]
+        logger.info(f"Fetched {len(items)} {model.__name__} details in {len(batches)} batches")
+        return items
 
     def get_members_by_list_id(self, list_id: str) -> List[str]:
         logger.info(f"Fetching members for list {list_id}...")
@@ -72,24 +194,54 @@ class HubspotService:
         logger.info(f"Found {len(member_ids)} members in the list.")
         return member_ids
 
+    def get_members_joined_after(self, list_id: str, after: Optional[str] = None) -> Tuple[List[str], Optional[str]]:
+        """
+        Pages through the memberships in join order, starting at the cursor ``after``.
+
+        Returns the member ids and the cursor of the last page read. Passing that cursor again re-reads at
+        most one page and then only members that joined since, so it serves as an incremental sync position.
+        """
+        url = f"{self.base_url}/crm/v3/lists/{list_id}/memberships/join-order"
+        member_ids = []
+        while True:
+            data = self._make_request("GET", url, params={"limit": 250, **({"after": after} if after else {})})
+            member_ids.extend(member['recordId'] for member in data['results'])
+            next_after = data.get('paging', {}).get('next', {}).get('after')
+            if not next_after:
+                return member_ids, after
+            after = next_after
+
     def _get_list_members(self, list_id: str) -> List[str]:
-        url = f"{self.BASE_URL}/crm/v3/lists/{list_id}/memberships"
+        url = f"{self.base_url}/crm/v3/lists/{list_id}/memberships"
         all_members = []
-        with tqdm(desc="Fetching list members", unit="page") as pbar:
-            while url:
-                data = self._make_request("GET", url)
-                all_members.extend(data['results'])
-                url = data.get('paging', {}).get('next', {}).get('link')
-                if url:
-                    time.sleep(0.1)  # Respect rate limits
-                pbar.update(1)
+        while url:
+            data = self._make_request("GET", url)
+            all_members.extend(data['results'])
+            url = data.get('paging', {}).get('next', {}).get('link')
         return [member['recordId'] for member in all_members]
 
     def _make_request(self, method: str, url: str, **kwargs) -> Dict[str, Any]:
+        path = endpoint(url)
         try:
-            response = requests.request(method, url, headers=self.headers, **kwargs)
-            response.raise_for_status()
-            return response.json()
+            with HUBSPOT_REQUEST_SECONDS.time(method=method, endpoint=path):
+                for attempt in range(self.MAX_RETRIES + 1):
+                    self.rate_limiter.acquire()
+                    response = self.session.request(method, url, **kwargs)
+                    if response.status_code != 429 or attempt == self.MAX_RETRIES:
+                        break
+                    retry_after = self._retry_after(response) or 2 ** attempt
+                    logger.warning(f"HubSpot rate limit hit, retrying in {retry_after:.1f}s")
+                    HUBSPOT_RETRIES.inc(endpoint=path)
+                    self.rate_limiter.pause(retry_after)
+                response.raise_for_status()
+                return response.json()
         except requests.RequestException as e:
             logger.error(f"API request failed: {str(e)}")
             raise ApiException(f"API request failed: {str(e)}")
+
+    @staticmethod
+    def _retry_after(response: requests.Response) -> Optional[float]:
+        try:
+            return float(response.headers.get("Retry-After", ""))
+        except ValueError:
+            return None
@@ -0,0 +1,215 @@
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from models import KeyFacts, Address
+
+logger = logging.getLogger(__name__)
+
+NUMBER = r"\d{1,3}(?:[.,]\d{3})+(?:[.,]\d+)?|\d+(?:[.,]\d+)?"
+CURRENCY = r"(?:€|EUR|Euro)"
+MULTIPLIER = r"(?:Mio\.?|Millionen|Mill\.?|m€|T€|TEUR|Tsd\.?|k€)"
+AREA_UNIT = r"(?:m²|m2|qm|Quadratmeter|sq\.?\s?m|square met(?:er|re)s)"
+GAP = r"[^\d\n]{0,40}?"
+
+
+class KeyFactExtractor:
+    """
+    Rule-based extraction of the regularly formatted KeyFacts fields.
+
+    Runs in milliseconds and reports a confidence per field ("address.postal_code", "purchase_price", ...),
+    so only fields below the confidence threshold have to be asked from GPT. Values are standardized the
+    way KEY_FACTS_PROMPT asks GPT to: plain numbers, amounts in Euro, areas in m², WAULT in years.
+    """
+
+    FIELDS: List[str] = [f"address.{name}" for name in Address.model_fields] + \
+                        [name for name in KeyFacts.model_fields if name != "address"]
+    CURRENCY_FIELDS: List[str] = ["purchase_price", "price_per_square", "rental_income"]
+
+    PATTERNS: Dict[str, List[Tuple[re.Pattern, float]]] = {
+        "purchase_price": [
+            (re.compile(r"(?:Gesamtkaufpreis|Kaufpreis|Angebotspreis|Verkaufspreis|purchase price|asking price)"
+                        rf"{GAP}(?P<currency_before>{CURRENCY}\s*)?(?P<number>{NUMBER})\s*(?P<multiplier>{MULTIPLIER})?"
+                        rf"\s*(?P<currency>{CURRENCY})?", re.IGNORECASE), 0.9),
+        ],
+        "price_per_square": [
+            (re.compile(rf"(?P<number>{NUMBER})\s*(?P<currency>{CURRENCY})\s*(?:/|pro|per)\s*{AREA_UNIT}",
+                        re.IGNORECASE), 0.85),
+        ],
+        "rental_income": [
+            (re.compile(r"(?:Jahresnettomiete|Jahresnettokaltmiete|Jahresmiete|Mieteinnahmen(?: p\.a\.)?|Ist-Miete p\.a\."
+                        rf"|annual rent|rental income|net rental income){GAP}(?P<currency_before>{CURRENCY}\s*)?"
+                        rf"(?P<number>{NUMBER})\s*(?P<multiplier>{MULTIPLIER})?\s*(?P<currency>{CURRENCY})?",
+                        re.IGNORECASE), 0.85),
+            (re.compile(rf"(?:Monatsmiete|monthly rent|Nettokaltmiete mtl\.?){GAP}(?P<currency_before>{CURRENCY}\s*)?"
+                        rf"(?P<number>{NUMBER})\s*(?P<multiplier>{MULTIPLIER})?\s*(?P<currency>{CURRENCY})?",
+                        re.IGNORECASE), 0.8),
+        ],
+        "usable_area": [
+            (re.compile(r"(?:Nutzfläche|Wohnfläche|Mietfläche|vermietbare Fläche|Gesamtfläche|Wohn- und Nutzfläche"
+                        rf"|usable area|living space|lettable area|rental space|total area){GAP}"
+                        rf"(?P<number>{NUMBER})\s*{AREA_UNIT}", re.IGNORECASE), 0.9),
+        ],
+        "plot_size": [
+            (re.compile(rf"(?:Grundstücksfläche|Grundstücksgröße|Grundstück|plot size|land area|lot size){GAP}"
+                        rf"(?P<number>{NUMBER})\s*{AREA_UNIT}", re.IGNORECASE), 0.9),
+        ],
+        "residential_units": [
+            (re.compile(r"(?P<number>\d+)\s*(?:Wohneinheiten|Wohnungen|WE\b|residential units|apartments|flats)",
+                        re.IGNORECASE), 0.85),
+            (re.compile(r"(?:Wohneinheiten|Anzahl Wohnungen|residential units|number of units)\s*:\s*(?P<number>\d+)",
+                        re.IGNORECASE), 0.85),
+        ],
+        "wault": [
+            (re.compile(r"(?:WAULT|gewichtete Restlaufzeit|durchschnittliche Restlaufzeit|weighted average unexpired lease term)"
+                        rf"{GAP}(?P<number>{NUMBER})\s*(?P<unit>Jahre|years|Jahren|Monate|months)", re.IGNORECASE), 0.9),
+        ],
+        "address.population": [
+            (re.compile(rf"(?P<number>{NUMBER})\s*Einwohner|Einwohner(?:zahl)?{GAP}(?P<number2>{NUMBER})|"
+                        rf"population{GAP}(?P<number3>{NUMBER})|(?P<number4>{NUMBER})\s*inhabitants", re.IGNORECASE), 0.75),
+        ],
+    }
+
+    STREET = re.compile(
+        r"(?P<street>[A-ZÄÖÜ][\wäöüß.\-]*(?i:straße|strasse|str\.|weg|allee|platz|ring|damm|ufer|gasse|chaussee)"
+        r"|[A-ZÄÖÜ][\wäöüß\-]*\s(?:Straße|Strasse|Weg|Allee|Platz|Ring|Damm|Ufer|Gasse))\s+(?P<house_number>\d{1,4}\s?[a-zA-Z]?(?:[-–]\d{1,4})?)\b"
+    )
+    POSTAL_CODE_CITY = re.compile(r"(?<![\d.,])(?P<postal_code>\d{5})\s+(?P<city>[A-ZÄÖÜ][\wäöüß\-]+(?: (?:am|an der|a\.\s?M\.|/)\s?[\wäöüß.\-]+)?)")
+
+    @staticmethod
+    def parse_number(raw: str) -> Optional[float]:
+        """Parses German (1.234,56) and English (1,234.56) number formats."""
+        raw = raw.strip()
+        if not raw:
+            return None
+        if "," in raw and "." in raw:
+            decimal = "," if raw.rfind(",") > raw.rfind(".") else "."
+        elif "," in raw or "." in raw:
+            separator = "," if "," in raw else "."
+            parts = raw.split(separator)
+            # A single separator followed by exactly three digits is a thousands separator
+            decimal = None if len(parts) > 2 or len(parts[-1]) == 3 else separator
+        else:
+            decimal = None
+        for separator in {",", "."} - {decimal}:
+            raw = raw.replace(separator, "")
+        if decimal:
+            raw = raw.replace(decimal, ".")
+        try:
+            return float(raw)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def apply_multiplier(value: float, multiplier: Optional[str]) -> float:
+        if not multiplier:
+            return value
+        multiplier = multiplier.lower()
+        if multiplier.startswith(("mio", "mill", "m€")):
+            return value * 1_000_000
+        return value * 1_000
+
+    @staticmethod
+    def format_currency(value: float) -> str:
+        return f"{round(value):,} €".replace(",", ".")
+
+    @staticmethod
+    def format_number(value: float) -> int | float:
+        return int(value) if float(value).is_integer() else round(value, 2)
+
+    @classmethod
+    def display(cls, value: Any, field: str) -> str:
+        """A key fact for people, e.g. "1.234.567 €" for amounts and "missing" for None."""
+        if value is None:
+            return "missing"
+        if field in cls.CURRENCY_FIELDS and isinstance(value, (int, float)):
+            return cls.format_currency(value)
+        return str(value)
+
+    def extract(self, text: str) -> Tuple[KeyFacts, Dict[str, float]]:
+        values: Dict[str, Any] = {}
+        confidence: Dict[str, float] = {}
+
+        for field, patterns in self.PATTERNS.items():
+            found = []
+            for pattern, base_confidence in patterns:
+                for match in pattern.finditer(text):
+                    value = self._value(field, match)
+                    if value is not None:
+                        found.append((value, base_confidence))
+            if found:
+                value, base_confidence = found[0]
+                # Conflicting mentions lower the confidence, GPT has to decide which one is right
+                if len({candidate for candidate, _ in found}) > 1:
+                    base_confidence -= 0.3
+                values[field], confidence[field] = value, base_confidence
+
+        if "price_per_square" not in values and "purchase_price" in values and "usable_area" in values:
+            if values["purchase_price"] and values["usable_area"]:
+                values["price_per_square"] = self.format_number(round(values["purchase_price"] / values["usable_area"]))
+                confidence["price_per_square"] = min(confidence["purchase_price"], confidence["usable_area"]) - 0.05
+
+        street = self.STREET.search(text)
+        if street:
+            values["address.street"] = street.group("street").strip()
+            values["address.house_number"] = street.group("house_number").strip()
+            # A street directly followed by a postal code is an address line rather than a mention in the text
+            in_address_line = re.match(r"[,\s]+\d{5}\s", text[street.end():street.end() + 10]) is not None
+            confidence["address.street"] = confidence["address.house_number"] = 0.85 if in_address_line else 0.7
+
+        postal_codes = list(self.POSTAL_CODE_CITY.finditer(text))
+        if postal_codes:
+            values["address.postal_code"] = postal_codes[0].group("postal_code")
+            values["address.city"] = postal_codes[0].group("city").strip()
+            distinct = {match.group("postal_code") for match in postal_codes}
+            confidence["address.postal_code"] = confidence["address.city"] = 0.85 if len(distinct) == 1 else 0.5
+
+        return self.build_key_facts(values), confidence
+
+    def _value(self, field: str, match: re.Match) -> Optional[Any]:
+        groups = match.groupdict()
+        raw = next((groups[name] for name in ("number", "number2", "number3", "number4") if groups.get(name)), None)
+        number = self.parse_number(raw) if raw else None
+        if number is None:
+            return None
+
+        if field in ("purchase_price", "rental_income"):
+            # Without a currency or multiplier the number is more likely a year, an area, ...
+            if not (groups.get("currency") or groups.get("currency_before") or groups.get("multiplier")):
+                return None
+            number = self.apply_multiplier(number, groups.get("multiplier"))
+            if field == "rental_income" and re.match(r"Monatsmiete|monthly rent|Nettokaltmiete mtl", match.group(0),
+                                                      re.IGNORECASE):
+                number *= 12
+            return self.format_number(round(number))
+        if field == "price_per_square":
+            return self.format_number(round(number))
+        if field == "wault":
+            if groups.get("unit", "").lower() in ("monate", "months"):
+                number /= 12
+            return self.format_number(round(number, 2))
+        return self.format_number(number)
+
+    @staticmethod
+    def build_key_facts(values: Dict[str, Any]) -> KeyFacts:
+        address = {name.split(".", 1)[1]: value for name, value in values.items() if name.startswith("address.")}
+        facts = {name: value for name, value in values.items() if not name.startswith("address.")}
+        return KeyFacts(address=Address(**address), **facts)
+
+    @staticmethod
+    def flatten(key_facts: KeyFacts) -> Dict[str, Any]:
+        data = key_facts.model_dump()
+        address = data.pop("address")
+        return {**{f"address.{name}": value for name, value in address.items()}, **data}
+
+    def missing_fields(self, confidence: Dict[str, float], threshold: float) -> List[str]:
+        return [field for field in self.FIELDS if confidence.get(field, 0.0) < threshold]
+
+    def merge(self, local: KeyFacts, remote: KeyFacts, fields: List[str]) -> KeyFacts:
+        """Takes ``fields`` from the GPT result unless GPT did not find them either."""
+        values = self.flatten(local)
+        for field, value in self.flatten(remote).items():
+            if field in fields and value not in (None, "", "missing"):
+                values[field] = value
+        return self.build_key_facts({field: value for field, value in values.items()
+                                     if value not in (None, "missing")})
@@ -0,0 +1,123 @@
+import difflib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from models import ListInfo
+
+logger = logging.getLogger(__name__)
+
+
+class ListCatalog:
+    """
+    Cache of the HubSpot list catalog, kept in memory and in a JSON file.
+
+    Reads are stale-while-revalidate: once the catalog is older than ``ttl_seconds`` the cached lists are
+    still returned while a background thread fetches a fresh copy. Only an empty cache (first start without
+    a file) blocks on HubSpot. Lists are indexed by normalized name and by id for O(1) lookups. Listeners
+    added with ``add_listener`` are called with every catalog that is loaded or fetched.
+    """
+
+    def __init__(self, fetch: Callable[[], List[ListInfo]], ttl_seconds: int = 900, path: Optional[str] = None):
+        self.fetch = fetch
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self.lists: List[ListInfo] = []
+        self.by_name: Dict[str, ListInfo] = {}
+        self.by_id: Dict[str, ListInfo] = {}
+        self.fetched_at = 0.0
+        self.lock = threading.Lock()
+        self.refreshing = False
+        self.listeners: List[Callable[[List[ListInfo]], None]] = []
+        self._load()
+
+    @staticmethod
+    def normalize(name: str) -> str:
+        return " ".join(name.lower().split())
+
+    def get_lists(self) -> List[ListInfo]:
+        if not self.lists:
+            self.refresh()
+        elif time.time() - self.fetched_at > self.ttl_seconds:
+            self.refresh_in_background()
+        return self.lists
+
+    def find_by_name(self, name: str) -> Optional[ListInfo]:
+        self.get_lists()
+        return self.by_name.get(self.normalize(name))
+
+    def find_closest(self, name: str, cutoff: float = 0.8) -> Optional[ListInfo]:
+        """The list whose name is most similar to ``name``, for names GPT paraphrased or misspelled."""
+        self.get_lists()
+        matches = difflib.get_close_matches(self.normalize(name), list(self.by_name), n=1, cutoff=cutoff)
+        return self.by_name[matches[0]] if matches else None
+
+    def find_by_id(self, list_id: str) -> Optional[ListInfo]:
+        self.get_lists()
+        return self.by_id.get(list_id)
+
+    def add_listener(self, listener: Callable[[List[ListInfo]], None]):
+        """Registers ``listener`` and calls it right away with the current catalog, if there is one."""
+        self.listeners.append(listener)
+        if self.lists:
+            self._notify(listener, self.lists)
+
+    @staticmethod
+    def _notify(listener: Callable[[List[ListInfo]], None], lists: List[ListInfo]):
+        try:
+            listener(lists)
+        except Exception as e:
+            logger.error(f"Error in list catalog listener: {str(e)}")
+
+    def refresh_in_background(self):
+        with self.lock:
+            if self.refreshing:
+                return
+            self.refreshing = True
+        threading.Thread(target=self.refresh, name="list-catalog-refresh", daemon=True).start()
+
+    def refresh(self):
+        try:
+            lists = self.fetch()
+            # HubspotService.get_lists returns [] on API errors, which must not wipe a working catalog
+            if lists or not self.lists:
+                self._set(lists, time.time())
+                self._save()
+        except Exception as e:
+            logger.error(f"Error refreshing HubSpot list catalog: {str(e)}")
+        finally:
+            with self.lock:
+                self.refreshing = False
+
+    def _set(self, lists: List[ListInfo], fetched_at: float):
+        # The index is built completely before it is published to readers
+        self.by_name = {self.normalize(a_list.name): a_list for a_list in lists}
+        self.by_id = {a_list.listId: a_list for a_list in lists}
+        self.lists = lists
+        self.fetched_at = fetched_at
+        for listener in self.listeners:
+            self._notify(listener, lists)
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                data = json.load(file)
+            self._set([ListInfo(**a_list) for a_list in data["lists"]], data["fetched_at"])
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable list catalog file {self.path}: {str(e)}")
+
+    def _save(self):
+        if not self.path:
+            return
+        temporary_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary_path, "w", encoding="utf-8") as file:
+                json.dump({"fetched_at": self.fetched_at, "lists": [a_list.model_dump() for a_list in self.lists]}, file)
+            os.replace(temporary_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not write list catalog file {self.path}: {str(e)}")
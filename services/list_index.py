@@ -0,0 +1,134 @@
+import logging
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from models import ListInfo
+
+logger = logging.getLogger(__name__)
+
+
+class ListIndex:
+    """
+    Embedding index over the HubSpot list names for picking the list of an exposé without a chat completion.
+
+    The normalized name vectors are kept as one NumPy matrix, so a match is a single matrix-vector product.
+    ``update`` is called with every new list catalog and embeds only names it has not seen before; the
+    vectors are stored in an .npz file at ``path`` and survive restarts. ``embed`` turns texts into vectors
+    (GPTService.embed in production, any deterministic function offline) and ``model`` names it, vectors of
+    another model in the file are discarded.
+
+    ``match`` returns a list only when its score is at least ``min_score`` and ``margin`` ahead of the
+    runner-up, otherwise the ``candidates`` best lists are returned for the GPT selection to decide.
+    """
+
+    def __init__(self, embed: Callable[[List[str]], Sequence[Sequence[float]]], model: str = "",
+                 path: Optional[str] = None, min_score: float = 0.3, margin: float = 0.05, candidates: int = 10,
+                 max_chars: int = 24000):
+        self.embed = embed
+        self.model = model
+        self.path = path
+        self.min_score = min_score
+        self.margin = margin
+        self.candidates = candidates
+        self.max_chars = max_chars
+        # Lists and their matrix rows, replaced together so readers never see a mix of two catalogs
+        self.index: Tuple[List[ListInfo], np.ndarray] = ([], np.zeros((0, 0), dtype=np.float32))
+        # Vectors by list name, kept across updates so renamed or new lists are the only ones embedded
+        self.known: Dict[str, np.ndarray] = {}
+        self.lock = threading.Lock()
+        self.pending: Optional[List[ListInfo]] = None
+        self._load()
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def update_in_background(self, lists: List[ListInfo]):
+        """Like ``update`` without blocking the caller, of catalogs that arrive meanwhile only the last is indexed."""
+        self.pending = lists
+        threading.Thread(target=self._update_pending, name="list-index-update", daemon=True).start()
+
+    def _update_pending(self):
+        with self.lock:
+            lists, self.pending = self.pending, None
+            if lists is not None:
+                self._update(lists)
+
+    def update(self, lists: List[ListInfo]):
+        with self.lock:
+            self._update(lists)
+
+    def _update(self, lists: List[ListInfo]):
+        missing = sorted({a_list.name for a_list in lists} - self.known.keys())
+        if missing:
+            try:
+                vectors = self._normalize(np.asarray(self.embed(missing), dtype=np.float32))
+            except Exception as e:
+                logger.error(f"Error embedding {len(missing)} list names, keeping the previous index: {str(e)}")
+                return
+            self.known.update(zip(missing, vectors))
+            logger.info(f"Embedded {len(missing)} list names")
+
+        names = {a_list.name for a_list in lists}
+        self.known = {name: vector for name, vector in self.known.items() if name in names}
+        vectors = np.stack([self.known[a_list.name] for a_list in lists]) if lists else np.zeros((0, 0), np.float32)
+        self.index = (list(lists), vectors)
+        if missing:
+            self._save()
+
+    def scores(self, text: str) -> List[Tuple[ListInfo, float]]:
+        """All lists with their cosine similarity to ``text``, best first."""
+        lists, vectors = self.index
+        if not lists:
+            return []
+        query = self._normalize(np.asarray(self.embed([text[:self.max_chars]])[0], dtype=np.float32))
+        similarities = vectors @ query
+        order = np.argsort(-similarities, kind="stable")
+        return [(lists[i], float(similarities[i])) for i in order]
+
+    def match(self, text: str) -> Tuple[Optional[ListInfo], List[ListInfo]]:
+        """The list ``text`` clearly belongs to, or None and the best candidates when the scores are too close."""
+        try:
+            scores = self.scores(text)
+        except Exception as e:
+            logger.error(f"Error embedding exposé for list matching: {str(e)}")
+            return None, []
+        if not scores:
+            return None, []
+
+        best, best_score = scores[0]
+        runner_up_score = scores[1][1] if len(scores) > 1 else -1.0
+        if best_score >= self.min_score and best_score - runner_up_score >= self.margin:
+            logger.info(f"Matched list '{best.name}' by embedding ({best_score:.3f}, runner-up {runner_up_score:.3f})")
+            return best, []
+        logger.info(f"Ambiguous list match ({best_score:.3f} vs. {runner_up_score:.3f}), asking GPT")
+        return None, [a_list for a_list, _ in scores[:self.candidates]]
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                if str(data["model"]) != self.model:
+                    logger.info(f"List index {self.path} was built with another embedding model, rebuilding")
+                    return
+                self.known = dict(zip(data["names"].tolist(), data["vectors"].astype(np.float32)))
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable list index file {self.path}: {str(e)}")
+
+    def _save(self):
+        if not self.path:
+            return
+        temporary_path = f"{self.path}.{os.getpid()}.tmp"
+        names = list(self.known)
+        try:
+            with open(temporary_path, "wb") as file:
+                np.savez(file, model=np.array(self.model), names=np.array(names, dtype=str),
+                         vectors=np.stack([self.known[name] for name in names]) if names else np.zeros((0, 0)))
+            os.replace(temporary_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not write list index file {self.path}: {str(e)}")
@@ -0,0 +1,95 @@
+import math
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+
+from models import HubSpotObjectBase
+
+
+class MemberRanker:
+    """
+    Local pre-ranking of list members by the HubSpot properties that are fetched anyway.
+
+    A member scores for its lifecycle stage, the number of its associated contacts and deals (the HubSpot
+    properties ``num_associated_contacts`` and ``num_associated_deals``) and how recently it was modified
+    (halving every ``half_life_days``). ``property_weights`` adds further properties (MEMBER_RANK_PROPERTIES,
+    requested from HubSpot along with the model fields): numbers count with their logarithm, "true"/"false" as 1/0 and any other
+    non-empty value as 1, each multiplied by its weight. Members with equal scores keep their list order.
+    """
+
+    LIFECYCLE_STAGE_SCORES = {
+        "evangelist": 1.0,
+        "customer": 1.0,
+        "opportunity": 0.8,
+        "salesqualifiedlead": 0.6,
+        "marketingqualifiedlead": 0.4,
+        "lead": 0.2,
+        "subscriber": 0.1,
+    }
+    LIFECYCLE_STAGE_WEIGHT = 3.0
+    ASSOCIATIONS_WEIGHT = 2.0
+    RECENCY_WEIGHT = 1.0
+    # Companies have both counts, contacts only the deals
+    ASSOCIATION_PROPERTIES = ("num_associated_contacts", "num_associated_deals")
+    # Number of associations that gives the full association score
+    MAX_ASSOCIATIONS = 100
+
+    def __init__(self, property_weights: Optional[Dict[str, float]] = None, half_life_days: float = 180.0,
+                 now: Optional[datetime] = None):
+        self.property_weights = property_weights or {}
+        self.half_life_days = half_life_days
+        self.now = now
+
+    def rank(self, records: Sequence[HubSpotObjectBase]) -> List[HubSpotObjectBase]:
+        now = self.now or datetime.now(timezone.utc)
+        return sorted(records, key=lambda record: self.score(record, now), reverse=True)
+
+    def score(self, record: HubSpotObjectBase, now: Optional[datetime] = None) -> float:
+        now = now or self.now or datetime.now(timezone.utc)
+        properties = record.properties
+        # The HubSpot property is "lifecyclestage", records of older mirrors only know the model field
+        stage = (properties.get("lifecyclestage") or record.lifecycle_stage or "").strip().lower()
+        score = self.LIFECYCLE_STAGE_WEIGHT * self.LIFECYCLE_STAGE_SCORES.get(stage, 0.0)
+
+        associations = sum(self._count(properties.get(name)) for name in self.ASSOCIATION_PROPERTIES)
+        score += self.ASSOCIATIONS_WEIGHT * min(1.0, math.log1p(associations) / math.log1p(self.MAX_ASSOCIATIONS))
+
+        modified_at = self._parse_date(record.lastmodifieddate)
+        if modified_at is not None and self.half_life_days > 0:
+            age_days = max(0.0, (now - modified_at).total_seconds() / 86400)
+            score += self.RECENCY_WEIGHT * 0.5 ** (age_days / self.half_life_days)
+
+        for name, weight in self.property_weights.items():
+            score += weight * self._property_value(properties.get(name))
+        return score
+
+    @staticmethod
+    def _count(value: Optional[str]) -> int:
+        """A count property, 0 if it is empty or not a number."""
+        try:
+            return max(0, int(float((value or "").strip() or 0)))
+        except (ValueError, OverflowError):
+            return 0
+
+    @staticmethod
+    def _parse_date(value: str) -> Optional[datetime]:
+        value = (value or "").strip()
+        if not value:
+            return None
+        try:
+            # HubSpot returns ISO timestamps, older exports epoch milliseconds
+            if value.isdigit():
+                return datetime.fromtimestamp(int(value) / 1000, timezone.utc)
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except (ValueError, OverflowError):
+            return None
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+    @staticmethod
+    def _property_value(value: Optional[str]) -> float:
+        value = (value or "").strip()
+        if not value or value.lower() == "false":
+            return 0.0
+        try:
+            return math.log1p(max(0.0, float(value)))
+        except ValueError:
+            return 1.0
@@ -0,0 +1,199 @@
+import json
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from openai import (
+    APIError,
+    APIConnectionError,
+    RateLimitError,
+    APIStatusError,
+    InternalServerError,
+)
+
+from services.gpt_service import GPTService
+from services.prompts import ChatRequest
+from services.structured_key_facts import StructuredKeyFacts
+
+logger = logging.getLogger(__name__)
+
+
+class OpenAIBatchService:
+    """
+    Offline mode of the GPTService for non-urgent runs.
+
+    Requests of many exposés are written to Batch API JSONL files, submitted and polled until the batch is
+    done. Batch jobs cost half of the regular chat completions and have their own rate limits, in exchange
+    results arrive within ``completion_window`` instead of seconds. Requests are identified by a custom id
+    such as "<task_id>:key_facts".
+    """
+
+    ENDPOINT = "/v1/chat/completions"
+    MAX_REQUESTS_PER_FILE = 50000
+    FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+    def __init__(self, gpt_service: GPTService, poll_seconds: float = 30.0, completion_window: str = "24h",
+                 fallback_workers: int = 8):
+        self.gpt_service = gpt_service
+        self.client = gpt_service.client
+        self.poll_seconds = poll_seconds
+        self.completion_window = completion_window
+        self.fallback_workers = fallback_workers
+
+    def round(self) -> "BatchRound":
+        return BatchRound(self)
+
+    def request_line(self, custom_id: str, chat_request: ChatRequest) -> Dict[str, Any]:
+        body: Dict[str, Any] = {"model": self.gpt_service.model_for(chat_request.prompt.name),
+                                "messages": chat_request.messages}
+        if chat_request.response_format:
+            body["response_format"] = chat_request.response_format
+        return {"custom_id": custom_id, "method": "POST", "url": self.ENDPOINT, "body": body}
+
+    def run(self, requests: Dict[str, ChatRequest]) -> Dict[str, str]:
+        """Submits requests by custom id and returns the response content by custom id."""
+        items = list(requests.items())
+        batch_ids = []
+        for start in range(0, len(items), self.MAX_REQUESTS_PER_FILE):
+            batch_id = self.submit(items[start:start + self.MAX_REQUESTS_PER_FILE])
+            if batch_id:
+                batch_ids.append(batch_id)
+
+        responses: Dict[str, str] = {}
+        for batch_id in batch_ids:
+            responses.update(self.wait(batch_id, requests))
+        return responses
+
+    def submit(self, items: List[Tuple[str, ChatRequest]]) -> Optional[str]:
+        lines = "\n".join(json.dumps(self.request_line(custom_id, request)) for custom_id, request in items)
+        try:
+            input_file = self.client.files.create(file=("requests.jsonl", lines.encode("utf-8")), purpose="batch")
+            batch = self.client.batches.create(input_file_id=input_file.id, endpoint=self.ENDPOINT,
+                                               completion_window=self.completion_window)
+        except (RateLimitError, APIConnectionError, InternalServerError, APIStatusError, APIError) as e:
+            logger.error(f"Error submitting OpenAI batch: {str(e)}")
+            return None
+
+        logger.info(f"Submitted OpenAI batch {batch.id} with {len(items)} requests")
+        return batch.id
+
+    def wait(self, batch_id: str, requests: Dict[str, ChatRequest]) -> Dict[str, str]:
+        try:
+            batch = self.client.batches.retrieve(batch_id)
+            while batch.status not in self.FINAL_STATUSES:
+                time.sleep(self.poll_seconds)
+                batch = self.client.batches.retrieve(batch_id)
+        except (RateLimitError, APIConnectionError, InternalServerError, APIStatusError, APIError) as e:
+            logger.error(f"Error polling OpenAI batch {batch_id}: {str(e)}")
+            return {}
+
+        counts = batch.request_counts
+        logger.info(f"OpenAI batch {batch_id} {batch.status}"
+                    + (f": {counts.completed} completed, {counts.failed} failed" if counts else ""))
+
+        # Expired and cancelled batches still have an output file with the requests that were done
+        responses: Dict[str, str] = {}
+        if batch.output_file_id:
+            try:
+                output = self.client.files.content(batch.output_file_id).text
+            except (RateLimitError, APIConnectionError, InternalServerError, APIStatusError, APIError) as e:
+                logger.error(f"Error downloading results of OpenAI batch {batch_id}: {str(e)}")
+                return {}
+            for line in output.splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    self._read_output_line(line, requests, responses)
+                except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+                    # The request of a line that cannot be read gets no response and is repeated as a regular call
+                    logger.warning(f"Invalid line in the results of OpenAI batch {batch_id}: {e!r}")
+        return responses
+
+    def _read_output_line(self, line: str, requests: Dict[str, ChatRequest], responses: Dict[str, str]):
+        result = json.loads(line)
+        response = result.get("response") or {}
+        if response.get("status_code") == 200:
+            content = response["body"]["choices"][0]["message"]["content"] or ""
+            responses[result["custom_id"]] = content.strip()
+            if result["custom_id"] in requests:
+                prompt_name = requests[result["custom_id"]].prompt.name
+                self.gpt_service.usage.record(prompt_name, response["body"].get("usage"),
+                                              self.gpt_service.model_for(prompt_name))
+        else:
+            logger.warning(f"OpenAI batch request {result.get('custom_id')} failed: {result.get('error')}")
+
+
+class BatchRound:
+    """
+    Collects the GPTService calls of many exposés to run them as one Batch API job.
+
+    The methods mirror those of the GPTService with a custom id as first argument. ``run`` returns the
+    parsed results by custom id. Requests without a usable batch result (failed lines, expired batch,
+    invalid format) are repeated as regular calls, so a result has the same form as in interactive mode.
+    Those calls and the direct ones run concurrently, at most ``fallback_workers`` of the service at once.
+    """
+
+    def __init__(self, service: OpenAIBatchService):
+        self.service = service
+        self.requests: Dict[str, ChatRequest] = {}
+        self.parsers: Dict[str, Callable[[str], Any]] = {}
+        self.fallbacks: Dict[str, Callable[[], Any]] = {}
+        self.direct: Dict[str, Callable[[], Any]] = {}
+
+    def _add(self, custom_id: str, request: ChatRequest, parse: Callable[[str], Any], fallback: Callable[[], Any]):
+        self.requests[custom_id] = request
+        self.parsers[custom_id] = parse
+        self.fallbacks[custom_id] = fallback
+
+    def extract_key_facts(self, custom_id: str, text: str, fields: Optional[List[str]] = None):
+        gpt_service = self.service.gpt_service
+        if gpt_service.structured_key_facts:
+            structured = StructuredKeyFacts(fields)
+            request = gpt_service._key_facts_request(text, fields, structured.response_format())
+            parse = lambda response: gpt_service._parse_structured_key_facts(structured, response)
+        else:
+            request, parse = gpt_service._key_facts_request(text, fields), gpt_service._parse_key_facts
+        self._add(custom_id, request, parse, lambda: gpt_service.extract_key_facts(text, fields))
+
+    def analyze_text_and_select_list(self, custom_id: str, text: str, list_names: List[str]):
+        gpt_service = self.service.gpt_service
+        self._add(custom_id, gpt_service._select_list_request(text, list_names), lambda response: response,
+                  lambda: gpt_service.analyze_text_and_select_list(text, list_names))
+
+    def curate_members(self, custom_id: str, text: str):
+        gpt_service = self.service.gpt_service
+        if len(gpt_service.member_chunks(gpt_service.split_members(text))) > 1:
+            # Lists too large for one request need the map-reduce of curate_members, run as regular calls
+            self.direct[custom_id] = lambda: gpt_service.curate_members(text)
+            return
+        self._add(custom_id, gpt_service._curate_members_request(text), gpt_service._validate_curated_members,
+                  lambda: gpt_service.curate_members(text))
+
+    def generate_email(self, custom_id: str, text: str, name_of_list: str):
+        gpt_service = self.service.gpt_service
+        self._add(custom_id, gpt_service._email_request(text, name_of_list), lambda response: response,
+                  lambda: gpt_service.generate_email(text, name_of_list))
+
+    def run(self) -> Dict[str, Any]:
+        results: Dict[str, Any] = {}
+        with ThreadPoolExecutor(max_workers=self.service.fallback_workers, thread_name_prefix="batch-call") as executor:
+            # The direct calls run while the batch job is pending
+            calls: Dict[str, Future] = {custom_id: executor.submit(call) for custom_id, call in self.direct.items()}
+            responses = self.service.run(self.requests) if self.requests else {}
+            repeated = 0
+            for custom_id in self.requests:
+                response = responses.get(custom_id)
+                if response:
+                    try:
+                        results[custom_id] = self.parsers[custom_id](response)
+                        continue
+                    except ValueError as e:
+                        logger.warning(f"Invalid batch response for {custom_id}: {str(e)}")
+                repeated += 1
+                calls[custom_id] = executor.submit(self.fallbacks[custom_id])
+
+            if repeated:
+                logger.info(f"Repeating {repeated} of {len(self.requests)} batch requests as regular calls")
+            results.update({custom_id: future.result() for custom_id, future in calls.items()})
+        return results
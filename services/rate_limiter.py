@@ -0,0 +1,48 @@
+import threading
+import time
+from typing import List
+
+
+class TokenBucket:
+    """Thread-safe token bucket holding up to ``capacity`` tokens, refilled with ``capacity / period`` per second."""
+
+    def __init__(self, capacity: int, period: float):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self) -> float:
+        """Takes one token and returns how many seconds the caller has to wait before using it."""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class RateLimiter:
+    """
+    Combines several token buckets (e.g. per second and per 10 seconds) and a shared pause,
+    which is set when the server answers 429 so that every thread backs off, not only the one that was throttled.
+    """
+
+    def __init__(self, buckets: List[TokenBucket]):
+        self.buckets = buckets
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        delay = max((bucket.reserve() for bucket in self.buckets), default=0.0)
+        with self.lock:
+            delay = max(delay, self.paused_until - time.monotonic())
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds: float):
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
@@ -0,0 +1,143 @@
+import re
+from typing import Annotated, Any, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, BeforeValidator, ConfigDict, create_model
+
+from models import KeyFacts, Address
+from services.key_fact_extractor import KeyFactExtractor, NUMBER, MULTIPLIER
+
+# Numeric KeyFacts fields with their JSON type and unit, all other fields are strings
+NUMBER_FIELDS: Dict[str, Tuple[str, str]] = {
+    "address.population": ("integer", "inhabitants"),
+    "purchase_price": ("number", "Euro"),
+    "price_per_square": ("number", "Euro per m²"),
+    "usable_area": ("number", "m²"),
+    "plot_size": ("number", "m²"),
+    "residential_units": ("integer", "units"),
+    "rental_income": ("number", "Euro per year"),
+    "wault": ("number", "years"),
+}
+
+
+def _to_number(value: Any) -> Optional[float]:
+    """Normalizes numbers that arrive as text, e.g. "1.234.567,00 €" or "2,5 Mio." in non-strict replies."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        # Lists, objects, ... are left to the validation of the field, which rejects them
+        return value
+    match = re.search(rf"(?P<number>{NUMBER})\s*(?P<multiplier>{MULTIPLIER})?", value, re.IGNORECASE)
+    if not match:
+        return None
+    number = KeyFactExtractor.parse_number(match.group("number"))
+    return KeyFactExtractor.apply_multiplier(number, match.group("multiplier")) if number is not None else None
+
+
+def _to_years(value: Any) -> Optional[float]:
+    """Like _to_number, durations in months ("18 Monate") are converted to years like KeyFactExtractor does."""
+    number = _to_number(value)
+    if number is not None and isinstance(value, str) and re.search(r"\d\s*(?:Monate|Monaten|months)\b", value,
+                                                                   re.IGNORECASE):
+        return round(number / 12, 2)
+    return number
+
+
+def _to_integer(value: Any) -> Optional[int]:
+    number = _to_number(value)
+    return round(number) if isinstance(number, float) else number
+
+
+def _to_string(value: Any) -> Optional[str]:
+    if value is None or str(value).strip() in ("", "missing"):
+        return None
+    return str(value).strip()
+
+
+Number = Annotated[Optional[float], BeforeValidator(_to_number)]
+Years = Annotated[Optional[float], BeforeValidator(_to_years)]
+Integer = Annotated[Optional[int], BeforeValidator(_to_integer)]
+String = Annotated[Optional[str], BeforeValidator(_to_string)]
+
+
+class StructuredKeyFacts:
+    """
+    Structured-output mode of the key fact extraction for a set of KeyFacts fields.
+
+    The JSON schema is generated from the KeyFacts/Address models: strings for the address, plain numbers in
+    Euro, m² and years for the figures, every field nullable and required as strict mode demands. Replies are
+    validated in one pass by a pydantic model generated the same way, numbers that still arrive as text are
+    normalized with the German/English rules of the KeyFactExtractor. ``parse`` returns KeyFacts in the
+    standardized form of the rest of the pipeline (plain numbers, whole numbers as int).
+    """
+
+    def __init__(self, fields: Optional[List[str]] = None):
+        self.fields = [field for field in KeyFactExtractor.FIELDS if fields is None or field in fields]
+        address_fields = [field.split(".", 1)[1] for field in self.fields if field.startswith("address.")]
+        fact_fields = [field for field in self.fields if not field.startswith("address.")]
+
+        reply_fields: Dict[str, Any] = {name: (self._field_type(name), None) for name in fact_fields}
+        if address_fields:
+            address_model = self._model("AddressReply", Address, {
+                name: (self._field_type(f"address.{name}"), None) for name in address_fields})
+            reply_fields["address"] = (Optional[address_model], None)
+        self.model = self._model("KeyFactsReply", KeyFacts, reply_fields)
+
+    @staticmethod
+    def _field_type(field: str) -> Type:
+        json_type, unit = NUMBER_FIELDS.get(field, ("string", ""))
+        if unit == "years":
+            return Years
+        return {"integer": Integer, "number": Number}.get(json_type, String)
+
+    @staticmethod
+    def _model(name: str, base: Type[BaseModel], fields: Dict[str, Any]) -> Type[BaseModel]:
+        # Ordered like the base model, so the schema reads like the prompt's JSON format
+        ordered = {field: fields[field] for field in base.model_fields if field in fields}
+        return create_model(name, __config__=ConfigDict(extra="ignore"), **ordered)
+
+    @staticmethod
+    def _property(field: str) -> Dict[str, Any]:
+        json_type, unit = NUMBER_FIELDS.get(field, ("string", ""))
+        schema: Dict[str, Any] = {"type": [json_type, "null"]}
+        if unit:
+            schema["description"] = f"in {unit}, null if not found"
+        return schema
+
+    def schema(self) -> Dict[str, Any]:
+        properties: Dict[str, Any] = {}
+        address = {field.split(".", 1)[1]: self._property(field) for field in self.fields if field.startswith("address.")}
+        for name in KeyFacts.model_fields:
+            if name == "address" and address:
+                properties[name] = {"type": "object", "properties": address, "required": list(address),
+                                    "additionalProperties": False}
+            elif name in self.fields:
+                properties[name] = self._property(name)
+        return {"type": "object", "properties": properties, "required": list(properties), "additionalProperties": False}
+
+    def response_format(self) -> Dict[str, Any]:
+        return {"type": "json_schema", "json_schema": {"name": "key_facts", "strict": True, "schema": self.schema()}}
+
+    def parse(self, response: str) -> KeyFacts:
+        """Raises a ValueError (pydantic ValidationError) if the reply does not match the schema."""
+        return self._standardize(self.model.model_validate_json(response).model_dump())
+
+    def parse_object(self, data: Any) -> KeyFacts:
+        """Like ``parse`` for a reply that is already decoded, e.g. part of a larger structured response."""
+        return self._standardize(self.model.model_validate(data).model_dump())
+
+    @staticmethod
+    def _standardize(reply: Dict[str, Any]) -> KeyFacts:
+        address = reply.pop("address", None) or {}
+        values = {**{f"address.{name}": value for name, value in address.items()}, **reply}
+
+        standardized = {}
+        for field, value in values.items():
+            if value is None:
+                continue
+            if field in NUMBER_FIELDS:
+                standardized[field] = KeyFactExtractor.format_number(value)
+            else:
+                standardized[field] = value
+        return KeyFactExtractor.build_key_facts(standardized)
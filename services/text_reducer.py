@@ -0,0 +1,84 @@
+import logging
+import re
+from typing import List, Optional, Tuple
+
+from services.gpt_service import GPTService
+
+logger = logging.getLogger(__name__)
+
+
+class TextReducer:
+    """
+    Shrinks long exposé texts before they are sent to GPT.
+
+    The text is cut into windows of whole lines, every window is scored by hits of the key-fact lexicon
+    (GPTService.key_fact_keywords) and of numbers with units/currencies. The best windows are kept in
+    document order until the token budget is used up. The first window (title, location) is always kept.
+    """
+
+    NUMBER_WITH_UNIT = re.compile(
+        r"\d[\d.,]*\s*(?:m²|m2|qm|Quadratmeter|sq\.?\s?m|€|EUR|T€|TEUR|k€|Mio\.?|Millionen|%|Jahre|years|Einheiten|units)",
+        re.IGNORECASE,
+    )
+    SEPARATOR = "\n[...]\n"
+
+    def __init__(self, token_budget: int = 6000, window_chars: int = 800, keywords: Optional[List[str]] = None):
+        self.token_budget = token_budget
+        self.window_chars = window_chars
+        keywords = keywords if keywords is not None else GPTService.key_fact_keywords()
+        # Suffixes such as "-straße" are matched inside compound words, everything else as whole words
+        words = "|".join(re.escape(keyword) for keyword in keywords if not keyword.startswith("-"))
+        suffixes = "|".join(re.escape(keyword[1:]) for keyword in keywords if keyword.startswith("-"))
+        # An empty alternative would match at every word end, without any keywords the pattern matches nothing
+        alternatives = ([rf"(?<!\w)(?:{words})"] if words else []) + ([f"(?:{suffixes})"] if suffixes else [])
+        self.keyword_pattern = re.compile(rf"(?:{'|'.join(alternatives)})(?!\w)" if alternatives else "(?!)",
+                                          re.IGNORECASE)
+
+    def segment(self, text: str) -> List[str]:
+        windows, current = [], ""
+        lines = [line[start:start + self.window_chars]
+                 for line in text.splitlines(keepends=True)
+                 for start in range(0, len(line), self.window_chars)]
+        for line in lines:
+            if current and len(current) + len(line) > self.window_chars:
+                windows.append(current)
+                current = ""
+            current += line
+        if current:
+            windows.append(current)
+        return windows
+
+    def score(self, window: str) -> float:
+        return len(self.keyword_pattern.findall(window)) + 0.5 * len(self.NUMBER_WITH_UNIT.findall(window))
+
+    def reduce(self, text: str) -> str:
+        if self.token_budget <= 0 or GPTService.estimate_tokens(text) <= self.token_budget:
+            return text
+
+        windows = self.segment(text)
+        ranked: List[Tuple[float, int]] = sorted(
+            ((self.score(window), index) for index, window in enumerate(windows[1:], start=1)),
+            key=lambda scored: (-scored[0], scored[1]),
+        )
+
+        selected = {0}
+        used = GPTService.estimate_tokens(windows[0])
+        for window_score, index in ranked:
+            if window_score <= 0:
+                break
+            tokens = GPTService.estimate_tokens(windows[index], self.SEPARATOR)
+            if used + tokens > self.token_budget:
+                continue
+            selected.add(index)
+            used += tokens
+
+        reduced, previous = "", None
+        for index in sorted(selected):
+            if previous is not None and index != previous + 1:
+                reduced += self.SEPARATOR
+            reduced += windows[index]
+            previous = index
+
+        logger.info(f"Reduced exposé text from ~{GPTService.estimate_tokens(text)} to ~{used} tokens "
+                    f"({len(selected)}/{len(windows)} windows)")
+        return reduced
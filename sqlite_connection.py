@@ -0,0 +1,23 @@
+import sqlite3
+import threading
+
+
+class ThreadLocalConnection:
+    """
+    Callable returning the SQLite connection of the calling thread, opened on first use in WAL mode so
+    readers in other threads and processes do not block on writers. Connections are in autocommit mode.
+    """
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        self.path = path
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def __call__(self) -> sqlite3.Connection:
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+        return connection
@@ -0,0 +1,94 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class GraphNode:
+    name: str
+    func: Callable[..., Any]
+    depends_on: Tuple[str, ...] = field(default_factory=tuple)
+
+
+class TaskGraph:
+    """
+    Runs a set of interdependent callables on a thread pool.
+
+    Every node receives the results of its dependencies as positional arguments (in the order of
+    ``depends_on``) and is submitted as soon as all of them are finished, so independent stages
+    overlap and the total runtime approaches the critical path of the graph. After a run ``timings`` holds
+    the wall time of every node in seconds.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+        self.nodes: Dict[str, GraphNode] = {}
+        self.timings: Dict[str, float] = {}
+
+    def add(self, name: str, func: Callable[..., Any], depends_on: Tuple[str, ...] = ()) -> None:
+        if name in self.nodes:
+            raise ValueError(f"Duplicate graph node: {name}")
+        for dependency in depends_on:
+            if dependency not in self.nodes:
+                raise ValueError(f"Unknown dependency '{dependency}' for node '{name}'")
+        self.nodes[name] = GraphNode(name=name, func=func, depends_on=tuple(depends_on))
+
+    def run(self,
+            on_start: Optional[Callable[[str], None]] = None,
+            on_done: Optional[Callable[[str, int, int], None]] = None) -> Dict[str, Any]:
+        """
+        Executes the graph and returns the results keyed by node name.
+
+        ``on_start(name)`` is called right before a node is submitted and ``on_done(name, completed, total)``
+        after it finished. The first failing node cancels everything not yet started and its exception is re-raised
+        right away, without waiting for the nodes still running.
+        """
+        results: Dict[str, Any] = {}
+        pending: Dict[str, GraphNode] = dict(self.nodes)
+        running: Dict[Future, str] = {}
+        total = len(self.nodes)
+        self.timings = {}
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="task-graph")
+
+        def submit_ready():
+            for name, node in list(pending.items()):
+                if all(dependency in results for dependency in node.depends_on):
+                    del pending[name]
+                    if on_start:
+                        on_start(name)
+                    args = [results[dependency] for dependency in node.depends_on]
+                    running[executor.submit(self._timed, node, args)] = name
+
+        try:
+            submit_ready()
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception:
+                        logger.error(f"Graph node '{name}' failed")
+                        raise
+                    if on_done:
+                        on_done(name, len(results), total)
+                submit_ready()
+        except BaseException:
+            # Nodes still running cannot be interrupted, they finish in the background without delaying the error
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+
+        return results
+
+    def _timed(self, node: GraphNode, args: List[Any]) -> Any:
+        started_at = time.perf_counter()
+        try:
+            return node.func(*args)
+        finally:
+            self.timings[node.name] = time.perf_counter() - started_at
@@ -1,25 +1,203 @@
-from typing import Dict, Any
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+from config import Config
 from models import TaskProgress, TaskResult
+from sqlite_connection import ThreadLocalConnection
+
+
+class TaskStore(ABC):
+    """Storage backend of the TaskManager. Entries are flat dicts that are merged on update."""
+
+    def __init__(self, ttl_seconds: int = 3600, max_entries: int = 1000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+    @abstractmethod
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    def update(self, task_id: str, values: Dict[str, Any]):
+        pass
+
+    @abstractmethod
+    def delete(self, task_id: str):
+        pass
+
+    @abstractmethod
+    def evict(self):
+        """Drops entries older than the TTL and the oldest entries beyond ``max_entries``."""
+        pass
+
+
+class InMemoryTaskStore(TaskStore):
+    """Process-local store, ordered by last update so eviction pops from the front."""
+
+    def __init__(self, ttl_seconds: int = 3600, max_entries: int = 1000):
+        super().__init__(ttl_seconds, max_entries)
+        self.storage: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.updated_at: Dict[str, float] = {}
+        self.lock = threading.Lock()
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            entry = self.storage.get(task_id)
+            return dict(entry) if entry is not None else None
+
+    def update(self, task_id: str, values: Dict[str, Any]):
+        with self.lock:
+            self.storage.setdefault(task_id, {}).update(values)
+            self.storage.move_to_end(task_id)
+            self.updated_at[task_id] = time.time()
+        self.evict()
+
+    def delete(self, task_id: str):
+        with self.lock:
+            self.storage.pop(task_id, None)
+            self.updated_at.pop(task_id, None)
+
+    def evict(self):
+        with self.lock:
+            expired_before = time.time() - self.ttl_seconds
+            while self.storage:
+                oldest = next(iter(self.storage))
+                if len(self.storage) <= self.max_entries and self.updated_at[oldest] >= expired_before:
+                    break
+                self.storage.popitem(last=False)
+                self.updated_at.pop(oldest, None)
+
+
+class SQLiteTaskStore(TaskStore):
+    """
+    SQLite store in WAL mode, so all gunicorn workers of a host see the same tasks.
+
+    Status and percent live in indexed columns, everything else (results, ...) in a JSON column.
+    Eviction runs at most every ``evict_interval`` seconds per process.
+    """
+
+    def __init__(self, path: str, ttl_seconds: int = 3600, max_entries: int = 1000, evict_interval: float = 60.0):
+        super().__init__(ttl_seconds, max_entries)
+        self.path = path
+        self.evict_interval = evict_interval
+        self.last_evict = 0.0
+        self._connection = ThreadLocalConnection(path)
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS tasks ("
+                "task_id TEXT PRIMARY KEY, status TEXT, percent INTEGER, "
+                "data TEXT NOT NULL DEFAULT '{}', updated_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, task_id)")
+            connection.execute("CREATE INDEX IF NOT EXISTS idx_tasks_updated_at ON tasks (updated_at)")
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            "SELECT status, percent, data FROM tasks WHERE task_id = ?", (task_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        status, percent, data = row
+        entry = json.loads(data)
+        if status is not None:
+            entry.update(status=status, percent=percent)
+        return entry
+
+    def update(self, task_id: str, values: Dict[str, Any]):
+        values = dict(values)
+        status = values.pop('status', None)
+        percent = values.pop('percent', None)
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute("SELECT data FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+            data = json.loads(row[0]) if row else {}
+            data.update(values)
+            connection.execute(
+                "INSERT INTO tasks (task_id, status, percent, data, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (task_id) DO UPDATE SET "
+                "status = COALESCE(excluded.status, status), percent = COALESCE(excluded.percent, percent), "
+                "data = excluded.data, updated_at = excluded.updated_at",
+                (task_id, status, percent, json.dumps(data), time.time())
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        if time.time() - self.last_evict >= self.evict_interval:
+            self.evict()
+
+    def delete(self, task_id: str):
+        self._connection().execute("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+
+    def evict(self):
+        self.last_evict = time.time()
+        connection = self._connection()
+        connection.execute("DELETE FROM tasks WHERE updated_at < ?", (self.last_evict - self.ttl_seconds,))
+        connection.execute(
+            "DELETE FROM tasks WHERE task_id IN ("
+            "SELECT task_id FROM tasks ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
 
 
 class TaskManager:
-    def __init__(self):
-        self.storage: Dict[str, Dict[str, Any]] = {}
+    def __init__(self, store: Optional[TaskStore] = None):
+        self.store = store if store is not None else InMemoryTaskStore()
+
+    @classmethod
+    def from_config(cls, config: Config) -> "TaskManager":
+        if config.TASK_STORE_BACKEND == "sqlite":
+            return cls(SQLiteTaskStore(config.TASK_STORE_PATH, config.TASK_TTL_SECONDS, config.TASK_MAX_ENTRIES))
+        if config.TASK_STORE_BACKEND == "memory":
+            return cls(InMemoryTaskStore(config.TASK_TTL_SECONDS, config.TASK_MAX_ENTRIES))
+        raise ValueError(f"Unknown task store backend: {config.TASK_STORE_BACKEND}")
 
     def update_progress(self, task_id: str, status: str, percent: int):
-        if task_id not in self.storage:
-            self.storage[task_id] = {}
         progress = TaskProgress(status=status, percent=percent)
-        self.storage[task_id].update(progress.dict())
+        self.store.update(task_id, progress.dict())
+
+    def has_task(self, task_id: str) -> bool:
+        return self.store.get(task_id) is not None
+
+    def touch(self, task_id: str):
+        """Restarts the TTL of an existing entry without changing it."""
+        if self.has_task(task_id):
+            self.store.update(task_id, {})
 
     def get_progress(self, task_id: str) -> Dict[str, Any]:
-        return self.storage.get(task_id, TaskProgress(status='Task not found', percent=0).dict())
+        entry = self.store.get(task_id)
+        if entry is None:
+            return TaskProgress(status='Task not found', percent=0).dict()
+        return TaskProgress(status=entry.get('status', 'Pending'), percent=entry.get('percent', 0)).dict()
 
     def set_results(self, task_id: str, results: Dict[str, Any]):
-        if task_id not in self.storage:
-            self.storage[task_id] = {}
         task_result = TaskResult(**results)
-        self.storage[task_id]['results'] = task_result.dict()
+        self.store.update(task_id, {'results': task_result.dict()})
 
     def get_results(self, task_id: str) -> Dict[str, Any]:
-        return self.storage.get(task_id, {}).get('results', TaskResult().dict())
+        return (self.store.get(task_id) or {}).get('results', TaskResult().dict())
+
+    def set_partial_email(self, task_id: str, html: str):
+        self.store.update(task_id, {'partial_email': html})
+
+    def get_partial_email(self, task_id: str) -> str:
+        return (self.store.get(task_id) or {}).get('partial_email', '')
+
+    def set_rendered_results(self, task_id: str, html: str):
+        self.store.update(task_id, {'rendered_results': html})
+
+    def get_rendered_results(self, task_id: str) -> Optional[str]:
+        return (self.store.get(task_id) or {}).get('rendered_results')
+
+    def set_batch(self, batch_id: str, manifest: Dict[str, Any]):
+        self.store.update(batch_id, {'batch': manifest})
+
+    def get_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        return (self.store.get(batch_id) or {}).get('batch')
+
+    def remove_task(self, task_id: str):
+        self.store.delete(task_id)
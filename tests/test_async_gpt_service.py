@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from benchmarks.fake_openai import EMAIL, KEY_FACTS, FakeOpenAI
+from config import Config
+from services.async_gpt_service import AsyncGPTService
+from services.gpt_service import GPTService
+
+
+@pytest.fixture(scope="module")
+def fake_openai():
+    fake_openai = FakeOpenAI().start()
+    yield fake_openai
+    fake_openai.stop()
+
+
+@pytest.fixture
+def config(fake_openai):
+    return Config(HUBSPOT_API_KEY="fake", OPENAI_API_KEY="fake", OPENAI_BASE_URL=fake_openai.base_url)
+
+
+def test_async_service_answers_like_the_sync_service(config):
+    sync_service, async_service = GPTService(config), AsyncGPTService(config)
+    text = "Wohn- und Geschäftshaus in Berlin, Kaufpreis 2.500.000 €"
+    list_names = ["Investors", "Family Offices"]
+    members = "; ".join(f"Investor {index}" for index in range(30))
+
+    async def run():
+        return await asyncio.gather(
+            async_service.extract_key_facts(text),
+            async_service.analyze_text_and_select_list(text, list_names),
+            async_service.curate_members(members),
+            async_service.generate_email(text, "Investors"),
+        )
+
+    key_facts, list_name, curated, email = asyncio.run(run())
+
+    assert key_facts == sync_service.extract_key_facts(text)
+    assert key_facts.address.city == KEY_FACTS["address"]["city"]
+    assert list_name == sync_service.analyze_text_and_select_list(text, list_names) == "Investors"
+    assert curated == sync_service.curate_members(members)
+    assert curated.count(",") == GPTService.MAX_CURATED_MEMBERS - 1
+    assert email == sync_service.generate_email(text, "Investors") == EMAIL
+
+
+def test_async_service_curates_large_lists_in_chunks(config):
+    service = AsyncGPTService(config)
+    service.curation_chunk_tokens = 200
+    members = "; ".join(f"Investor {index}" for index in range(200))
+    assert len(service.member_chunks(service.split_members(members))) > 1
+
+    curated = asyncio.run(service.curate_members(members))
+
+    assert curated.startswith("[Investor 0,")
+    assert service.usage.stats()["curate_members"]["calls"] > 1
@@ -0,0 +1,76 @@
+import threading
+
+import pytest
+
+from job_scheduler import JobScheduler, QueueFullError
+
+
+@pytest.fixture
+def blocked_scheduler():
+    """A single-worker scheduler whose worker is busy until ``release`` is set, so submitted jobs wait."""
+    scheduler = JobScheduler(max_workers=1, max_queue_size=3)
+    started, release = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    scheduler.submit("blocker", block)
+    assert started.wait(5)
+    yield scheduler, release
+    release.set()
+    scheduler.shutdown()
+
+
+def test_jobs_run_by_priority_then_in_submission_order(blocked_scheduler):
+    scheduler, release = blocked_scheduler
+    order = []
+    for job_id, priority in [("batch-1", 10), ("upload-1", 0), ("batch-2", 10)]:
+        scheduler.submit(job_id, order.append, job_id, priority=priority)
+
+    release.set()
+    scheduler.shutdown()
+
+    assert order == ["upload-1", "batch-1", "batch-2"]
+
+
+def test_positions_follow_the_queue_order(blocked_scheduler):
+    scheduler, _ = blocked_scheduler
+
+    assert scheduler.submit("first", lambda: None) == 1
+    assert scheduler.submit("second", lambda: None) == 2
+    assert scheduler.submit("urgent", lambda: None, priority=-1) == 1
+    assert scheduler.get_position("first") == 2
+    assert scheduler.get_position("second") == 3
+    # Running and unknown jobs have no position
+    assert scheduler.get_position("blocker") is None
+    assert scheduler.get_position("unknown") is None
+
+
+def test_submit_raises_queue_full_error(blocked_scheduler):
+    scheduler, _ = blocked_scheduler
+    for index in range(3):
+        scheduler.submit(f"job-{index}", lambda: None)
+
+    with pytest.raises(QueueFullError):
+        scheduler.submit("one-too-many", lambda: None)
+    assert scheduler.queue_size() == 3
+
+
+def test_a_failing_job_does_not_stop_the_worker():
+    scheduler = JobScheduler(max_workers=1)
+    done = threading.Event()
+
+    scheduler.submit("failing", lambda: 1 / 0)
+    scheduler.submit("next", done.set)
+
+    assert done.wait(5)
+    scheduler.shutdown()
+
+
+def test_submit_after_shutdown_raises():
+    scheduler = JobScheduler(max_workers=1)
+    scheduler.shutdown()
+
+    with pytest.raises(RuntimeError):
+        scheduler.submit("late", lambda: None)
@@ -0,0 +1,74 @@
+import pytest
+
+from services.key_fact_extractor import KeyFactExtractor
+
+EXPOSE = """
+Wohn- und Geschäftshaus in Leipzig
+Karl-Liebknecht-Straße 12a, 04107 Leipzig
+Kaufpreis: 4.500.000 €
+Wohnfläche: 2.300 m²
+Grundstücksfläche: 1.200 m²
+18 Wohneinheiten
+Jahresnettokaltmiete: 312.000 €
+WAULT: 62 Monate
+Leipzig hat rund 600.000 Einwohner.
+"""
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("1.234.567", 1234567.0),
+    ("1.234.567,89", 1234567.89),
+    ("1,234,567.89", 1234567.89),
+    ("1,234", 1234.0),
+    ("1.234", 1234.0),
+    ("2,5", 2.5),
+    ("2.5", 2.5),
+    ("5,25", 5.25),
+    ("800", 800.0),
+    ("", None),
+    ("abc", None),
+])
+def test_parse_number(raw, expected):
+    assert KeyFactExtractor.parse_number(raw) == expected
+
+
+def test_extract():
+    key_facts, confidence = KeyFactExtractor().extract(EXPOSE)
+
+    assert key_facts.address.street == "Karl-Liebknecht-Straße"
+    assert key_facts.address.house_number == "12a"
+    assert key_facts.address.postal_code == "04107"
+    assert key_facts.address.city == "Leipzig"
+    assert key_facts.address.population == 600000
+    assert key_facts.purchase_price == 4500000
+    assert key_facts.usable_area == 2300
+    assert key_facts.plot_size == 1200
+    assert key_facts.residential_units == 18
+    assert key_facts.rental_income == 312000
+    assert key_facts.wault == 5.17
+    # Not in the text, derived from price and area
+    assert key_facts.price_per_square == 1957
+    assert confidence["purchase_price"] == 0.9
+
+
+def test_extract_monthly_rent_and_multiplier():
+    key_facts, _ = KeyFactExtractor().extract("Kaufpreis: 2,5 Mio. €\nMonatsmiete: 10.000 €")
+
+    assert key_facts.purchase_price == 2500000
+    assert key_facts.rental_income == 120000
+
+
+def test_extract_conflicting_mentions_lower_confidence():
+    extractor = KeyFactExtractor()
+    _, confidence = extractor.extract("Kaufpreis: 1.000.000 €\nKaufpreis: 1.200.000 €")
+
+    assert confidence["purchase_price"] == pytest.approx(0.6)
+    assert "purchase_price" in extractor.missing_fields(confidence, 0.8)
+
+
+def test_extract_without_figures():
+    key_facts, confidence = KeyFactExtractor().extract("Ein schönes Haus im Grünen.")
+
+    assert key_facts.purchase_price is None
+    assert key_facts.address.street == "missing"
+    assert confidence == {}
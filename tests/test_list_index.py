@@ -0,0 +1,94 @@
+from typing import List
+
+import numpy as np
+import pytest
+
+from models import ListInfo
+from services.list_index import ListIndex
+
+VOCABULARY = ["hotel", "wohnen", "büro", "berlin", "münchen"]
+
+
+class StubEmbed:
+    """Counts the vocabulary words of each text, one axis per word, and records the texts it embedded."""
+
+    def __init__(self):
+        self.calls: List[List[str]] = []
+
+    def __call__(self, texts: List[str]) -> List[List[float]]:
+        self.calls.append(list(texts))
+        return [[float(text.lower().count(word)) for word in VOCABULARY] for text in texts]
+
+
+def lists(*names: str) -> List[ListInfo]:
+    return [ListInfo(name=name, listId=str(index)) for index, name in enumerate(names)]
+
+
+@pytest.fixture
+def embed():
+    return StubEmbed()
+
+
+def test_match_returns_a_clear_winner(embed):
+    index = ListIndex(embed, margin=0.1)
+    index.update(lists("Hotel Investoren", "Wohnen Berlin", "Büro München"))
+
+    selected, candidates = index.match("Exposé: Hotel mit 120 Zimmern, Hotel-Betrieb verpachtet")
+
+    assert selected.name == "Hotel Investoren"
+    assert candidates == []
+
+
+def test_match_returns_candidates_when_the_scores_are_close(embed):
+    index = ListIndex(embed, margin=0.1, candidates=2)
+    index.update(lists("Wohnen Berlin", "Wohnen München", "Hotel Investoren"))
+
+    selected, candidates = index.match("Wohnen in Berlin oder München")
+
+    assert selected is None
+    assert [a_list.name for a_list in candidates] == ["Wohnen Berlin", "Wohnen München"]
+
+
+def test_match_returns_candidates_below_the_minimum_score(embed):
+    index = ListIndex(embed, min_score=0.3)
+    index.update(lists("Hotel Investoren", "Büro München"))
+
+    selected, candidates = index.match("Ein Grundstück am Stadtrand")
+
+    assert selected is None
+    assert [a_list.name for a_list in candidates] == ["Hotel Investoren", "Büro München"]
+
+
+def test_update_embeds_only_new_names(embed):
+    index = ListIndex(embed)
+    index.update(lists("Hotel Investoren", "Wohnen Berlin"))
+    index.update(lists("Hotel Investoren", "Wohnen Berlin", "Büro München"))
+
+    assert embed.calls == [["Hotel Investoren", "Wohnen Berlin"], ["Büro München"]]
+    assert [a_list.name for a_list in index.index[0]] == ["Hotel Investoren", "Wohnen Berlin", "Büro München"]
+
+
+def test_update_keeps_the_previous_index_if_embedding_fails(embed):
+    index = ListIndex(embed)
+    index.update(lists("Hotel Investoren"))
+
+    def fail(texts):
+        raise RuntimeError("OpenAI down")
+
+    index.embed = fail
+    index.update(lists("Hotel Investoren", "Wohnen Berlin"))
+
+    assert [a_list.name for a_list in index.index[0]] == ["Hotel Investoren"]
+
+
+def test_saved_vectors_are_loaded_for_the_same_model_only(embed, tmp_path):
+    path = str(tmp_path / "list_index.npz")
+    ListIndex(embed, model="small", path=path).update(lists("Hotel Investoren", "Wohnen Berlin"))
+
+    reloaded = ListIndex(embed, model="small", path=path)
+    reloaded.update(lists("Hotel Investoren", "Wohnen Berlin"))
+    other_model = ListIndex(embed, model="large", path=path)
+
+    assert embed.calls == [["Hotel Investoren", "Wohnen Berlin"]]
+    np.testing.assert_allclose(reloaded.known["Hotel Investoren"], [1, 0, 0, 0, 0])
+    assert other_model.known == {}
@@ -0,0 +1,77 @@
+import pytest
+
+from services import rate_limiter
+from services.rate_limiter import RateLimiter, TokenBucket
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(rate_limiter.time, "sleep", clock.sleep)
+    return clock
+
+
+def test_token_bucket_allows_a_burst_of_its_capacity(clock):
+    bucket = TokenBucket(capacity=10, period=1.0)
+
+    assert [bucket.reserve() for _ in range(10)] == [0.0] * 10
+
+
+def test_token_bucket_paces_requests_beyond_the_capacity(clock):
+    bucket = TokenBucket(capacity=10, period=1.0)
+    for _ in range(10):
+        bucket.reserve()
+
+    # One token every 0.1 s, reservations queue up behind each other
+    assert [bucket.reserve() for _ in range(3)] == pytest.approx([0.1, 0.2, 0.3])
+
+
+def test_token_bucket_refills_over_time(clock):
+    bucket = TokenBucket(capacity=10, period=1.0)
+    for _ in range(10):
+        bucket.reserve()
+
+    clock.now += 0.5
+    assert [bucket.reserve() for _ in range(5)] == [0.0] * 5
+    assert bucket.reserve() == pytest.approx(0.1)
+
+
+def test_token_bucket_does_not_refill_beyond_its_capacity(clock):
+    bucket = TokenBucket(capacity=2, period=1.0)
+
+    clock.now += 60
+    assert [bucket.reserve() for _ in range(2)] == [0.0, 0.0]
+    assert bucket.reserve() == pytest.approx(0.5)
+
+
+def test_rate_limiter_waits_for_the_slowest_bucket(clock):
+    limiter = RateLimiter([TokenBucket(capacity=10, period=1.0), TokenBucket(capacity=2, period=10.0)])
+
+    for _ in range(3):
+        limiter.acquire()
+
+    assert clock.sleeps == pytest.approx([5.0])
+
+
+def test_rate_limiter_pause_delays_every_caller(clock):
+    limiter = RateLimiter([TokenBucket(capacity=10, period=1.0)])
+
+    limiter.pause(2.0)
+    limiter.acquire()
+    limiter.acquire()
+
+    assert clock.sleeps == pytest.approx([2.0])
@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from services.structured_key_facts import StructuredKeyFacts
+
+
+def test_parse_valid_reply():
+    reply = {
+        "address": {"street": "Musterstraße", "house_number": "1", "postal_code": "10115", "city": "Berlin",
+                    "population": 3755251},
+        "purchase_price": 2500000, "price_per_square": 2500.5, "usable_area": 1000, "plot_size": None,
+        "residential_units": 12, "rental_income": 150000, "wault": 4.5,
+    }
+    key_facts = StructuredKeyFacts().parse(json.dumps(reply))
+
+    assert key_facts.address.city == "Berlin"
+    assert key_facts.address.population == 3755251
+    assert key_facts.purchase_price == 2500000
+    assert isinstance(key_facts.purchase_price, int)
+    assert key_facts.price_per_square == 2500.5
+    assert key_facts.plot_size is None
+    assert key_facts.wault == 4.5
+
+
+def test_parse_normalizes_numbers_given_as_text():
+    key_facts = StructuredKeyFacts().parse(json.dumps({
+        "purchase_price": "1.234.567,00 €", "rental_income": "2,5 Mio.", "usable_area": "1,000.5 m²",
+        "residential_units": "12", "wault": "18 Monate",
+    }))
+
+    assert key_facts.purchase_price == 1234567
+    assert key_facts.rental_income == 2500000
+    assert key_facts.usable_area == 1000.5
+    assert key_facts.residential_units == 12
+    assert key_facts.wault == 1.5
+
+
+def test_parse_only_requested_fields():
+    structured = StructuredKeyFacts(["purchase_price", "address.city"])
+    key_facts = structured.parse('{"purchase_price": 5, "address": {"city": "Köln"}, "wault": 3}')
+
+    assert structured.schema()["required"] == ["address", "purchase_price"]
+    assert key_facts.purchase_price == 5
+    assert key_facts.address.city == "Köln"
+    assert key_facts.address.street == "missing"
+    assert key_facts.wault is None
+
+
+@pytest.mark.parametrize("response", [
+    "",
+    "not json",
+    '{purchase_price: 5}',
+    '{"address": "Berlin"}',
+    '{"residential_units": [1, 2]}',
+])
+def test_parse_invalid_reply_raises_value_error(response):
+    with pytest.raises(ValueError):
+        StructuredKeyFacts().parse(response)
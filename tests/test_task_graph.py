@@ -0,0 +1,93 @@
+import threading
+import time
+
+import pytest
+
+from task_graph import TaskGraph
+
+
+def test_independent_nodes_overlap():
+    # Neither node gets past the barrier unless both run at the same time
+    barrier = threading.Barrier(2, timeout=5)
+
+    def node(name: str) -> str:
+        barrier.wait()
+        return name
+
+    graph = TaskGraph(max_workers=2)
+    graph.add("text", lambda: node("text"))
+    graph.add("lists", lambda: node("lists"))
+
+    assert graph.run() == {"text": "text", "lists": "lists"}
+
+
+def test_results_are_passed_in_depends_on_order():
+    graph = TaskGraph()
+    graph.add("a", lambda: "a")
+    graph.add("b", lambda: "b")
+    graph.add("joined", lambda *args: "".join(args), depends_on=("b", "a"))
+    graph.add("last", lambda joined, a: f"{joined}-{a}", depends_on=("joined", "a"))
+
+    results = graph.run()
+
+    assert results["joined"] == "ba"
+    assert results["last"] == "ba-a"
+
+
+def test_a_failing_node_raises_without_waiting_for_slow_siblings():
+    release = threading.Event()
+    started = []
+
+    def fail():
+        raise RuntimeError("GPT down")
+
+    graph = TaskGraph(max_workers=2)
+    graph.add("slow", lambda: release.wait(5))
+    graph.add("failing", fail)
+    graph.add("after", lambda failed: started.append("after"), depends_on=("failing",))
+
+    started_at = time.perf_counter()
+    with pytest.raises(RuntimeError, match="GPT down"):
+        graph.run()
+    elapsed = time.perf_counter() - started_at
+    release.set()
+
+    assert elapsed < 1
+    assert started == []
+
+
+def test_on_start_and_on_done_see_every_node():
+    started, done = [], []
+    graph = TaskGraph()
+    graph.add("a", lambda: 1)
+    graph.add("b", lambda a: a + 1, depends_on=("a",))
+    graph.add("c", lambda a, b: a + b, depends_on=("a", "b"))
+
+    graph.run(on_start=started.append, on_done=lambda name, completed, total: done.append((name, completed, total)))
+
+    assert started == ["a", "b", "c"]
+    assert done == [("a", 1, 3), ("b", 2, 3), ("c", 3, 3)]
+
+
+def test_timings_hold_the_wall_time_of_every_node():
+    graph = TaskGraph()
+    graph.add("fast", lambda: None)
+    graph.add("slow", lambda: time.sleep(0.05))
+
+    graph.run()
+
+    assert set(graph.timings) == {"fast", "slow"}
+    assert graph.timings["slow"] >= 0.05
+    assert graph.timings["fast"] < graph.timings["slow"]
+
+
+@pytest.mark.parametrize("name, depends_on, error", [
+    ("a", (), "Duplicate graph node: a"),
+    ("b", ("missing",), "Unknown dependency 'missing' for node 'b'"),
+])
+def test_add_rejects_invalid_nodes(name, depends_on, error):
+    graph = TaskGraph()
+    graph.add("a", lambda: None)
+
+    with pytest.raises(ValueError, match=error):
+        graph.add(name, lambda: None, depends_on=depends_on)
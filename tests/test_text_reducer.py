@@ -0,0 +1,38 @@
+import pytest
+
+from services.gpt_service import GPTService
+from services.text_reducer import TextReducer
+
+
+@pytest.mark.parametrize("keywords, window, expected", [
+    (["Kaufpreis"], "Ein schönes Haus im Grünen. Sehr nett hier.", 0.0),
+    (["-straße"], "Ein schönes Haus im Grünen. Sehr nett hier.", 0.0),
+    ([], "Ein schönes Haus im Grünen. Sehr nett hier.", 0.0),
+    (["Kaufpreis"], "Kaufpreis auf Anfrage, Kaufpreisfaktor 20", 1.0),
+    (["-straße"], "Musterstraße 1, Straßenbahn", 1.0),
+    (["Kaufpreis", "-straße"], "Kaufpreis: 2.500.000 € in der Musterstraße", 2.5),
+])
+def test_score_counts_keywords_and_numbers_with_units(keywords, window, expected):
+    assert TextReducer(keywords=keywords).score(window) == expected
+
+
+def test_reduce_keeps_short_texts():
+    text = "Wohnhaus in Berlin\nKaufpreis: 2.500.000 €\n"
+
+    assert TextReducer(token_budget=100).reduce(text) == text
+
+
+def test_reduce_keeps_the_first_window_and_the_best_scored_ones_in_order():
+    filler = "Ein schönes Haus im Grünen. Sehr nett hier.\n" * 4
+    windows = ["Wohnhaus in Berlin\n", filler, "Kaufpreis: 2.500.000 €\n", filler, "Wohnfläche: 1.000 m²\n", filler]
+    text = "".join(windows)
+    reducer = TextReducer(token_budget=GPTService.estimate_tokens(text) // 2, window_chars=60,
+                          keywords=["Kaufpreis", "Wohnfläche"])
+
+    reduced = reducer.reduce(text)
+
+    assert reduced.startswith("Wohnhaus in Berlin")
+    assert reduced.index("Kaufpreis") < reduced.index("Wohnfläche")
+    assert "Sehr nett hier" not in reduced
+    assert TextReducer.SEPARATOR in reduced
+    assert GPTService.estimate_tokens(reduced) <= reducer.token_budget
@@ -1,29 +1,186 @@
 import io
 import logging
-from typing import Set, Optional
+import multiprocessing
+import os
+import signal
+import threading
+import weakref
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, List, Set, Optional
 import PyPDF2
 from config import Config
 
 logger = logging.getLogger(__name__)
 
 
+def _raise_timeout(signum, frame):
+    raise TimeoutError("PDF page extraction timed out")
+
+
+def _report_pid(pids: "multiprocessing.SimpleQueue"):
+    # Pool initializer, tells the parent which processes to terminate when it retires the pool
+    pids.put(os.getpid())
+
+
+def _extract_page_range(pdf_content: bytes, start: int, stop: int, page_timeout: float) -> List[str]:
+    # Runs inside a pool process, so it has to parse the document itself. The pool cannot interrupt a running
+    # task, so every page stops itself after ``page_timeout`` seconds; only that page is skipped, yielding "".
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_content))
+    use_alarm = page_timeout > 0 and hasattr(signal, "setitimer")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+    pages = []
+    for index in range(start, stop):
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, page_timeout)
+        try:
+            pages.append(pdf_reader.pages[index].extract_text() or "")
+        except Exception as e:
+            # The alarm can surface as another error if it interrupts PyPDF2 while it resolves shared objects
+            logger.warning(f"Error extracting PDF page {index + 1}, skipping it: {e!r}")
+            pages.append("")
+            pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_content))
+        finally:
+            if use_alarm:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+    return pages
+
+
 class PDFUtil:
     ALLOWED_EXTENSIONS: Set[str] = {'pdf'}
 
+    _pool: Optional[ProcessPoolExecutor] = None
+    _pool_workers = 0
+    _pool_lock = threading.Lock()
+    # Pids of the processes each pool started, reported by the processes themselves
+    _pool_pids: "weakref.WeakKeyDictionary[ProcessPoolExecutor, multiprocessing.SimpleQueue]" = \
+        weakref.WeakKeyDictionary()
+    # Seconds a chunk may take beyond its own timeout before the pool is considered stuck
+    POOL_GRACE_SECONDS = 5.0
+
     @classmethod
     def allowed_file(cls, filename: str) -> bool:
         return '.' in filename and filename.rsplit('.', 1)[1].lower() in cls.ALLOWED_EXTENSIONS
 
-    @staticmethod
-    def extract_text_from_pdf(pdf_content: bytes) -> Optional[str]:
+    @classmethod
+    def extract_text_from_pdf(cls, pdf_content: bytes, workers: int = 0, chunk_pages: int = 8,
+                              max_pages: Optional[int] = None, page_timeout: float = 10.0) -> Optional[str]:
         try:
-            pdf_file = io.BytesIO(pdf_content)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            return "".join(page.extract_text() for page in pdf_reader.pages)
+            return "".join(cls.iter_pages(pdf_content, workers, chunk_pages, max_pages, page_timeout))
         except Exception as e:
             logger.error(f"Error extracting text from PDF: {e}")
             return None
 
+    @classmethod
+    def iter_pages(cls, pdf_content: bytes, workers: int = 0, chunk_pages: int = 8,
+                   max_pages: Optional[int] = None, page_timeout: float = 10.0) -> Iterator[str]:
+        """
+        Yields the text of each page in order, as soon as it is extracted.
+
+        The pages are extracted in chunks of ``chunk_pages`` on a shared pool of ``workers`` processes (at
+        least one). A page taking longer than ``page_timeout`` seconds stops itself and is skipped (it yields
+        ""), so one pathological page cannot stall the caller. Only a chunk that does not even stop then gets
+        the pool replaced and its processes terminated; chunks of other uploads cancelled with it are submitted
+        again to the new pool. A ``page_timeout`` of 0 disables the timeout, small documents and documents
+        without more than one worker are then extracted in-process. Only the first ``max_pages`` pages are read.
+        """
+        pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_content))
+        total = len(pdf_reader.pages) if max_pages is None else min(len(pdf_reader.pages), max_pages)
+
+        # The timeout relies on SIGALRM in a pool process, the threads of the web workers cannot use it
+        if page_timeout <= 0 and (workers <= 1 or total <= chunk_pages):
+            for index in range(total):
+                yield pdf_reader.pages[index].extract_text() or ""
+            return
+        workers = max(workers, 1)
+
+        ranges = [(start, min(start + chunk_pages, total)) for start in range(0, total, chunk_pages)]
+
+        pools: List[ProcessPoolExecutor] = []
+        futures: List[Future] = []
+
+        def submit(index: int):
+            start, stop = ranges[index]
+            pool = cls._get_pool(workers)
+            try:
+                future = pool.submit(_extract_page_range, pdf_content, start, stop, page_timeout)
+            except RuntimeError:
+                # The pool broke or another upload retired it since _get_pool
+                cls._replace_pool(pool)
+                pool = cls._get_pool(workers)
+                future = pool.submit(_extract_page_range, pdf_content, start, stop, page_timeout)
+            if index < len(futures):
+                pools[index], futures[index] = pool, future
+            else:
+                pools.append(pool)
+                futures.append(future)
+
+        def resubmit_lost(first: int):
+            # Chunks cancelled or broken by a replaced pool did not fail by themselves, the new pool runs them
+            for index in range(first, len(futures)):
+                if futures[index].cancelled() or (futures[index].done() and
+                                                  isinstance(futures[index].exception(), BrokenProcessPool)):
+                    submit(index)
+
+        for index in range(len(ranges)):
+            submit(index)
+        try:
+            for index, (start, stop) in enumerate(ranges):
+                timeout = page_timeout * (stop - start) + cls.POOL_GRACE_SECONDS if page_timeout > 0 else None
+                try:
+                    try:
+                        pages = futures[index].result(timeout=timeout)
+                    except (CancelledError, BrokenProcessPool):
+                        resubmit_lost(index)
+                        pages = futures[index].result(timeout=timeout)
+                except TimeoutError:
+                    logger.warning(f"Timeout extracting PDF pages {start + 1}-{stop}, skipping them")
+                    pages = [""] * (stop - start)
+                    if not futures[index].done():
+                        # A page ignored its timeout, so the process of the chunk is stuck
+                        cls._replace_pool(pools[index])
+                        resubmit_lost(index + 1)
+                except Exception as e:
+                    logger.warning(f"Error extracting PDF pages {start + 1}-{stop}: {e}")
+                    pages = [""] * (stop - start)
+                yield from pages
+        finally:
+            for future in futures:
+                future.cancel()
+
+    @classmethod
+    def _get_pool(cls, workers: int) -> ProcessPoolExecutor:
+        with cls._pool_lock:
+            if cls._pool is None or cls._pool_workers != workers:
+                if cls._pool is not None:
+                    cls._pool.shutdown(wait=False, cancel_futures=True)
+                # spawn instead of fork, the web workers are multi-threaded
+                context = multiprocessing.get_context("spawn")
+                pids = context.SimpleQueue()
+                cls._pool = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                                initializer=_report_pid, initargs=(pids,))
+                cls._pool_pids[cls._pool] = pids
+                cls._pool_workers = workers
+            return cls._pool
+
+    @classmethod
+    def _replace_pool(cls, pool: ProcessPoolExecutor):
+        """
+        Retires a pool with a stuck process, the next _get_pool starts a new one. The chunks still queued
+        there are cancelled and its processes terminated, chunks they were running fail with BrokenProcessPool.
+        """
+        with cls._pool_lock:
+            if cls._pool is pool:
+                cls._pool = None
+            pids = cls._pool_pids.pop(pool, None)
+        pool.shutdown(wait=False, cancel_futures=True)
+        while pids is not None and not pids.empty():
+            try:
+                os.kill(pids.get(), signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
 
 class Util:
     def __init__(self, config: Config):
@@ -34,7 +191,22 @@ class Util:
         return self.pdf_util.allowed_file(filename)
 
     def extract_text_from_pdf(self, pdf_content: bytes) -> Optional[str]:
-        return self.pdf_util.extract_text_from_pdf(pdf_content)
+        return self.pdf_util.extract_text_from_pdf(
+            pdf_content,
+            workers=self.config.PDF_WORKERS,
+            chunk_pages=self.config.PDF_CHUNK_PAGES,
+            max_pages=self.config.PDF_MAX_PAGES,
+            page_timeout=self.config.PDF_PAGE_TIMEOUT_SECONDS,
+        )
+
+    def iter_pdf_pages(self, pdf_content: bytes) -> Iterator[str]:
+        return self.pdf_util.iter_pages(
+            pdf_content,
+            workers=self.config.PDF_WORKERS,
+            chunk_pages=self.config.PDF_CHUNK_PAGES,
+            max_pages=self.config.PDF_MAX_PAGES,
+            page_timeout=self.config.PDF_PAGE_TIMEOUT_SECONDS,
+        )
 
     @staticmethod
     def string_to_list(input_string):